@@ -1,26 +1,23 @@
-from app.database import get_connection
-from sklearn.linear_model import LogisticRegression
-import numpy as np
+import pickle
+import threading
+from app.config import Config
+from app.database import (
+    get_connection,
+    get_table_version,
+    save_risk_model,
+    load_latest_risk_model
+)
 
-def encode_urgency(urgency):
-    return {"low": 0, "medium": 1, "high": 2}.get(urgency, 1)
+# Only one background retrain per process at a time
+_retrain_lock = threading.Lock()
 
-def encode_sentiment(sentiment):
-    return {"positive": 0, "neutral": 1, "negative": 2}.get(sentiment, 1)
+def train_operational_risk(previous_model=None):
+    """Fit the risk model on the current table and persist it with its result."""
+    from app.risk_model import fit_risk_model
 
-def encode_behavior(behavior):
-    return {"polite": 0, "neutral": 1, "rude": 2, "unknown": 3}.get(behavior, 1)
+    # Read the version first: rows inserted meanwhile count as stale
+    data_version = get_table_version()
 
-def encode_category_risk(category, all_rows):
-    # Calculate historical resolution rate for this category
-    category_calls = [r for r in all_rows if category in (r[3] or "")]
-    if len(category_calls) < 3:
-        return 0.5  # Default risk
-    
-    unresolved = sum(1 for r in category_calls if r[4] == "unresolved")
-    return unresolved / len(category_calls)  # Risk score 0-1
-
-def calculate_operational_risk():
     # 1. Fetch all calls
     with get_connection() as conn:
         cursor = conn.cursor()
@@ -29,61 +26,78 @@ def calculate_operational_risk():
             FROM support_calls
         """)
         rows = cursor.fetchall()
-    
-    if len(rows) < 10:
-        return {
-            "risk_score": 0,
-            "level": "Insufficient Data",
-            "message": "Need at least 10 calls for prediction"
-        }
-    
-    # 2. Prepare features
-    X = []
-    y = []
-    
-    for row in rows:
-        # Target: 1 if unresolved, 0 if resolved
-        y.append(1 if row[4] == "unresolved" else 0)
-        
-        # Features
-        features = [
-            encode_urgency(row[0]),
-            encode_sentiment(row[1]),
-            encode_behavior(row[2]),
-            encode_category_risk(row[3], rows)
-        ]
-        X.append(features)
-    
-    # 3. Train model
-    model = LogisticRegression(max_iter=1000)
-    model.fit(X, y)
-    
-    # 4. Get average predicted risk
-    predictions = model.predict_proba(X)[:, 1]
-    avg_risk = np.mean(predictions) * 100
-    
-    # 5. Get top contributing factor
-    feature_names = ["urgency", "sentiment", "behavior", "category"]
-    coefficients = model.coef_[0]
-    top_idx = np.argmax(np.abs(coefficients))
-    top_factor = feature_names[top_idx]
-    top_direction = "increases" if coefficients[top_idx] > 0 else "decreases"
-    
-    # 6. Determine level
-    if avg_risk < 30:
-        level = "Low"
-    elif avg_risk < 60:
-        level = "Medium"
-    else:
-        level = "High"
-    
+
+    # 2. Train
+    model, result = fit_risk_model(rows, previous_model)
+
+    # 3. Persist model + result. Without enough data there is no model,
+    # but the result is stored anyway so requests answer from it until
+    # the table is stale, instead of rescanning it every time
+    model_blob = pickle.dumps(model) if model is not None else b""
+    version = save_risk_model(data_version, result, model_blob)
+
+    return {**result, "model_version": version}
+
+def refresh_operational_risk():
+    """Retrain from the latest stored model. No-op if a retrain is running."""
+    if not _retrain_lock.acquire(blocking=False):
+        return None
+
+    try:
+        stored = load_latest_risk_model(include_model=True)
+        previous_model = pickle.loads(stored["model"]) if stored and stored["model"] else None
+        return train_operational_risk(previous_model)
+    finally:
+        _retrain_lock.release()
+
+def _staleness(stored):
+    return {
+        "calls_since_training": get_table_version() - stored["data_version"],
+        "age_seconds": stored["age_seconds"]
+    }
+
+def _is_stale(staleness):
+    calls = staleness["calls_since_training"]
+    if calls >= Config.RISK_RETRAIN_EVERY:
+        return True
+    return calls > 0 and staleness["age_seconds"] >= Config.RISK_MAX_AGE_SECONDS
+
+def _start_refresh():
+    threading.Thread(target=refresh_operational_risk, daemon=True).start()
+
+def schedule_risk_refresh():
+    """
+    Start a background retrain if the stored model is stale.
+
+    Called after calls are inserted or deleted; returns immediately.
+    """
+    stored = load_latest_risk_model()
+    if stored and not _is_stale(_staleness(stored)):
+        return False
+
+    _start_refresh()
+    return True
+
+def calculate_operational_risk():
+    """
+    Cached operational risk.
+
+    Answers from the stored result; stale models are retrained in the
+    background. Only the very first request trains synchronously.
+    """
+    stored = load_latest_risk_model()
+
+    if stored is None:
+        train_operational_risk()
+        stored = load_latest_risk_model()
+
+    staleness = _staleness(stored)
+    if _is_stale(staleness):
+        _start_refresh()
+
     return {
-        "risk_score": round(avg_risk, 1),
-        "level": level,
-        "top_factor": {
-            "name": top_factor,
-            "impact": top_direction,
-            "coefficient": round(coefficients[top_idx], 3)
-        },
-        "total_calls_used": len(rows)
-    }
\ No newline at end of file
+        **stored["result"],
+        "model_version": stored["version"],
+        "trained_at": stored["trained_at"],
+        "staleness": staleness
+    }
@@ -0,0 +1,195 @@
+"""
+Audio preprocessing in front of Whisper.
+
+The upload is decoded once to 16 kHz mono float32, long silences (and,
+in "vad" mode, hold music and other non-speech) are cut, and the rest is
+normalized to a fixed loudness. Whisper then gets the trimmed array
+instead of the file, so its work follows the amount of speech rather
+than the length of the recording.
+
+The kept spans are returned so segment timestamps can be mapped back to
+the original recording with to_original_seconds().
+
+For two-channel recordings with one speaker per channel,
+preprocess_channels() does the same for each channel separately; other
+files come back as their single mixed channel from the same decode.
+
+Imported lazily by app.pipeline so NumPy stays out of processes that
+never transcribe.
+"""
+import numpy as np
+
+from app.config import Config
+
+SAMPLE_RATE = 16000
+# 30 ms analysis frames
+FRAME_SAMPLES = 480
+# Never boost or cut by more than this when normalizing
+MAX_GAIN_DB = 30.0
+PEAK_CEILING = 10 ** (-1 / 20)
+# Channels whose difference is this far below their level carry the
+# same mix (dual mono), not one speaker each
+DUAL_MONO_DB = -30.0
+
+
+def decode(path: str) -> np.ndarray:
+    """Decode anything PyAV reads (mp3, m4a, flac, ...) to 16 kHz mono float32."""
+    from faster_whisper.audio import decode_audio
+    return decode_audio(path, sampling_rate=SAMPLE_RATE)
+
+
+def channel_count(path: str) -> int:
+    import av
+
+    with av.open(path) as container:
+        return container.streams.audio[0].channels
+
+
+def decode_channels(path: str) -> list:
+    """
+    16 kHz float32 signals, decoded once: [left, right] for a stereo
+    file with distinct channels, else [mono mix] (mono and dual mono).
+    """
+    if channel_count(path) != 2:
+        return [decode(path)]
+
+    from faster_whisper.audio import decode_audio
+    left, right = decode_audio(path, sampling_rate=SAMPLE_RATE, split_stereo=True)
+
+    level = np.sqrt(np.mean(np.square(left + right, dtype=np.float64)) / 4)
+    difference = np.sqrt(np.mean(np.square(left - right, dtype=np.float64)))
+    if level <= 0 or 20 * np.log10(max(difference, 1e-10) / level) < DUAL_MONO_DB:
+        return [(left + right) / 2]
+    return [left, right]
+
+
+def frame_levels(audio: np.ndarray) -> np.ndarray:
+    """RMS level of each 30 ms frame in dBFS (the last frame zero-padded)."""
+    padded = np.pad(audio, (0, -len(audio) % FRAME_SAMPLES))
+    frames = padded.reshape(-1, FRAME_SAMPLES)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def energy_spans(audio: np.ndarray, silence_db: float, min_silence: float) -> list:
+    """(start, end) sample ranges left after cutting quiet runs of `min_silence` s or more."""
+    active = np.flatnonzero(frame_levels(audio) > silence_db)
+    if not len(active):
+        return []
+
+    min_gap = max(1, int(min_silence * SAMPLE_RATE / FRAME_SAMPLES))
+    breaks = np.flatnonzero(np.diff(active) > min_gap)
+    starts = np.r_[active[0], active[breaks + 1]]
+    ends = np.r_[active[breaks], active[-1]] + 1
+    return [
+        (int(s) * FRAME_SAMPLES, min(int(e) * FRAME_SAMPLES, len(audio)))
+        for s, e in zip(starts, ends)
+    ]
+
+
+def vad_spans(audio: np.ndarray, min_silence: float) -> list:
+    """Speech ranges from faster-whisper's bundled Silero VAD."""
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+    options = VadOptions(min_silence_duration_ms=int(min_silence * 1000), speech_pad_ms=0)
+    return [(ts["start"], ts["end"]) for ts in get_speech_timestamps(audio, options)]
+
+
+def pad_spans(spans: list, pad: int, total: int) -> list:
+    """Widen each span by `pad` samples and merge the ones that touch."""
+    merged = []
+    for start, end in spans:
+        start, end = max(0, start - pad), min(total, end + pad)
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def normalize_loudness(audio: np.ndarray, target_dbfs):
+    """Scale to `target_dbfs` RMS without clipping; returns (audio, gain in dB)."""
+    if target_dbfs is None or not len(audio):
+        return audio, 0.0
+
+    rms = float(np.sqrt(np.mean(np.square(audio, dtype=np.float64))))
+    peak = float(np.max(np.abs(audio)))
+    if rms <= 0 or peak <= 0:
+        return audio, 0.0
+
+    gain_db = float(np.clip(target_dbfs - 20 * np.log10(rms), -MAX_GAIN_DB, MAX_GAIN_DB))
+    gain = min(10 ** (gain_db / 20), PEAK_CEILING / peak)
+    return (audio * gain).astype(np.float32), round(float(20 * np.log10(gain)), 2)
+
+
+def to_original_seconds(seconds: float, spans: list, is_end: bool = False) -> float:
+    """
+    Map a time in the trimmed audio to the original recording.
+
+    A time that falls exactly on a cut belongs to the span before it when
+    it ends a segment and to the span after it when it starts one.
+    """
+    sample = seconds * SAMPLE_RATE
+    offset = 0
+    for start, end in spans:
+        length = end - start
+        if sample < offset + length or (is_end and sample <= offset + length):
+            return round((start + sample - offset) / SAMPLE_RATE, 2)
+        offset += length
+    return round(spans[-1][1] / SAMPLE_RATE, 2) if spans else seconds
+
+
+def prepare(audio: np.ndarray, mode: str = None) -> dict:
+    """
+    Trim and normalize one decoded signal.
+
+    Returns {"audio": float32 array for Whisper, "spans": kept
+    (start, end) sample ranges of the original, "report": seconds kept
+    and removed, plus the applied gain}. Mode "off" keeps it unchanged.
+    """
+    mode = mode or Config.AUDIO_PREPROCESS
+    if mode not in ("off", "energy", "vad"):
+        raise ValueError(f"Unknown AUDIO_PREPROCESS mode: {mode}")
+
+    if mode == "off":
+        spans = [(0, len(audio))] if len(audio) else []
+    elif mode == "vad":
+        spans = vad_spans(audio, Config.AUDIO_MIN_SILENCE_SECONDS)
+    else:
+        spans = energy_spans(audio, Config.AUDIO_SILENCE_DB, Config.AUDIO_MIN_SILENCE_SECONDS)
+
+    gain_db = 0.0
+    if mode == "off":
+        trimmed = audio
+    else:
+        spans = pad_spans(spans, int(Config.AUDIO_PAD_SECONDS * SAMPLE_RATE), len(audio))
+        trimmed = (
+            np.concatenate([audio[start:end] for start, end in spans])
+            if spans else audio[:0]
+        )
+        target = float(Config.AUDIO_TARGET_DBFS) if Config.AUDIO_TARGET_DBFS else None
+        trimmed, gain_db = normalize_loudness(trimmed, target)
+
+    original = len(audio) / SAMPLE_RATE
+    kept = len(trimmed) / SAMPLE_RATE
+    return {
+        "audio": trimmed,
+        "spans": spans,
+        "report": {
+            "mode": mode,
+            "original_seconds": round(original, 2),
+            "kept_seconds": round(kept, 2),
+            "removed_seconds": round(original - kept, 2),
+            "gain_db": gain_db,
+        },
+    }
+
+
+def preprocess(path: str, mode: str = None) -> dict:
+    """Decode, trim and normalize one recording (see prepare)."""
+    return prepare(decode(path), mode)
+
+
+def preprocess_channels(path: str, mode: str = None) -> list:
+    """prepare() per signal from decode_channels()."""
+    return [prepare(channel, mode) for channel in decode_channels(path)]
@@ -6,14 +6,169 @@ load_dotenv()
 class Config:
     # Database
     DB_PATH = os.getenv("DB_PATH", "data/support_calls.db")
+    # Writers wait this long for the lock instead of failing with
+    # "database is locked"; reads are memory-mapped up to DB_MMAP_SIZE
+    DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", 5000))
+    DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", 256 * 1024 * 1024))
     
     # File uploads
     MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", 50 * 1024 * 1024))
     UPLOAD_DIR = os.getenv("UPLOAD_DIR", "data/uploads")
     
+    # Batch ingestion: files per job and per-stage worker limits
+    BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", 1000))
+    TRANSCRIBE_CONCURRENCY = int(os.getenv("TRANSCRIBE_CONCURRENCY", 2))
+    LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", 4))
+    
+    # Transcription: "local" loads Whisper in every process, "service"
+    # sends audio paths to one shared model process over a Unix socket
+    TRANSCRIPTION_MODE = os.getenv("TRANSCRIPTION_MODE", "local")
+    TRANSCRIPTION_SOCKET = os.getenv("TRANSCRIPTION_SOCKET", "data/transcription.sock")
+    TRANSCRIPTION_TIMEOUT_SECONDS = float(os.getenv("TRANSCRIPTION_TIMEOUT_SECONDS", 1800))
+    
+    # Whisper decoding profiles, picked with WHISPER_PROFILE. "default"
+    # matches the original setup; the others trade accuracy for speed.
+    # Any WHISPER_* variable below overrides the profile's value.
+    WHISPER_PROFILES = {
+        "default": {
+            "model_size": "base", "compute_type": "float32",
+            "beam_size": 5, "vad_filter": False,
+        },
+        "balanced": {
+            "model_size": "base", "compute_type": "int8_float32",
+            "beam_size": 2, "vad_filter": True,
+        },
+        "fast": {
+            "model_size": "base", "compute_type": "int8",
+            "beam_size": 1, "vad_filter": True,
+        },
+        "fastest": {
+            "model_size": "tiny", "compute_type": "int8",
+            "beam_size": 1, "vad_filter": True,
+        },
+    }
+    WHISPER_PROFILE = os.getenv("WHISPER_PROFILE", "default")
+    WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE")
+    WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE")
+    WHISPER_BEAM_SIZE = os.getenv("WHISPER_BEAM_SIZE")
+    WHISPER_VAD_FILTER = os.getenv("WHISPER_VAD_FILTER")
+    # 0 lets CTranslate2 pick; num_workers allows parallel transcribe calls
+    WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", 0))
+    WHISPER_NUM_WORKERS = int(os.getenv("WHISPER_NUM_WORKERS", 1))
+    
+    # Audio preprocessing before Whisper (see app/audio.py): "energy" cuts
+    # silences, "vad" also cuts hold music and other non-speech with
+    # Silero VAD, "off" hands the file to Whisper untouched
+    AUDIO_PREPROCESS = os.getenv("AUDIO_PREPROCESS", "energy")
+    # 30 ms frames quieter than this (dBFS) count as silence
+    AUDIO_SILENCE_DB = float(os.getenv("AUDIO_SILENCE_DB", -45))
+    # Only gaps at least this long are cut; AUDIO_PAD_SECONDS is kept
+    # on each side of the remaining audio
+    AUDIO_MIN_SILENCE_SECONDS = float(os.getenv("AUDIO_MIN_SILENCE_SECONDS", 1.0))
+    AUDIO_PAD_SECONDS = float(os.getenv("AUDIO_PAD_SECONDS", 0.25))
+    # RMS loudness target for the kept audio; empty disables normalization
+    AUDIO_TARGET_DBFS = os.getenv("AUDIO_TARGET_DBFS", "-20")
+    # Stereo recordings with one speaker per channel: name the channels in
+    # order ("agent,customer" or "customer,agent", the roles the prompt
+    # knows) to transcribe them separately and in parallel and give the
+    # LLM a speaker-labelled transcript. Mono and dual-mono files are
+    # still mixed. Set WHISPER_NUM_WORKERS=2 so both channels really
+    # decode at the same time.
+    SPEAKER_CHANNELS = os.getenv("SPEAKER_CHANNELS", "")
+    
+    # LLM backend: "ollama" (sync client), "ollama_async" (pooled asyncio
+    # client) or "fake" (in-process stand-in for offline benchmarks)
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "ollama")
+    OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+    OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "phi3")
+    LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 120))
+    # "split" sends the static instructions as a system message and only
+    # the transcript as the user message; "single" is the original layout
+    LLM_PROMPT_LAYOUT = os.getenv("LLM_PROMPT_LAYOUT", "split")
+    # Keep the model (and its prompt-prefix KV cache) loaded between calls.
+    # Seconds or a duration like "30m"; -1 keeps it loaded forever.
+    OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+    # Fixed context size; changing num_ctx between requests reloads the
+    # model and drops the cached prefix. 0 uses the model default.
+    OLLAMA_NUM_CTX = int(os.getenv("OLLAMA_NUM_CTX", 4096))
+    LLM_FAKE_LATENCY_MS = float(os.getenv("LLM_FAKE_LATENCY_MS", 200))
+    LLM_FAKE_JITTER_MS = float(os.getenv("LLM_FAKE_JITTER_MS", 50))
+    # Extra fake latency per 1000 prompt characters (models prompt processing)
+    LLM_FAKE_MS_PER_1K_CHARS = float(os.getenv("LLM_FAKE_MS_PER_1K_CHARS", 0))
+    
+    # Micro-batching: queue consumers pack up to LLM_BATCH_SIZE transcripts
+    # into one prompt, waiting at most LLM_BATCH_MAX_WAIT_MS to fill a
+    # batch. 1 disables it. Batches only fill if LLM_CONCURRENCY is at
+    # least the batch size; LLM_BATCH_MAX_CHARS keeps prompts inside the
+    # model's context window.
+    LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", 1))
+    LLM_BATCH_MAX_WAIT_MS = float(os.getenv("LLM_BATCH_MAX_WAIT_MS", 250))
+    LLM_BATCH_MAX_CHARS = int(os.getenv("LLM_BATCH_MAX_CHARS", 6000))
+    
+    # Long transcripts are classified in overlapping chunks of at most
+    # LLM_CHUNK_CHARS (about 1k phi3 tokens at the default), in parallel,
+    # and merged. Keep chunk + instructions well inside OLLAMA_NUM_CTX.
+    LLM_CHUNK_CHARS = int(os.getenv("LLM_CHUNK_CHARS", 4000))
+    LLM_CHUNK_OVERLAP_CHARS = int(os.getenv("LLM_CHUNK_OVERLAP_CHARS", 400))
+    
+    # First-tier pre-classifier (python -m app.triage train). Calls where
+    # every field is at least THRESHOLD confident skip the LLM; a
+    # SHADOW_RATE share of those still goes to the LLM to measure accuracy.
+    PRECLASSIFIER_ENABLED = os.getenv("PRECLASSIFIER_ENABLED", "0") == "1"
+    PRECLASSIFIER_THRESHOLD = float(os.getenv("PRECLASSIFIER_THRESHOLD", 0.9))
+    PRECLASSIFIER_SHADOW_RATE = float(os.getenv("PRECLASSIFIER_SHADOW_RATE", 0.05))
+    
+    # LLM result cache (keyed on normalized transcript + prompt + model)
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+    LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", 30 * 24 * 3600))
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 100_000))
+    LLM_CACHE_MEMORY_ITEMS = int(os.getenv("LLM_CACHE_MEMORY_ITEMS", 1024))
+    
+    # Job queue: lease length, retries (exponential backoff) before an
+    # item is dead-lettered, and consumer poll interval
+    QUEUE_LEASE_SECONDS = int(os.getenv("QUEUE_LEASE_SECONDS", 900))
+    QUEUE_MAX_ATTEMPTS = int(os.getenv("QUEUE_MAX_ATTEMPTS", 3))
+    QUEUE_RETRY_BACKOFF_SECONDS = float(os.getenv("QUEUE_RETRY_BACKOFF_SECONDS", 30))
+    QUEUE_POLL_SECONDS = float(os.getenv("QUEUE_POLL_SECONDS", 1.0))
+    
+    # Similar-call lookup (see app/embeddings.py). "hashed" embeds offline
+    # with hashed word/bigram counts; "onnx" runs a sentence-transformers
+    # ONNX export (model.onnx + tokenizer.json in EMBEDDING_MODEL_DIR) on
+    # the CPU; "off" stores no embeddings. Run `python -m app.similar
+    # backfill` after switching.
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "hashed")
+    EMBEDDING_MODEL_DIR = os.getenv("EMBEDDING_MODEL_DIR", "")
+    # Vector size of the hashed embedder (ONNX models fix their own)
+    EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", 256))
+    # Memory-mapped index snapshots (default: "embeddings" next to the DB),
+    # rebuilt once this many calls were embedded since the last one
+    EMBEDDING_INDEX_DIR = os.getenv("EMBEDDING_INDEX_DIR", "")
+    EMBEDDING_REBUILD_EVERY = int(os.getenv("EMBEDDING_REBUILD_EVERY", 5000))
+    # Snapshots this large use an IVF index (sqrt(n) k-means lists, the
+    # NPROBE closest searched) instead of brute force
+    EMBEDDING_IVF_MIN_VECTORS = int(os.getenv("EMBEDDING_IVF_MIN_VECTORS", 200_000))
+    EMBEDDING_IVF_NPROBE = int(os.getenv("EMBEDDING_IVF_NPROBE", 32))
+    
+    # Transcript search ranks only the newest this-many matches of a
+    # query (0 ranks all); bounds the cost of very common words
+    SEARCH_MAX_CANDIDATES = int(os.getenv("SEARCH_MAX_CANDIDATES", 10000))
+    
     # CORS
     ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "http://localhost:5173").split(",")
     
+    # Operational-risk model: retrain in the background after this many
+    # inserted/deleted calls, or once the model is older than the max age
+    RISK_RETRAIN_EVERY = int(os.getenv("RISK_RETRAIN_EVERY", 25))
+    RISK_MAX_AGE_SECONDS = int(os.getenv("RISK_MAX_AGE_SECONDS", 3600))
+    
     # Environment
     ENV = os.getenv("ENV", "development")
-    DEBUG = ENV == "development"
\ No newline at end of file
+    DEBUG = ENV == "development"
+    
+    # Load Whisper/Ollama/scikit-learn at startup instead of on first use
+    PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "0") == "1"
+    
+    # Run a queue consumer inside the API process. Off by default outside
+    # development, where run.py starts `python -m app.worker` next to the
+    # API workers instead.
+    EMBEDDED_WORKER = os.getenv("EMBEDDED_WORKER", "1" if DEBUG else "0") == "1"
\ No newline at end of file
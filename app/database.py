@@ -1,25 +1,173 @@
+import os
+import re
+import sys
+import html
 import sqlite3
+import json
+import zlib
+import base64
+import logging
+import threading
 from contextlib import contextmanager
 
-DB_PATH = "data/support_calls.db"
+from app.config import Config
+
+DB_PATH = Config.DB_PATH
+
+logger = logging.getLogger(__name__)
 
 
 # -----------------------------
 # Connection handling
 # -----------------------------
+# One long-lived connection per thread (and process, and DB_PATH). Reusing
+# it skips the connect + PRAGMA cost on every query and keeps sqlite3's
+# prepared-statement cache warm across requests.
+_local = threading.local()
+
+
+def _connect(path: str):
+    conn = sqlite3.connect(path, timeout=Config.DB_BUSY_TIMEOUT_MS / 1000, cached_statements=256)
+    conn.row_factory = sqlite3.Row
+    # WAL lets readers run alongside the single writer; NORMAL sync is
+    # durable across application crashes (not power loss) in WAL mode
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={int(Config.DB_BUSY_TIMEOUT_MS)}")
+    conn.execute(f"PRAGMA mmap_size={int(Config.DB_MMAP_SIZE)}")
+    # Used by the search index to read the compressed transcripts
+    conn.create_function("unpack_transcript", 1, unpack_transcript, deterministic=True)
+    return conn
+
+
 @contextmanager
 def get_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    """
+    The calling thread's connection. Callers commit their own writes;
+    anything left uncommitted when the outermost block exits is rolled
+    back so the next user starts clean.
+    """
+    key = (os.getpid(), DB_PATH)
+    if getattr(_local, "key", None) != key:
+        _local.conn = _connect(DB_PATH)
+        _local.key = key
+        _local.depth = 0
+
+    conn = _local.conn
+    _local.depth += 1
     try:
         yield conn
     finally:
+        _local.depth -= 1
+        if _local.depth == 0 and conn.in_transaction:
+            conn.rollback()
+
+
+def close_connection():
+    """Close this thread's connection (e.g. before a thread exits)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
         conn.close()
+        _local.conn = _local.key = None
 
 
 # -----------------------------
 # Init DB
 # -----------------------------
+# Splits {call}.issue_category ("billing,refund"; empty means "other")
+# into call_categories rows. Triggers can't use recursive CTEs, so the
+# list is turned into a JSON array and expanded with json_each.
+CATEGORY_INSERT_SQL = """
+    INSERT OR IGNORE INTO call_categories (call_id, category, created_at, call_outcome)
+    SELECT {call}.id, TRIM(labels.value), {call}.created_at, {call}.call_outcome
+    FROM {tables}json_each(
+        '["' || REPLACE(
+            REPLACE(REPLACE(COALESCE(NULLIF({call}.issue_category, ''), 'other'), '\\', '\\\\'), '"', '\\"'),
+            ',', '","'
+        ) || '"]'
+    ) AS labels
+    WHERE TRIM(labels.value) <> ''
+"""
+
+# Per-day counters for every (sentiment, urgency, call_outcome) and
+# (category, call_outcome) combination. NULL labels are stored as ''
+# because primary key columns of WITHOUT ROWID tables can't be NULL.
+ROLLUP_ADD_SQL = """
+    INSERT INTO call_rollups (day, sentiment, urgency, call_outcome, calls)
+    VALUES (
+        date(NEW.created_at), COALESCE(NEW.sentiment, ''),
+        COALESCE(NEW.urgency, ''), COALESCE(NEW.call_outcome, ''), 1
+    )
+    ON CONFLICT (day, sentiment, urgency, call_outcome) DO UPDATE SET calls = calls + 1
+"""
+ROLLUP_REMOVE_SQL = """
+    UPDATE call_rollups SET calls = calls - 1
+    WHERE day = date(OLD.created_at) AND sentiment = COALESCE(OLD.sentiment, '')
+      AND urgency = COALESCE(OLD.urgency, '') AND call_outcome = COALESCE(OLD.call_outcome, '');
+    DELETE FROM call_rollups
+    WHERE day = date(OLD.created_at) AND sentiment = COALESCE(OLD.sentiment, '')
+      AND urgency = COALESCE(OLD.urgency, '') AND call_outcome = COALESCE(OLD.call_outcome, '')
+      AND calls <= 0
+"""
+CATEGORY_ROLLUP_ADD_SQL = """
+    INSERT INTO call_category_rollups (day, category, call_outcome, calls)
+    VALUES (date(NEW.created_at), NEW.category, COALESCE(NEW.call_outcome, ''), 1)
+    ON CONFLICT (day, category, call_outcome) DO UPDATE SET calls = calls + 1
+"""
+CATEGORY_ROLLUP_REMOVE_SQL = """
+    UPDATE call_category_rollups SET calls = calls - 1
+    WHERE day = date(OLD.created_at) AND category = OLD.category
+      AND call_outcome = COALESCE(OLD.call_outcome, '');
+    DELETE FROM call_category_rollups
+    WHERE day = date(OLD.created_at) AND category = OLD.category
+      AND call_outcome = COALESCE(OLD.call_outcome, '') AND calls <= 0
+"""
+# What the rollups should contain, recomputed from the source rows
+ROLLUP_SOURCE_SQL = {
+    "call_rollups": """
+        SELECT date(created_at), COALESCE(sentiment, ''), COALESCE(urgency, ''),
+               COALESCE(call_outcome, ''), COUNT(*)
+        FROM support_calls
+        GROUP BY 1, 2, 3, 4
+    """,
+    "call_category_rollups": """
+        SELECT date(created_at), category, COALESCE(call_outcome, ''), COUNT(*)
+        FROM call_categories
+        GROUP BY 1, 2, 3
+    """,
+}
+
+
+def pack_transcript(transcript: str) -> bytes:
+    return zlib.compress(transcript.encode("utf-8"), 6)
+
+
+def unpack_transcript(blob):
+    return zlib.decompress(blob).decode("utf-8") if blob is not None else None
+
+
+def _migrate_inline_transcripts(cursor, batch_size: int = 1000):
+    """Move transcripts stored inline in support_calls to call_transcripts."""
+    rows = cursor.connection.execute(
+        "SELECT id, transcript FROM support_calls WHERE transcript IS NOT NULL"
+    )
+    while True:
+        batch = rows.fetchmany(batch_size)
+        if not batch:
+            break
+        cursor.executemany(
+            "INSERT OR REPLACE INTO call_transcripts (call_id, transcript) VALUES (?, ?)",
+            [(call_id, pack_transcript(transcript)) for call_id, transcript in batch]
+        )
+
+    if sqlite3.sqlite_version_info >= (3, 35, 0):
+        cursor.execute("ALTER TABLE support_calls DROP COLUMN transcript")
+    else:
+        # The column stays on older SQLite, so this runs on every start;
+        # only rows that still hold a transcript are rewritten
+        cursor.execute("UPDATE support_calls SET transcript = NULL WHERE transcript IS NOT NULL")
+
+
 def init_db():
     with get_connection() as conn:
         cursor = conn.cursor()
@@ -31,8 +179,7 @@ def init_db():
             -- Deduplication
             file_hash TEXT UNIQUE,
 
-            -- Core
-            transcript TEXT,
+            -- Core (the transcript lives in call_transcripts)
 
             -- Analysis
             sentiment TEXT CHECK(sentiment IN ('positive', 'neutral', 'negative')),
@@ -49,12 +196,352 @@ def init_db():
         cursor.execute(
             "CREATE INDEX IF NOT EXISTS idx_created_at ON support_calls(created_at)"
         )
+
+        # Filter + time ordering indexes for keyset pagination.
+        # These supersede the old single-column indexes.
+        cursor.execute("DROP INDEX IF EXISTS idx_outcome")
+        cursor.execute("DROP INDEX IF EXISTS idx_sentiment")
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_outcome_created_at "
+            "ON support_calls(call_outcome, created_at)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sentiment_created_at "
+            "ON support_calls(sentiment, created_at)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_urgency_created_at "
+            "ON support_calls(urgency, created_at)"
+        )
+        # Covers the dashboard's time-window GROUP BYs (distributions and
+        # daily buckets) without touching the table
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_window_covering "
+            "ON support_calls(created_at, sentiment, urgency, call_outcome)"
+        )
+
+        # One row per (call, category) label, kept in sync by triggers.
+        # created_at and call_outcome are copied from the call so
+        # per-category stats for a time window come from the indexes alone.
+        has_categories = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'call_categories'"
+        ).fetchone()
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS call_categories (
+            call_id INTEGER NOT NULL REFERENCES support_calls(id),
+            category TEXT NOT NULL,
+            created_at DATETIME NOT NULL,
+            call_outcome TEXT,
+            PRIMARY KEY (call_id, category)
+        ) WITHOUT ROWID
+        """)
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_call_categories_window "
+            "ON call_categories(created_at, category, call_outcome)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_call_categories_category "
+            "ON call_categories(category, created_at, call_id)"
+        )
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_support_calls_insert_categories
+        AFTER INSERT ON support_calls
+        BEGIN
+            {CATEGORY_INSERT_SQL.format(call="NEW", tables="")};
+        END
+        """)
+        cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_support_calls_delete_categories
+        AFTER DELETE ON support_calls
+        BEGIN
+            DELETE FROM call_categories WHERE call_id = OLD.id;
+        END
+        """)
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_support_calls_update_categories
+        AFTER UPDATE OF issue_category, call_outcome, created_at ON support_calls
+        BEGIN
+            DELETE FROM call_categories WHERE call_id = OLD.id;
+            {CATEGORY_INSERT_SQL.format(call="NEW", tables="")};
+        END
+        """)
+        if not has_categories:
+            # Migrate existing comma-joined labels
+            cursor.execute(
+                CATEGORY_INSERT_SQL.format(call="support_calls", tables="support_calls, ")
+            )
+
+        # Pre-aggregated daily counters behind /calls/summary and the
+        # dashboard, kept in step with support_calls / call_categories by
+        # triggers (see rebuild_rollups to reconcile them)
+        has_rollups = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'call_rollups'"
+        ).fetchone()
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS call_rollups (
+            day TEXT NOT NULL,
+            sentiment TEXT NOT NULL,
+            urgency TEXT NOT NULL,
+            call_outcome TEXT NOT NULL,
+            calls INTEGER NOT NULL,
+            PRIMARY KEY (day, sentiment, urgency, call_outcome)
+        ) WITHOUT ROWID
+        """)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS call_category_rollups (
+            day TEXT NOT NULL,
+            category TEXT NOT NULL,
+            call_outcome TEXT NOT NULL,
+            calls INTEGER NOT NULL,
+            PRIMARY KEY (day, category, call_outcome)
+        ) WITHOUT ROWID
+        """)
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_support_calls_insert_rollups
+        AFTER INSERT ON support_calls
+        BEGIN
+            {ROLLUP_ADD_SQL};
+        END
+        """)
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_support_calls_delete_rollups
+        AFTER DELETE ON support_calls
+        BEGIN
+            {ROLLUP_REMOVE_SQL};
+        END
+        """)
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_support_calls_update_rollups
+        AFTER UPDATE OF sentiment, urgency, call_outcome, created_at ON support_calls
+        BEGIN
+            {ROLLUP_REMOVE_SQL};
+            {ROLLUP_ADD_SQL};
+        END
+        """)
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_call_categories_insert_rollups
+        AFTER INSERT ON call_categories
+        BEGIN
+            {CATEGORY_ROLLUP_ADD_SQL};
+        END
+        """)
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_call_categories_delete_rollups
+        AFTER DELETE ON call_categories
+        BEGIN
+            {CATEGORY_ROLLUP_REMOVE_SQL};
+        END
+        """)
+        if not has_rollups:
+            _fill_rollups(cursor)
+
+        # zlib-compressed transcripts, one per call, kept out of
+        # support_calls so scans over the label columns stay small
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS call_transcripts (
+            call_id INTEGER PRIMARY KEY REFERENCES support_calls(id),
+            transcript BLOB NOT NULL
+        )
+        """)
+        columns = {r["name"] for r in cursor.execute("PRAGMA table_info(support_calls)")}
+        if "transcript" in columns:
+            _migrate_inline_transcripts(cursor)
+
+        # Full-text index over the transcripts. It stores only the index:
+        # snippets read the text back through a view that decompresses
+        # call_transcripts, which needs the unpack_transcript() function
+        # every connection registers (see _connect).
+        #
+        # NOTE: the triggers below call unpack_transcript() too, so any
+        # write to call_transcripts from a connection that didn't register
+        # it (the sqlite3 shell, a plain sqlite3.connect()) fails with "no
+        # such function: unpack_transcript". Edit these tables through
+        # app.database (_connect / get_connection / delete_call_by_id), or
+        # re-run `python -m app.database rebuild-search` after hand edits
+        # made with the triggers dropped.
+        cursor.execute("""
+        CREATE VIEW IF NOT EXISTS call_transcript_text AS
+        SELECT call_id, unpack_transcript(transcript) AS transcript
+        FROM call_transcripts
+        """)
+        has_search = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'call_search'"
+        ).fetchone()
+        cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS call_search USING fts5(
+            transcript,
+            content = 'call_transcript_text',
+            content_rowid = 'call_id',
+            tokenize = 'porter unicode61 remove_diacritics 2'
+        )
+        """)
+        cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_call_transcripts_insert_search
+        AFTER INSERT ON call_transcripts
+        BEGIN
+            INSERT INTO call_search (rowid, transcript)
+            VALUES (NEW.call_id, unpack_transcript(NEW.transcript));
+        END
+        """)
+        cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_call_transcripts_delete_search
+        AFTER DELETE ON call_transcripts
+        BEGIN
+            INSERT INTO call_search (call_search, rowid, transcript)
+            VALUES ('delete', OLD.call_id, unpack_transcript(OLD.transcript));
+        END
+        """)
+        cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_call_transcripts_update_search
+        AFTER UPDATE OF transcript ON call_transcripts
+        BEGIN
+            INSERT INTO call_search (call_search, rowid, transcript)
+            VALUES ('delete', OLD.call_id, unpack_transcript(OLD.transcript));
+            INSERT INTO call_search (rowid, transcript)
+            VALUES (NEW.call_id, unpack_transcript(NEW.transcript));
+        END
+        """)
+        if not has_search:
+            # Index the transcripts stored before the table existed
+            cursor.execute("INSERT INTO call_search (call_search) VALUES ('rebuild')")
+
+        # Transcript embedding per call for similar-call lookup (see
+        # app.embeddings): int8 components times `scale`, plus the
+        # embedder that produced them. embedded_seq numbers the rows in
+        # the order they were written, which is not call_id order once
+        # calls are embedded after they were stored (app.similar).
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS call_embeddings (
+            call_id INTEGER PRIMARY KEY REFERENCES support_calls(id),
+            model TEXT NOT NULL,
+            scale REAL NOT NULL,
+            vector BLOB NOT NULL,
+            embedded_seq INTEGER
+        )
+        """)
+        columns = {r["name"] for r in cursor.execute("PRAGMA table_info(call_embeddings)")}
+        if "embedded_seq" not in columns:
+            cursor.execute("ALTER TABLE call_embeddings ADD COLUMN embedded_seq INTEGER")
+            cursor.execute("UPDATE call_embeddings SET embedded_seq = call_id")
         cursor.execute(
-            "CREATE INDEX IF NOT EXISTS idx_outcome ON support_calls(call_outcome)"
+            "CREATE INDEX IF NOT EXISTS idx_call_embeddings_seq ON call_embeddings(embedded_seq)"
         )
+
+        # Timestamped transcript segments, in time order. speaker is the
+        # SPEAKER_CHANNELS label of the channel, NULL for mixed audio.
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS call_segments (
+            call_id INTEGER NOT NULL REFERENCES support_calls(id),
+            seq INTEGER NOT NULL,
+            start_time REAL,
+            end_time REAL,
+            text TEXT,
+            speaker TEXT,
+            PRIMARY KEY (call_id, seq)
+        )
+        """)
+        columns = {r["name"] for r in cursor.execute("PRAGMA table_info(call_segments)")}
+        if "speaker" not in columns:
+            cursor.execute("ALTER TABLE call_segments ADD COLUMN speaker TEXT")
+
+        # Change counter, bumped on every insert/delete so derived
+        # state (e.g. the risk model) can tell how stale it is.
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS table_versions (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+        """)
         cursor.execute(
-            "CREATE INDEX IF NOT EXISTS idx_sentiment ON support_calls(sentiment)"
+            "INSERT OR IGNORE INTO table_versions (table_name, version) "
+            "VALUES ('support_calls', 0)"
         )
+        for event in ("INSERT", "DELETE"):
+            cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_support_calls_{event.lower()}_version
+            AFTER {event} ON support_calls
+            BEGIN
+                UPDATE table_versions SET version = version + 1
+                WHERE table_name = 'support_calls';
+            END
+            """)
+
+        # Batch job queue (see app/jobs.py). Times are unix epoch seconds.
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            created_at REAL NOT NULL
+        )
+        """)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS job_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id TEXT NOT NULL REFERENCES jobs(id),
+            filename TEXT,
+            file_path TEXT,
+            file_hash TEXT,
+
+            -- queued | transcribing | classifying | success | duplicate | failed | dead
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            available_at REAL NOT NULL DEFAULT 0,
+            lease_owner TEXT,
+            lease_expires_at REAL,
+
+            call_id INTEGER,
+            error TEXT,
+            started_at REAL,
+            finished_at REAL
+        )
+        """)
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_job_items_job ON job_items(job_id)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_job_items_claim "
+            "ON job_items(status, available_at)"
+        )
+
+        # LLM classification cache (see app/llm_cache.py)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            result TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_hit_at REAL NOT NULL
+        )
+        """)
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_llm_cache_last_hit ON llm_cache(last_hit_at)"
+        )
+
+        # Persisted operational-risk model + cached result
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS risk_models (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            data_version INTEGER NOT NULL,
+            trained_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            result TEXT NOT NULL,
+            model BLOB NOT NULL
+        )
+        """)
+
+        # Which tier labelled each call: 'llm', 'preclassifier', or
+        # 'fallback' for canned defaults (NULL: stored before this column
+        # existed). The pre-classifier only trains on 'llm' labels.
+        columns = {r["name"] for r in cursor.execute("PRAGMA table_info(support_calls)")}
+        if "classified_by" not in columns:
+            cursor.execute("ALTER TABLE support_calls ADD COLUMN classified_by TEXT")
+
+        # Persisted first-tier classifier + its holdout evaluation
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS preclassifier_models (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            trained_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            metrics TEXT NOT NULL,
+            model BLOB NOT NULL
+        )
+        """)
 
         conn.commit()
 
@@ -76,14 +563,7 @@ def call_exists(file_hash: str):
 # -----------------------------
 # Insert call
 # -----------------------------
-def insert_call(file_hash, transcript, insights):
-    """
-    Insert a call analysis into the database.
-
-    - Handles multi-label issue_category safely
-    - Defensively normalizes data
-    """
-
+def _call_row(file_hash, insights):
     # ✅ Normalize issue_category HERE (correct place)
     issue_category = insights.get("issue_category", ["other"])
     if isinstance(issue_category, list):
@@ -93,94 +573,560 @@ def insert_call(file_hash, transcript, insights):
     else:
         issue_category = "other"
 
+    # 'llm' only for a parsed, validated model reply; guard defaults,
+    # unparseable replies and validation failures are 'fallback'
+    classified_by = {
+        "ok": "llm",
+        "preclassified": "preclassifier",
+    }.get(insights.get("_llm_status"), "fallback")
+
+    return (
+        file_hash,
+        insights.get("sentiment"),
+        issue_category,
+        insights.get("urgency"),
+        insights.get("agent_behavior"),
+        insights.get("call_outcome"),
+        classified_by,
+    )
+
+
+INSERT_CALL_SQL = """
+    INSERT INTO support_calls (
+        file_hash,
+        sentiment,
+        issue_category,
+        urgency,
+        agent_behavior,
+        call_outcome,
+        classified_by
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def insert_call(file_hash, transcript, insights, segments=None, embed=False):
+    """
+    Insert a call analysis into the database.
+
+    - Handles multi-label issue_category safely
+    - Defensively normalizes data
+    - Stores timestamped segments (if any) in the same transaction
+    - Stores the transcript embedding too when `embed` is set
+    """
+    return insert_calls([{
+        "file_hash": file_hash,
+        "transcript": transcript,
+        "insights": insights,
+        "segments": segments,
+    }], embed=embed)[0]
+
+
+# Writers are serialized, so MAX + 1 under the write lock always
+# numbers rows in commit order
+INSERT_EMBEDDING_SQL = """
+    INSERT OR REPLACE INTO call_embeddings (call_id, model, scale, vector, embedded_seq)
+    VALUES (?, ?, ?, ?, (SELECT COALESCE(MAX(embedded_seq), 0) + 1 FROM call_embeddings))
+"""
+
+
+def _embed_transcripts(transcripts: list) -> list:
+    """
+    call_embeddings values per transcript (None where skipped). A failing
+    embedder never blocks the insert; `python -m app.similar backfill`
+    fills the gaps later.
+    """
+    if Config.EMBEDDING_BACKEND == "off":
+        return [None] * len(transcripts)
+    try:
+        from app.embeddings import encode
+        return encode(transcripts)
+    except Exception:
+        logger.exception("Embedding transcripts failed; storing the calls without vectors")
+        return [None] * len(transcripts)
+
+
+def insert_calls(calls: list, embed: bool = False) -> list:
+    """
+    Insert many analyzed calls in one transaction.
+
+    `calls` holds dicts with file_hash, transcript, insights and optional
+    segments. Returns one insert_call()-style result per entry, in order;
+    a duplicate or invalid row is skipped without failing the others.
+
+    `embed` also stores each transcript's embedding. Loading the embedder
+    pulls in scikit-learn (or onnxruntime), so only queue consumers set
+    it; API workers leave it off and the consumers' index maintenance
+    (app.similar.embed_missing) embeds those calls shortly after.
+    """
+    results = []
+    if embed:
+        embeddings = _embed_transcripts([call["transcript"] for call in calls])
+    else:
+        embeddings = [None] * len(calls)
     try:
         with get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO support_calls (
-                    file_hash,
-                    transcript,
-                    sentiment,
-                    issue_category,
-                    urgency,
-                    agent_behavior,
-                    call_outcome
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                file_hash,
-                transcript,
-                insights.get("sentiment"),
-                issue_category,
-                insights.get("urgency"),
-                insights.get("agent_behavior"),
-                insights.get("call_outcome"),
-            ))
-            conn.commit()
-            return {"inserted": True, "id": cursor.lastrowid}
+            for call, embedding in zip(calls, embeddings):
+                try:
+                    cursor.execute(
+                        INSERT_CALL_SQL, _call_row(call["file_hash"], call["insights"])
+                    )
+                except sqlite3.IntegrityError as e:
+                    if "UNIQUE" in str(e):
+                        results.append({"inserted": False, "reason": "duplicate"})
+                    else:
+                        results.append({"inserted": False, "reason": "db_error", "error": str(e)})
+                    continue
 
-    except sqlite3.IntegrityError:
-        return {"inserted": False, "reason": "duplicate"}
+                call_id = cursor.lastrowid
+                if call["transcript"] is not None:
+                    cursor.execute(
+                        "INSERT INTO call_transcripts (call_id, transcript) VALUES (?, ?)",
+                        (call_id, pack_transcript(call["transcript"]))
+                    )
+                if embedding is not None:
+                    cursor.execute(INSERT_EMBEDDING_SQL, (call_id, *embedding))
+                if call.get("segments"):
+                    cursor.executemany("""
+                        INSERT INTO call_segments (call_id, seq, start_time, end_time, text, speaker)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    """, [
+                        (
+                            call_id, seq, seg.get("start"), seg.get("end"),
+                            seg.get("text"), seg.get("speaker"),
+                        )
+                        for seq, seg in enumerate(call["segments"])
+                    ])
+                results.append({"inserted": True, "id": call_id})
+
+            conn.commit()
+            return results
 
     except Exception as e:
-        return {"inserted": False, "reason": "db_error", "error": str(e)}
+        return [{"inserted": False, "reason": "db_error", "error": str(e)} for _ in calls]
 
 
 # -----------------------------
 # Fetch calls
 # -----------------------------
-def fetch_all_calls():
+CALL_FIELDS = (
+    "id",
+    "transcript",
+    "sentiment",
+    "issue_category",
+    "urgency",
+    "agent_behavior",
+    "call_outcome",
+    "created_at",
+)
+
+# Always returned: needed to build the next cursor
+REQUIRED_FIELDS = ("id", "created_at")
+
+
+def encode_cursor(created_at: str, call_id: int) -> str:
+    raw = json.dumps([created_at, call_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, call_id = json.loads(base64.urlsafe_b64decode(padded))
+        return str(created_at), int(call_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _to_iso(created_at):
+    # SQLite stores "YYYY-MM-DD HH:MM:SS" in UTC
+    if not created_at:
+        return created_at
+    return created_at.replace(" ", "T") + "Z"
+
+
+def fetch_calls(
+    limit=None,
+    cursor=None,
+    sentiment=None,
+    urgency=None,
+    outcome=None,
+    category=None,
+    start_date=None,
+    end_date=None,
+    fields=None,
+):
+    """
+    Keyset-paginated call listing, newest first.
+
+    - Pages on (created_at, id) so every page is an index range scan
+    - Filters are pushed into SQL
+    - `fields` limits the selected columns (e.g. skip transcripts)
+
+    Returns {"items": [...], "next_cursor": str | None}.
+    """
+    if fields:
+        unknown = set(fields) - set(CALL_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        columns = [f for f in CALL_FIELDS if f in fields or f in REQUIRED_FIELDS]
+    else:
+        columns = list(CALL_FIELDS)
+
+    conditions = []
+    params = []
+
+    # With a category filter, walk that category's (created_at, call_id)
+    # index in order and join each call, instead of sorting matches
+    if category:
+        source = (
+            "call_categories AS cc "
+            "CROSS JOIN support_calls ON support_calls.id = cc.call_id"
+        )
+        time_column, id_column = "cc.created_at", "cc.call_id"
+        conditions.append("cc.category = ?")
+        params.append(category)
+    else:
+        source = "support_calls"
+        time_column, id_column = "support_calls.created_at", "support_calls.id"
+
+    for column, value in (
+        ("sentiment", sentiment),
+        ("urgency", urgency),
+        ("call_outcome", outcome),
+    ):
+        if value:
+            conditions.append(f"support_calls.{column} = ?")
+            params.append(value)
+
+    if start_date:
+        conditions.append(f"{time_column} >= ?")
+        params.append(str(start_date))
+
+    if end_date:
+        conditions.append(f"{time_column} < date(?, '+1 day')")
+        params.append(str(end_date))
+
+    if cursor:
+        conditions.append(f"({time_column}, {id_column}) < (?, ?)")
+        params.extend(decode_cursor(cursor))
+
+    # Transcripts are joined per returned row only
+    if "transcript" in columns:
+        source += " LEFT JOIN call_transcripts AS ct ON ct.call_id = support_calls.id"
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    query = f"""
+        SELECT {', '.join(
+            'ct.transcript' if c == 'transcript' else f'support_calls.{c}' for c in columns
+        )}
+        FROM {source}
+        {where}
+        ORDER BY {time_column} DESC, {id_column} DESC
+    """
+
+    if limit:
+        # Fetch one extra row to know whether another page exists
+        query += " LIMIT ?"
+        params.append(limit + 1)
+
     try:
         with get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT
-                    id,
-                    transcript,
-                    sentiment,
-                    issue_category,
-                    urgency,
-                    agent_behavior,
-                    call_outcome,
-                    REPLACE(created_at, ' ', 'T') || 'Z' as created_at
-                FROM support_calls
-                ORDER BY created_at DESC
-            """)
-            return [dict(row) for row in cursor.fetchall()]
+            rows = conn.execute(query, params).fetchall()
     except sqlite3.OperationalError as e:
         if "no such table" in str(e):
-            return []
+            return {"items": [], "next_cursor": None}
         raise
 
+    next_cursor = None
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last["created_at"], last["id"])
+
+    items = []
+    for row in rows:
+        item = dict(row)
+        item["created_at"] = _to_iso(item["created_at"])
+        if "transcript" in item:
+            item["transcript"] = unpack_transcript(item["transcript"])
+        items.append(item)
+
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def fetch_all_calls():
+    return fetch_calls()["items"]
+
+
+def fetch_call(call_id: int):
+    """One call with its transcript, or None."""
+    with get_connection() as conn:
+        row = conn.execute(f"""
+            SELECT {', '.join(
+                'ct.transcript' if c == 'transcript' else f'support_calls.{c}' for c in CALL_FIELDS
+            )}
+            FROM support_calls
+            LEFT JOIN call_transcripts AS ct ON ct.call_id = support_calls.id
+            WHERE support_calls.id = ?
+        """, (call_id,)).fetchone()
+
+    if not row:
+        return None
+
+    call = dict(row)
+    call["created_at"] = _to_iso(call["created_at"])
+    call["transcript"] = unpack_transcript(call["transcript"])
+    return call
+
+
+# -----------------------------
+# Search
+# -----------------------------
+# Quoted phrases, or words with an optional trailing * for prefix search
+_SEARCH_TERM = re.compile(r'"([^"]*)"|([\w\']+)(\*?)')
+
+
+def search_query(q: str) -> str:
+    """
+    Turn user input into an FTS5 query: every word or "quoted phrase"
+    must match, `refund*` matches by prefix. FTS5 operators and syntax
+    in the input are treated as plain text.
+    """
+    terms = []
+    for phrase, word, prefix in _SEARCH_TERM.findall(q or ""):
+        text = (phrase or word).replace('"', "").strip()
+        if text:
+            terms.append(f'"{text}"{prefix}')
+    if not terms:
+        raise ValueError("Search query has no words")
+    return " ".join(terms)
+
+
+def _snippet_html(snippet):
+    # The match markers are control characters until the text is escaped
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace("\x02", "<mark>").replace("\x03", "</mark>")
+
+
+def search_calls(
+    q: str,
+    limit: int = 20,
+    offset: int = 0,
+    sentiment=None,
+    urgency=None,
+    outcome=None,
+    category=None,
+    start_date=None,
+    end_date=None,
+):
+    """
+    Calls whose transcript matches `q`, best match first (BM25).
+
+    Each item has the call's labels, `score` (lower is better) and
+    `snippet`, an HTML-escaped excerpt with matches in <mark> tags.
+    Ranking only touches the index; transcripts are decompressed for
+    the returned page alone, to build the snippets.
+
+    Only the newest SEARCH_MAX_CANDIDATES matches inside the date range
+    are ranked and filtered (0 ranks all of them), which keeps very
+    common words fast. When that cap cut off matches and the filters
+    leave a short page, the search is repeated over every match, so a
+    selective filter still finds older calls.
+    """
+    match = search_query(q)
+    conditions = []
+    filter_params = []
+
+    for column, value in (
+        ("sentiment", sentiment),
+        ("urgency", urgency),
+        ("call_outcome", outcome),
+    ):
+        if value:
+            conditions.append(f"support_calls.{column} = ?")
+            filter_params.append(value)
+
+    if category:
+        conditions.append(
+            "EXISTS (SELECT 1 FROM call_categories AS cc "
+            "WHERE cc.call_id = support_calls.id AND cc.category = ?)"
+        )
+        filter_params.append(category)
+
+    date_conditions = []
+    date_params = []
+    if start_date:
+        date_conditions.append("created_at >= ?")
+        date_params.append(str(start_date))
+
+    if end_date:
+        date_conditions.append("created_at < date(?, '+1 day')")
+        date_params.append(str(end_date))
+
+    conditions.extend(f"support_calls.{c}" for c in date_conditions)
+    filter_params.extend(date_params)
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    columns = [c for c in CALL_FIELDS if c != "transcript"]
+    # Scoring and joining every match of a common word is linear in the
+    # number of matches, so only the newest `cap` matches (highest ids)
+    # are scored, filtered and ranked. A date range becomes a rowid
+    # range inside the candidates, so the cap applies to matches within
+    # it rather than to the newest calls overall.
+    query = f"""
+        WITH candidates AS (
+            SELECT rowid AS id, bm25(call_search) AS score
+            FROM call_search
+            WHERE call_search MATCH ? AND rowid BETWEEN ? AND ?
+            ORDER BY rowid DESC
+            LIMIT ?
+        )
+        SELECT {', '.join(f'support_calls.{c}' for c in columns)}, candidates.score
+        FROM candidates
+        CROSS JOIN support_calls ON support_calls.id = candidates.id
+        {where}
+        ORDER BY candidates.score, candidates.id DESC
+        LIMIT ? OFFSET ?
+    """
+    cap = Config.SEARCH_MAX_CANDIDATES or -1
+
+    with get_connection() as conn:
+        low, high = 0, sys.maxsize
+        if date_conditions:
+            # idx_created_at covers this, so it reads the range's index
+            # entries only
+            low, high = conn.execute(f"""
+                SELECT MIN(id), MAX(id) FROM support_calls
+                WHERE {' AND '.join(date_conditions)}
+            """, date_params).fetchone()
+            if low is None:
+                return []
+
+        rows = conn.execute(query, [match, low, high, cap, *filter_params, limit, offset]).fetchall()
+        if len(rows) < limit and cap > 0:
+            matched = conn.execute("""
+                SELECT COUNT(*) FROM (
+                    SELECT 1 FROM call_search
+                    WHERE call_search MATCH ? AND rowid BETWEEN ? AND ?
+                    LIMIT ?
+                )
+            """, (match, low, high, cap + 1)).fetchone()[0]
+            if matched > cap:
+                rows = conn.execute(
+                    query, [match, low, high, -1, *filter_params, limit, offset]
+                ).fetchall()
+        if not rows:
+            return []
+
+        ids = [row["id"] for row in rows]
+        snippets = dict(conn.execute(f"""
+            SELECT rowid, snippet(call_search, 0, char(2), char(3), '…', 16)
+            FROM call_search
+            WHERE call_search MATCH ? AND rowid IN ({', '.join('?' * len(ids))})
+        """, [match, *ids]).fetchall())
+
+    items = []
+    for row in rows:
+        item = dict(row)
+        item["created_at"] = _to_iso(item["created_at"])
+        item["score"] = round(item["score"], 4)
+        item["snippet"] = _snippet_html(snippets.get(item["id"]))
+        items.append(item)
+    return items
+
+
+# -----------------------------
+# Segments
+# -----------------------------
+def fetch_call_segments(call_id: int):
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT start_time AS start, end_time AS end, text, speaker
+            FROM call_segments
+            WHERE call_id = ?
+            ORDER BY seq
+        """, (call_id,))
+        return [dict(row) for row in cursor.fetchall()]
+
+
+# -----------------------------
+# Rollups
+# -----------------------------
+def _fill_rollups(cursor):
+    for table, source in ROLLUP_SOURCE_SQL.items():
+        cursor.execute(f"DELETE FROM {table}")
+        cursor.execute(f"INSERT INTO {table} {source}")
+
+
+def rebuild_rollups(check_only: bool = False) -> dict:
+    """
+    Recompute call_categories and the rollup tables from support_calls in
+    one transaction, reporting how many rollup rows had drifted.
+
+    With `check_only` nothing is written.
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        report = {}
+        for table, source in ROLLUP_SOURCE_SQL.items():
+            expected = {row[:-1]: row[-1] for row in cursor.execute(source)}
+            stored = {
+                tuple(row)[:-1]: row[-1] for row in cursor.execute(f"SELECT * FROM {table}")
+            }
+            report[table] = {
+                "rows": len(expected),
+                "drifted": sum(
+                    expected.get(key) != stored.get(key) for key in expected.keys() | stored.keys()
+                ),
+            }
+
+        if not check_only:
+            cursor.execute("DELETE FROM call_categories")
+            cursor.execute(
+                CATEGORY_INSERT_SQL.format(call="support_calls", tables="support_calls, ")
+            )
+            _fill_rollups(cursor)
+            conn.commit()
+
+        return report
+
 
 # -----------------------------
 # Summary
 # -----------------------------
 def fetch_summary():
+    """All-time distributions, summed from the daily rollups."""
     try:
         with get_connection() as conn:
             cursor = conn.cursor()
 
-            cursor.execute(
-                "SELECT sentiment, COUNT(*) FROM support_calls GROUP BY sentiment"
-            )
-            sentiment = dict(cursor.fetchall())
-
-            cursor.execute(
-                "SELECT urgency, COUNT(*) FROM support_calls GROUP BY urgency"
-            )
-            urgency = dict(cursor.fetchall())
-
-            cursor.execute(
-                "SELECT call_outcome, COUNT(*) FROM support_calls GROUP BY call_outcome"
-            )
-            outcome = dict(cursor.fetchall())
+            cursor.execute("""
+                SELECT sentiment, urgency, call_outcome, SUM(calls)
+                FROM call_rollups
+                GROUP BY sentiment, urgency, call_outcome
+            """)
 
-            return {
-                "sentiment_distribution": sentiment,
-                "urgency_distribution": urgency,
-                "call_outcome_distribution": outcome
+            summary = {
+                "sentiment_distribution": {},
+                "urgency_distribution": {},
+                "call_outcome_distribution": {}
             }
+            for sentiment, urgency, outcome, count in cursor.fetchall():
+                for key, value in (
+                    ("sentiment_distribution", sentiment),
+                    ("urgency_distribution", urgency),
+                    ("call_outcome_distribution", outcome),
+                ):
+                    dist = summary[key]
+                    value = value or None
+                    dist[value] = dist.get(value, 0) + count
+
+            return summary
     except sqlite3.OperationalError as e:
         if "no such table" in str(e):
             return {
@@ -191,12 +1137,307 @@ def fetch_summary():
         raise
 
 
+# -----------------------------
+# Overview (dashboard aggregates)
+# -----------------------------
+OVERVIEW_WINDOWS = {
+    "7d": "-7 days",
+    "30d": "-30 days",
+    "all": None,
+}
+
+def _empty_overview(window: str):
+    return {
+        "window": window,
+        "total_calls": 0,
+        "resolved_calls": 0,
+        "resolution_rate": 0,
+        "sentiment_distribution": {},
+        "urgency_distribution": {},
+        "call_outcome_distribution": {},
+        "categories": [],
+        "daily": [],
+        "week_over_week": {
+            "last_7_days": 0,
+            "previous_7_days": 0,
+            "volume_trend": 0
+        }
+    }
+
+
+def fetch_overview(window: str = "7d"):
+    """
+    Dashboard aggregates for a time window, computed in SQL.
+
+    Whole days are read from the rollup tables; only the partial day at
+    the start of a 7d/30d window is counted from the (covering) indexes.
+    The payload size depends on the number of days and categories,
+    never on the number of calls.
+    """
+    if window not in OVERVIEW_WINDOWS:
+        raise ValueError(f"Unknown window: {window}")
+
+    modifier = OVERVIEW_WINDOWS[window]
+    overview = _empty_overview(window)
+
+    try:
+        with get_connection() as conn:
+            cursor = conn.cursor()
+
+            # Rows from `cutoff` up to `full_day` come from the base tables,
+            # days from `full_day` on from the rollups. For "all" both are
+            # '' so everything comes from the rollups.
+            if modifier:
+                cutoff, full_day = cursor.execute(
+                    "SELECT datetime('now', ?), date('now', ?, '+1 day')",
+                    (modifier, modifier)
+                ).fetchone()
+            else:
+                cutoff = full_day = ""
+            params = {"cutoff": cutoff, "full_day": full_day}
+
+            window_rows = """
+                SELECT day, NULLIF(sentiment, '') AS sentiment, NULLIF(urgency, '') AS urgency,
+                       NULLIF(call_outcome, '') AS call_outcome, calls
+                FROM call_rollups
+                WHERE day >= :full_day
+                UNION ALL
+                SELECT date(created_at), sentiment, urgency, call_outcome, 1
+                FROM support_calls INDEXED BY idx_window_covering
+                WHERE created_at >= :cutoff AND created_at < :full_day
+            """
+
+            cursor.execute(f"""
+                SELECT sentiment, urgency, call_outcome, SUM(calls)
+                FROM ({window_rows})
+                GROUP BY sentiment, urgency, call_outcome
+            """, params)
+
+            for sentiment, urgency, outcome, count in cursor.fetchall():
+                for key, value in (
+                    ("sentiment_distribution", sentiment),
+                    ("urgency_distribution", urgency),
+                    ("call_outcome_distribution", outcome),
+                ):
+                    dist = overview[key]
+                    dist[value] = dist.get(value, 0) + count
+                overview["total_calls"] += count
+
+            total = overview["total_calls"]
+            resolved = overview["call_outcome_distribution"].get("resolved", 0)
+            overview["resolved_calls"] = resolved
+            overview["resolution_rate"] = round(resolved / total * 100) if total else 0
+
+            # Per-category counts and resolution rates
+            cursor.execute("""
+                SELECT
+                    category,
+                    SUM(calls) AS count,
+                    SUM(CASE WHEN call_outcome = 'resolved' THEN calls ELSE 0 END) AS resolved
+                FROM (
+                    SELECT category, call_outcome, calls
+                    FROM call_category_rollups
+                    WHERE day >= :full_day
+                    UNION ALL
+                    SELECT category, call_outcome, 1
+                    FROM call_categories INDEXED BY idx_call_categories_window
+                    WHERE created_at >= :cutoff AND created_at < :full_day
+                )
+                GROUP BY category
+                ORDER BY count DESC, category
+            """, params)
+
+            overview["categories"] = [
+                {
+                    "name": category,
+                    "count": count,
+                    "resolved": resolved,
+                    "resolution_rate": round(resolved / count * 100) if count else 0
+                }
+                for category, count, resolved in cursor.fetchall()
+            ]
+
+            # Per-day buckets (UTC days)
+            cursor.execute(f"""
+                SELECT
+                    day,
+                    SUM(calls) AS volume,
+                    SUM(CASE WHEN call_outcome = 'resolved' THEN calls ELSE 0 END) AS resolved
+                FROM ({window_rows})
+                GROUP BY day
+                ORDER BY day
+            """, params)
+
+            overview["daily"] = [
+                {
+                    "day": day,
+                    "volume": volume,
+                    "resolved": resolved,
+                    "unresolved": volume - resolved
+                }
+                for day, volume, resolved in cursor.fetchall()
+            ]
+
+            # Week-over-week volume, independent of the selected window
+            cursor.execute("""
+                SELECT
+                    SUM(created_at >= datetime('now', '-7 days')),
+                    SUM(created_at < datetime('now', '-7 days'))
+                FROM support_calls
+                WHERE created_at >= datetime('now', '-14 days')
+            """)
+            last_week, previous_week = cursor.fetchone()
+            last_week = last_week or 0
+            previous_week = previous_week or 0
+
+            overview["week_over_week"] = {
+                "last_7_days": last_week,
+                "previous_7_days": previous_week,
+                "volume_trend": (
+                    round((last_week - previous_week) / previous_week * 100)
+                    if previous_week else 0
+                )
+            }
+
+            return overview
+    except sqlite3.OperationalError as e:
+        if "no such table" in str(e):
+            return _empty_overview(window)
+        raise
+
+
+# -----------------------------
+# Table versions
+# -----------------------------
+def get_table_version(table_name: str = "support_calls") -> int:
+    try:
+        with get_connection() as conn:
+            row = conn.execute(
+                "SELECT version FROM table_versions WHERE table_name = ?",
+                (table_name,)
+            ).fetchone()
+            return row["version"] if row else 0
+    except sqlite3.OperationalError as e:
+        if "no such table" in str(e):
+            return 0
+        raise
+
+
+# -----------------------------
+# Risk model storage
+# -----------------------------
+def save_risk_model(data_version: int, result: dict, model_blob: bytes) -> int:
+    """
+    Store a trained model and keep only the latest one. An empty
+    `model_blob` stores a result that has no model (insufficient data).
+    """
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO risk_models (data_version, result, model) VALUES (?, ?, ?)",
+            (data_version, json.dumps(result), model_blob)
+        )
+        version = cursor.lastrowid
+        cursor.execute("DELETE FROM risk_models WHERE version < ?", (version,))
+        conn.commit()
+        return version
+
+
+def load_latest_risk_model(include_model: bool = False):
+    """
+    Latest stored model metadata and cached result.
+
+    The pickled model is only loaded when `include_model` is set.
+    """
+    model_column = ", model" if include_model else ""
+    try:
+        with get_connection() as conn:
+            row = conn.execute(f"""
+                SELECT
+                    version,
+                    data_version,
+                    REPLACE(trained_at, ' ', 'T') || 'Z' AS trained_at,
+                    CAST((julianday('now') - julianday(trained_at)) * 86400 AS INTEGER)
+                        AS age_seconds,
+                    result
+                    {model_column}
+                FROM risk_models
+                ORDER BY version DESC
+                LIMIT 1
+            """).fetchone()
+    except sqlite3.OperationalError as e:
+        if "no such table" in str(e):
+            return None
+        raise
+
+    if not row:
+        return None
+
+    stored = dict(row)
+    stored["result"] = json.loads(stored["result"])
+    return stored
+
+
+def save_preclassifier_model(metrics: dict, model_blob: bytes) -> int:
+    """Store a trained pre-classifier and keep only the latest one."""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO preclassifier_models (metrics, model) VALUES (?, ?)",
+            (json.dumps(metrics), model_blob)
+        )
+        version = cursor.lastrowid
+        cursor.execute("DELETE FROM preclassifier_models WHERE version < ?", (version,))
+        conn.commit()
+        return version
+
+
+def load_latest_preclassifier_model(include_model: bool = False):
+    """Latest pre-classifier version, training time and metrics (and model)."""
+    model_column = ", model" if include_model else ""
+    try:
+        with get_connection() as conn:
+            row = conn.execute(f"""
+                SELECT
+                    version,
+                    REPLACE(trained_at, ' ', 'T') || 'Z' AS trained_at,
+                    metrics
+                    {model_column}
+                FROM preclassifier_models
+                ORDER BY version DESC
+                LIMIT 1
+            """).fetchone()
+    except sqlite3.OperationalError as e:
+        if "no such table" in str(e):
+            return None
+        raise
+
+    if not row:
+        return None
+
+    stored = dict(row)
+    stored["metrics"] = json.loads(stored["metrics"])
+    return stored
+
+
 # -----------------------------
 # Delete
 # -----------------------------
 def delete_call_by_id(call_id: int):
     with get_connection() as conn:
         cursor = conn.cursor()
+        cursor.execute(
+            "DELETE FROM call_segments WHERE call_id = ?",
+            (call_id,)
+        )
+        cursor.execute(
+            "DELETE FROM call_transcripts WHERE call_id = ?",
+            (call_id,)
+        )
+        cursor.execute(
+            "DELETE FROM call_embeddings WHERE call_id = ?",
+            (call_id,)
+        )
         cursor.execute(
             "DELETE FROM support_calls WHERE id = ?",
             (call_id,)
@@ -205,3 +1446,27 @@ def delete_call_by_id(call_id: int):
         return cursor.rowcount  # number of rows deleted
 
 
+if __name__ == "__main__":
+    # python -m app.database check-rollups | rebuild-rollups | rebuild-search | vacuum
+    init_db()
+    command = sys.argv[1] if len(sys.argv) > 1 else "check-rollups"
+    if command == "check-rollups":
+        print(json.dumps(rebuild_rollups(check_only=True), indent=2))
+    elif command == "rebuild-rollups":
+        print(json.dumps(rebuild_rollups(), indent=2))
+    elif command == "rebuild-search":
+        # Re-index every transcript, e.g. after editing the tables by hand
+        with get_connection() as conn:
+            conn.execute("INSERT INTO call_search (call_search) VALUES ('rebuild')")
+            conn.commit()
+            indexed = conn.execute("SELECT COUNT(*) FROM call_transcripts").fetchone()[0]
+        print(json.dumps({"indexed": indexed}))
+    elif command == "vacuum":
+        # Returns the space freed by migrations (e.g. inline transcripts)
+        close_connection()
+        before = os.path.getsize(DB_PATH)
+        with sqlite3.connect(DB_PATH) as conn:
+            conn.execute("VACUUM")
+        print(json.dumps({"before_bytes": before, "after_bytes": os.path.getsize(DB_PATH)}))
+    else:
+        sys.exit("usage: python -m app.database [check-rollups|rebuild-rollups|rebuild-search|vacuum]")
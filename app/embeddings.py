@@ -0,0 +1,374 @@
+"""
+Transcript embeddings and the nearest-neighbour index behind similar-call
+lookup.
+
+Two embedders, picked with EMBEDDING_BACKEND:
+
+- "hashed" (default) works offline with nothing to download: word and
+  bigram counts (log-scaled, English stop words dropped) hashed into
+  EMBEDDING_DIM signed buckets. Stateless, so a call's vector never
+  changes once stored.
+- "onnx" runs a sentence-transformers model exported to ONNX
+  (EMBEDDING_MODEL_DIR with model.onnx and tokenizer.json) on the CPU.
+  Long transcripts are embedded in overlapping windows and averaged.
+
+Vectors are L2-normalized and stored as int8 with one float scale per
+row. The index is a snapshot of those rows written as .npy files and
+memory-mapped by every process: brute force below
+EMBEDDING_IVF_MIN_VECTORS, an inverted file (k-means lists, the
+EMBEDDING_IVF_NPROBE closest probed) above it.
+
+Imported lazily (by app.similar and the insert path) so NumPy and
+scikit-learn stay out of processes that never embed.
+"""
+import os
+import json
+import time
+import fcntl
+import shutil
+import threading
+
+import numpy as np
+
+from app.config import Config
+
+# Rows converted to float32 and scored per matmul; small enough for the
+# reused buffer to stay in cache, which beats storing float32 outright
+SEARCH_CHUNK_ROWS = 1024
+# Tokens per window for the ONNX model, and the overlap between windows
+ONNX_MAX_TOKENS = 256
+ONNX_STRIDE = 32
+ONNX_BATCH_WINDOWS = 32
+# k-means is fitted on at most this many vectors
+IVF_TRAIN_SAMPLE = 100_000
+# Unfinished snapshot directories older than this are left over from a
+# crashed build
+ABANDONED_BUILD_SECONDS = 24 * 3600
+
+_onnx = {}
+_onnx_lock = threading.Lock()
+
+
+def model_name() -> str:
+    """Identifies the embedder; stored with each vector."""
+    if Config.EMBEDDING_BACKEND == "onnx":
+        return f"onnx:{os.path.basename(os.path.normpath(Config.EMBEDDING_MODEL_DIR))}"
+    if Config.EMBEDDING_BACKEND == "hashed":
+        return f"hashed-{Config.EMBEDDING_DIM}"
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {Config.EMBEDDING_BACKEND}")
+
+
+# -----------------------------
+# Embedders
+# -----------------------------
+def _embed_hashed(texts) -> np.ndarray:
+    from scipy import sparse
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    dim = Config.EMBEDDING_DIM
+    counts = HashingVectorizer(
+        n_features=2 ** 20, ngram_range=(1, 2), stop_words="english",
+        alternate_sign=False, norm=None,
+    ).transform(texts)
+
+    # Fold the 2^20 term buckets into `dim` signed ones, so colliding
+    # terms tend to cancel instead of adding up
+    sign = np.where((counts.indices // dim) % 2, -1.0, 1.0)
+    folded = sparse.csr_matrix(
+        (np.log1p(counts.data) * sign, counts.indices % dim, counts.indptr),
+        shape=(counts.shape[0], dim),
+    )
+    return folded.toarray().astype(np.float32)
+
+
+def _onnx_model():
+    with _onnx_lock:
+        if not _onnx:
+            import onnxruntime
+            from tokenizers import Tokenizer
+
+            model_dir = Config.EMBEDDING_MODEL_DIR
+            tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+            tokenizer.enable_truncation(max_length=ONNX_MAX_TOKENS, stride=ONNX_STRIDE)
+            tokenizer.no_padding()
+            session = onnxruntime.InferenceSession(
+                os.path.join(model_dir, "model.onnx"), providers=["CPUExecutionProvider"]
+            )
+            _onnx.update(tokenizer=tokenizer, session=session)
+        return _onnx["tokenizer"], _onnx["session"]
+
+
+def _embed_onnx(texts) -> np.ndarray:
+    tokenizer, session = _onnx_model()
+
+    # One row per window; `owner` maps windows back to their text
+    windows, owner = [], []
+    for i, encoding in enumerate(tokenizer.encode_batch(list(texts))):
+        for window in [encoding, *encoding.overflowing]:
+            windows.append(window)
+            owner.append(i)
+
+    token_types = any(i.name == "token_type_ids" for i in session.get_inputs())
+    pooled = []
+    for start in range(0, len(windows), ONNX_BATCH_WINDOWS):
+        batch = windows[start:start + ONNX_BATCH_WINDOWS]
+        width = max(len(w.ids) for w in batch)
+        ids = np.array([w.ids + [0] * (width - len(w.ids)) for w in batch], dtype=np.int64)
+        mask = np.array(
+            [w.attention_mask + [0] * (width - len(w.ids)) for w in batch], dtype=np.int64
+        )
+        inputs = {"input_ids": ids, "attention_mask": mask}
+        if token_types:
+            inputs["token_type_ids"] = np.zeros_like(ids)
+
+        # Mean over the real tokens of each window
+        hidden = session.run(None, inputs)[0]
+        pooled.append(
+            (hidden * mask[..., None]).sum(axis=1) / np.maximum(mask.sum(axis=1, keepdims=True), 1)
+        )
+
+    # Each text gets the sum of its windows; embed() normalizes
+    pooled = np.concatenate(pooled).astype(np.float32)
+    vectors = np.zeros((len(texts), pooled.shape[1]), dtype=np.float32)
+    np.add.at(vectors, np.array(owner), pooled)
+    return vectors
+
+
+def embed(texts) -> np.ndarray:
+    """L2-normalized float32 vectors, one row per text."""
+    if Config.EMBEDDING_BACKEND == "onnx":
+        vectors = _embed_onnx(texts)
+    elif Config.EMBEDDING_BACKEND == "hashed":
+        vectors = _embed_hashed(texts)
+    else:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND: {Config.EMBEDDING_BACKEND}")
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1)
+
+
+def quantize(vectors: np.ndarray):
+    """int8 rows plus the float32 scale that restores each one."""
+    scales = np.abs(vectors).max(axis=1) / 127
+    safe = np.where(scales > 0, scales, 1)
+    return np.round(vectors / safe[:, None]).astype(np.int8), scales.astype(np.float32)
+
+
+def encode(texts) -> list:
+    """(model, scale, int8 bytes) per text, or None for a missing/empty one."""
+    present = [i for i, text in enumerate(texts) if text and text.strip()]
+    encoded = [None] * len(texts)
+    if not present:
+        return encoded
+
+    model = model_name()
+    rows, scales = quantize(embed([texts[i] for i in present]))
+    for i, row, scale in zip(present, rows, scales):
+        encoded[i] = (model, float(scale), row.tobytes())
+    return encoded
+
+
+def decode(scale: float, blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype=np.int8).astype(np.float32) * scale
+
+
+# -----------------------------
+# Index
+# -----------------------------
+def _unit(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return (matrix / np.where(norms > 0, norms, 1)).astype(np.float32)
+
+
+def _nearest_lists(vectors, scales, centroids):
+    """Closest centroid for every int8 row, computed chunk by chunk."""
+    lists = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), SEARCH_CHUNK_ROWS):
+        chunk = vectors[start:start + SEARCH_CHUNK_ROWS].astype(np.float32)
+        chunk *= scales[start:start + SEARCH_CHUNK_ROWS, None]
+        lists[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return lists
+
+
+def _fit_centroids(vectors, scales, n_lists):
+    from sklearn.cluster import MiniBatchKMeans
+
+    rng = np.random.default_rng(0)
+    sample = np.sort(rng.choice(len(vectors), min(len(vectors), IVF_TRAIN_SAMPLE), replace=False))
+    data = vectors[sample].astype(np.float32) * scales[sample, None]
+    kmeans = MiniBatchKMeans(
+        n_clusters=n_lists, n_init=1, batch_size=4096, max_iter=20, random_state=0
+    ).fit(data)
+    return _unit(kmeans.cluster_centers_)
+
+
+def build_index(
+    index_dir: str, ids, scales, vectors, model: str, previous=None, max_seq: int = None
+) -> dict:
+    """
+    Write a new snapshot and make it current.
+
+    `ids` must be ascending. `max_seq` is the highest embedded_seq of
+    the rows (defaults to the highest id); vectors written after it are
+    what lookups search on top of the snapshot. The snapshot lives in its own directory,
+    meta.json is written last, and CURRENT is switched atomically, so
+    processes still reading the old one are unaffected. Callers
+    serialize builds (see app.similar.build). IVF centroids are reused
+    from `previous` until the vector count doubles.
+    """
+    start = time.perf_counter()
+    ids = np.asarray(ids, dtype=np.int64)
+    scales = np.asarray(scales, dtype=np.float32)
+    vectors = np.asarray(vectors, dtype=np.int8).reshape(len(ids), -1 if len(ids) else 0)
+
+    arrays = {"ids": ids, "scales": scales, "vectors": vectors}
+    meta = {
+        "model": model,
+        "dim": int(vectors.shape[1]) if len(ids) else 0,
+        "count": int(len(ids)),
+        "max_id": int(ids[-1]) if len(ids) else 0,
+        "max_seq": int(max_seq if max_seq is not None else (ids[-1] if len(ids) else 0)),
+        "ivf": False,
+    }
+
+    if len(ids) >= max(Config.EMBEDDING_IVF_MIN_VECTORS, 1):
+        reuse = (
+            previous is not None and previous.centroids is not None
+            and previous.meta["model"] == model and len(ids) < 2 * previous.meta["count"]
+        )
+        centroids = (
+            previous.centroids if reuse
+            else _fit_centroids(vectors, scales, int(np.sqrt(len(ids))))
+        )
+        lists = _nearest_lists(vectors, scales, centroids)
+        # Rows of one list sit next to each other; offsets[l]:offsets[l + 1]
+        order = np.argsort(lists, kind="stable")
+        arrays = {
+            "ids": ids[order], "scales": scales[order], "vectors": vectors[order],
+            "centroids": np.asarray(centroids),
+            "offsets": np.searchsorted(lists[order], np.arange(len(centroids) + 1)),
+        }
+        meta.update(ivf=True, lists=len(centroids), centroids_reused=bool(reuse))
+
+    # Names sort by age, so publish() can tell older snapshots apart
+    name = f"{time.time_ns():020d}-{os.getpid()}"
+    path = os.path.join(index_dir, name)
+    os.makedirs(path, exist_ok=True)
+    for key, array in arrays.items():
+        np.save(os.path.join(path, f"{key}.npy"), array)
+    meta["build_seconds"] = round(time.perf_counter() - start, 2)
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    publish(index_dir, name)
+    return meta
+
+
+def publish(index_dir: str, name: str):
+    """
+    Point CURRENT at snapshot `name` unless a newer one is already
+    current, then remove older complete snapshots. Snapshots still being
+    written (no meta.json yet) are only removed once they are clearly
+    abandoned.
+    """
+    with open(os.path.join(index_dir, ".publish.lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            with open(os.path.join(index_dir, "CURRENT")) as f:
+                current = f.read().strip()
+        except FileNotFoundError:
+            current = ""
+
+        if name > current:
+            pointer = os.path.join(index_dir, f"CURRENT.{os.getpid()}")
+            with open(pointer, "w") as f:
+                f.write(name)
+            os.replace(pointer, os.path.join(index_dir, "CURRENT"))
+            current = name
+
+        # Open memory maps keep removed files alive until their
+        # processes let go
+        for entry in os.listdir(index_dir):
+            path = os.path.join(index_dir, entry)
+            if entry >= current or not os.path.isdir(path):
+                continue
+            complete = os.path.exists(os.path.join(path, "meta.json"))
+            if complete or time.time() - os.path.getmtime(path) > ABANDONED_BUILD_SECONDS:
+                shutil.rmtree(path, ignore_errors=True)
+
+
+class VectorIndex:
+    """A memory-mapped snapshot written by build_index()."""
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.path = path
+
+        def load(key, required=True):
+            file = os.path.join(path, f"{key}.npy")
+            if not required and not os.path.exists(file):
+                return None
+            return np.load(file, mmap_mode="r")
+
+        # A missing file raises FileNotFoundError: the snapshot is incomplete
+        self.ids = load("ids")
+        self.scales = load("scales")
+        self.vectors = load("vectors")
+        self.centroids = load("centroids", required=self.meta["ivf"])
+        self.offsets = load("offsets", required=self.meta["ivf"])
+
+    @classmethod
+    def open_current(cls, index_dir: str):
+        """The current snapshot, or None if none was built yet (or it is incomplete)."""
+        try:
+            with open(os.path.join(index_dir, "CURRENT")) as f:
+                return cls(os.path.join(index_dir, f.read().strip()))
+        except FileNotFoundError:
+            return None
+
+    def _score(self, ranges, query):
+        """Cosine similarity of the query with every row in `ranges`."""
+        total = sum(end - start for start, end in ranges)
+        scores = np.empty(total, dtype=np.float32)
+        buffer = np.empty((SEARCH_CHUNK_ROWS, self.vectors.shape[1]), dtype=np.float32)
+        offset = 0
+        for start, end in ranges:
+            for chunk in range(start, end, SEARCH_CHUNK_ROWS):
+                n = min(SEARCH_CHUNK_ROWS, end - chunk)
+                np.copyto(buffer[:n], self.vectors[chunk:chunk + n], casting="unsafe")
+                np.dot(buffer[:n], query, out=scores[offset:offset + n])
+                offset += n
+        offset = 0
+        for start, end in ranges:
+            scores[offset:offset + end - start] *= self.scales[start:end]
+            offset += end - start
+        return scores
+
+    def search(self, query: np.ndarray, k: int, nprobe: int = None):
+        """(ids, cosine similarities) of the k best rows, best first."""
+        if not self.meta["count"]:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        query = np.ascontiguousarray(query, dtype=np.float32)
+        if self.centroids is None:
+            return top_k(self.ids, self._score([(0, self.meta["count"])], query), k)
+
+        nprobe = min(nprobe or Config.EMBEDDING_IVF_NPROBE, len(self.centroids))
+        probed = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        ranges = [
+            (int(self.offsets[l]), int(self.offsets[l + 1]))
+            for l in probed if self.offsets[l + 1] > self.offsets[l]
+        ]
+        if not ranges:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        ids = np.concatenate([self.ids[start:end] for start, end in ranges])
+        return top_k(ids, self._score(ranges, query), k)
+
+
+def top_k(ids, scores, k):
+    if len(scores) > k:
+        best = np.argpartition(-scores, k - 1)[:k]
+        ids, scores = ids[best], scores[best]
+    order = np.argsort(-scores, kind="stable")
+    return np.asarray(ids)[order], np.asarray(scores)[order]
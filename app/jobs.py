@@ -0,0 +1,435 @@
+import os
+import time
+import uuid
+import socket
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from app.config import Config
+from app.database import get_connection, call_exists, insert_call
+
+logger = logging.getLogger(__name__)
+
+PENDING_STATUSES = ("queued", "transcribing", "classifying")
+IN_PROGRESS_STATUSES = ("transcribing", "classifying")
+
+
+def _iso(ts):
+    if ts is None:
+        return None
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+# -----------------------------
+# Enqueue / status
+# -----------------------------
+def create_job(files: list) -> str:
+    """
+    Persist a job and its items; any API worker may call this.
+
+    `files` is a list of dicts with filename, path and file_hash.
+    Entries may instead carry a final status (e.g. "duplicate" or
+    "failed") decided at upload time; those are stored but never queued.
+    """
+    job_id = str(uuid.uuid4())
+    now = time.time()
+
+    with get_connection() as conn:
+        conn.execute(
+            "INSERT INTO jobs (id, created_at) VALUES (?, ?)",
+            (job_id, now)
+        )
+        conn.executemany("""
+            INSERT INTO job_items (
+                job_id, filename, file_path, file_hash,
+                status, call_id, error, available_at, finished_at
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (
+                job_id,
+                f["filename"],
+                f.get("path"),
+                f.get("file_hash"),
+                f.get("status", "queued"),
+                f.get("call_id"),
+                f.get("error"),
+                now,
+                None if f.get("status", "queued") == "queued" else now,
+            )
+            for f in files
+        ])
+        conn.commit()
+
+    return job_id
+
+
+def get_job(job_id: str):
+    with get_connection() as conn:
+        job = conn.execute(
+            "SELECT id, created_at FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if job is None:
+            return None
+
+        items = conn.execute("""
+            SELECT filename, status, attempts, call_id, error, started_at, finished_at
+            FROM job_items
+            WHERE job_id = ?
+            ORDER BY id
+        """, (job_id,)).fetchall()
+
+    files = []
+    counts = {}
+    started = [r["started_at"] for r in items if r["started_at"] is not None]
+    finished = [r["finished_at"] for r in items if r["finished_at"] is not None]
+
+    for r in items:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+        duration = None
+        if r["started_at"] is not None and r["finished_at"] is not None:
+            duration = round(r["finished_at"] - r["started_at"], 2)
+        files.append({
+            "filename": r["filename"],
+            "status": r["status"],
+            "attempts": r["attempts"],
+            "call_id": r["call_id"],
+            "error": r["error"],
+            "duration_seconds": duration,
+        })
+
+    total = len(files)
+    pending = sum(counts.get(s, 0) for s in PENDING_STATUSES)
+    done = total - pending
+
+    if pending == 0:
+        status = "completed"
+    elif started:
+        status = "running"
+    else:
+        status = "queued"
+
+    first_start = min(started) if started else None
+    end = max(finished) if status == "completed" and finished else time.time()
+    elapsed = end - first_start if first_start is not None else None
+    throughput = round(done / elapsed * 60, 2) if elapsed else None
+
+    return {
+        "job_id": job["id"],
+        "status": status,
+        "created_at": _iso(job["created_at"]),
+        "started_at": _iso(first_start),
+        "finished_at": _iso(end) if status == "completed" else None,
+        "total_files": total,
+        "processed_files": done,
+        "progress": round(done / total * 100, 1) if total else 100.0,
+        "status_counts": counts,
+        "elapsed_seconds": round(elapsed, 2) if elapsed is not None else None,
+        "throughput_per_minute": throughput,
+        "files": files,
+    }
+
+
+# -----------------------------
+# Leasing
+# -----------------------------
+def claim_item(owner: str, lease_seconds: int = None):
+    """
+    Atomically lease the next runnable item, or return None.
+
+    Runnable means queued and due, or in progress with an expired lease
+    (its consumer died). Items that have used up their attempts are
+    dead-lettered instead of being handed out again.
+    """
+    lease_seconds = lease_seconds or Config.QUEUE_LEASE_SECONDS
+    now = time.time()
+
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+
+        conn.execute(f"""
+            UPDATE job_items
+            SET status = 'dead',
+                error = COALESCE(error, 'lease_expired'),
+                lease_owner = NULL,
+                finished_at = ?
+            WHERE status IN {IN_PROGRESS_STATUSES}
+              AND lease_expires_at < ?
+              AND attempts >= ?
+        """, (now, now, Config.QUEUE_MAX_ATTEMPTS))
+
+        row = conn.execute(f"""
+            SELECT id, job_id, filename, file_path, file_hash, attempts
+            FROM job_items
+            WHERE (status = 'queued' AND available_at <= ?)
+               OR (status IN {IN_PROGRESS_STATUSES} AND lease_expires_at < ?)
+            ORDER BY available_at, id
+            LIMIT 1
+        """, (now, now)).fetchone()
+
+        if row is None:
+            conn.commit()
+            return None
+
+        conn.execute("""
+            UPDATE job_items
+            SET status = 'transcribing',
+                attempts = attempts + 1,
+                lease_owner = ?,
+                lease_expires_at = ?,
+                started_at = ?,
+                finished_at = NULL
+            WHERE id = ?
+        """, (owner, now + lease_seconds, now, row["id"]))
+        conn.commit()
+
+    item = dict(row)
+    item["attempts"] += 1
+    return item
+
+
+def renew_lease(item_id: int, owner: str, status: str, lease_seconds: int = None) -> bool:
+    """Extend a lease and record the stage. False if the lease was lost."""
+    lease_seconds = lease_seconds or Config.QUEUE_LEASE_SECONDS
+    with get_connection() as conn:
+        cursor = conn.execute("""
+            UPDATE job_items
+            SET status = ?, lease_expires_at = ?
+            WHERE id = ? AND lease_owner = ?
+        """, (status, time.time() + lease_seconds, item_id, owner))
+        conn.commit()
+        return cursor.rowcount == 1
+
+
+def complete_item(item_id: int, owner: str, status: str, call_id=None, error=None) -> bool:
+    with get_connection() as conn:
+        cursor = conn.execute("""
+            UPDATE job_items
+            SET status = ?,
+                call_id = ?,
+                error = ?,
+                lease_owner = NULL,
+                lease_expires_at = NULL,
+                finished_at = ?
+            WHERE id = ? AND lease_owner = ?
+        """, (status, call_id, error, time.time(), item_id, owner))
+        conn.commit()
+        return cursor.rowcount == 1
+
+
+def fail_item(item_id: int, owner: str, attempts: int, error: str) -> str:
+    """
+    Record a retryable failure.
+
+    Requeues with exponential backoff, or dead-letters the item once
+    QUEUE_MAX_ATTEMPTS is reached. Returns the new status.
+    """
+    if attempts >= Config.QUEUE_MAX_ATTEMPTS:
+        complete_item(item_id, owner, "dead", error=error)
+        return "dead"
+
+    delay = Config.QUEUE_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1)
+    with get_connection() as conn:
+        conn.execute("""
+            UPDATE job_items
+            SET status = 'queued',
+                error = ?,
+                available_at = ?,
+                lease_owner = NULL,
+                lease_expires_at = NULL
+            WHERE id = ? AND lease_owner = ?
+        """, (error, time.time() + delay, item_id, owner))
+        conn.commit()
+    return "queued"
+
+
+def requeue_dead(job_id: str = None) -> int:
+    """Give dead-lettered items a fresh set of attempts."""
+    query = """
+        UPDATE job_items
+        SET status = 'queued', attempts = 0, error = NULL,
+            available_at = ?, finished_at = NULL
+        WHERE status = 'dead'
+    """
+    params = [time.time()]
+    if job_id:
+        query += " AND job_id = ?"
+        params.append(job_id)
+
+    with get_connection() as conn:
+        cursor = conn.execute(query, params)
+        conn.commit()
+        return cursor.rowcount
+
+
+# -----------------------------
+# Consumer
+# -----------------------------
+class RetryableError(Exception):
+    pass
+
+
+class Consumer:
+    """
+    Leases queue items and runs them through two bounded pools.
+
+    Transcription (CPU-bound Whisper) and LLM classification (I/O-bound
+    Ollama) have separate concurrency limits, so one stage never starves
+    the other. At most transcribe + llm items are leased at once, which
+    keeps throughput steady no matter how bursty the uploads are.
+    """
+
+    def __init__(self, transcribe_workers: int = None, llm_workers: int = None):
+        self.transcribe_workers = transcribe_workers or Config.TRANSCRIBE_CONCURRENCY
+        self.llm_workers = llm_workers or Config.LLM_CONCURRENCY
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._transcribe_pool = ThreadPoolExecutor(
+            max_workers=self.transcribe_workers, thread_name_prefix="transcribe"
+        )
+        self._llm_pool = ThreadPoolExecutor(
+            max_workers=self.llm_workers, thread_name_prefix="classify"
+        )
+        self._slots = threading.BoundedSemaphore(self.transcribe_workers + self.llm_workers)
+        self._stop = threading.Event()
+
+    # -------- lifecycle --------
+    def run_forever(self):
+        logger.info(
+            "Queue consumer %s started (transcribe=%d, llm=%d)",
+            self.owner, self.transcribe_workers, self.llm_workers
+        )
+        if Config.EMBEDDING_BACKEND != "off":
+            # Similar-call index snapshots are built here, never in API requests
+            from app.similar import run_rebuilds
+            threading.Thread(
+                target=run_rebuilds, args=(self._stop,), name="similar-index", daemon=True
+            ).start()
+
+        while not self._stop.is_set():
+            if not self._slots.acquire(timeout=Config.QUEUE_POLL_SECONDS):
+                continue
+
+            try:
+                item = claim_item(self.owner)
+            except Exception:
+                logger.exception("Failed to claim queue item")
+                item = None
+
+            if item is None:
+                self._slots.release()
+                self._stop.wait(Config.QUEUE_POLL_SECONDS)
+                continue
+
+            item["status"] = "transcribing"
+            self._start_heartbeat(item)
+            self._transcribe_pool.submit(self._transcribe, item)
+
+        self._transcribe_pool.shutdown(wait=True)
+        self._llm_pool.shutdown(wait=True)
+
+    def start_in_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.run_forever, name="queue-consumer", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
+
+    # -------- leases --------
+    def _start_heartbeat(self, item):
+        """
+        Keep renewing the item's lease from claim until it is released,
+        including while it waits in a pool's queue, so a long recording
+        (or a backlog behind one) doesn't outlive QUEUE_LEASE_SECONDS and
+        get handed out again mid-stage. Renews with item["status"].
+        """
+        done = threading.Event()
+        item["heartbeat"] = done
+
+        def beat():
+            interval = Config.QUEUE_LEASE_SECONDS / 3
+            while not done.wait(interval):
+                try:
+                    if not renew_lease(item["id"], self.owner, item["status"]):
+                        return
+                except Exception:
+                    logger.exception("Failed to renew lease for queue item %s", item["id"])
+
+        threading.Thread(target=beat, name=f"lease-{item['id']}", daemon=True).start()
+
+    def _release(self, item):
+        item["heartbeat"].set()
+        self._slots.release()
+
+    # -------- stages --------
+    def _transcribe(self, item):
+        # Imported here so enqueue-only processes never load the models
+        from app.pipeline import transcribe_audio
+
+        try:
+            tx = transcribe_audio(item["file_path"])
+            if not tx["success"]:
+                if (tx["error"] or "").startswith("transcription_exception"):
+                    raise RetryableError(tx["error"])
+                self._finish(item, "failed", error=tx["error"])
+                return
+
+            item["status"] = "classifying"
+            if not renew_lease(item["id"], self.owner, "classifying"):
+                self._release(item)
+                return
+
+            self._llm_pool.submit(self._classify, item, tx["text"], tx.get("segments"))
+        except Exception as e:
+            self._retry(item, e)
+
+    def _classify(self, item, transcript, segments=None):
+        from app.pipeline import analyze_transcript_batched
+        from app.analytics import schedule_risk_refresh
+
+        try:
+            insights = analyze_transcript_batched(transcript, segments)
+            result = insert_call(
+                file_hash=item["file_hash"],
+                transcript=transcript,
+                insights=insights,
+                segments=segments,
+                embed=True,
+            )
+
+            if result.get("inserted"):
+                schedule_risk_refresh()
+                self._finish(item, "success", call_id=result["id"])
+            elif result.get("reason") == "duplicate":
+                existing = call_exists(item["file_hash"])
+                self._finish(item, "duplicate", call_id=existing["id"] if existing else None)
+            else:
+                raise RetryableError(result.get("error") or result.get("reason"))
+        except Exception as e:
+            self._retry(item, e)
+
+    # -------- outcomes --------
+    def _finish(self, item, status, call_id=None, error=None):
+        try:
+            if complete_item(item["id"], self.owner, status, call_id=call_id, error=error):
+                _remove_file(item["file_path"])
+        finally:
+            self._release(item)
+
+    def _retry(self, item, exc):
+        try:
+            status = fail_item(item["id"], self.owner, item["attempts"], str(exc))
+            logger.warning(
+                "Queue item %s attempt %d failed (%s): %s",
+                item["id"], item["attempts"], status, exc
+            )
+        finally:
+            self._release(item)
+
+
+def _remove_file(path):
+    if path and os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,287 @@
+"""
+LLM backends for transcript classification.
+
+    ollama        synchronous ollama.chat (the original behaviour)
+    ollama_async  asyncio client for Ollama's /api/chat with pooled
+                  keep-alive connections, a request timeout and a cap of
+                  LLM_CONCURRENCY requests in flight
+    fake          in-process stand-in that sleeps LLM_FAKE_LATENCY_MS
+                  (+/- jitter) and answers with schema-valid JSON derived
+                  from keywords, so the pipeline can be benchmarked
+                  without an Ollama server
+
+Pick one with LLM_BACKEND; get_llm_backend() returns the process-wide
+instance. Every backend takes a list of chat messages and offers chat()
+for threads and achat() for asyncio.
+"""
+import re
+import json
+import time
+import random
+import asyncio
+import threading
+
+from app.config import Config
+
+
+class LLMBackend:
+    name = "base"
+
+    def chat(self, messages: list) -> str:
+        raise NotImplementedError
+
+    async def achat(self, messages: list) -> str:
+        return await asyncio.to_thread(self.chat, messages)
+
+    def warmup(self):
+        """Import client libraries / open connections ahead of the first call."""
+
+
+# -----------------------------
+# Ollama
+# -----------------------------
+def ollama_keep_alive():
+    """OLLAMA_KEEP_ALIVE as Ollama expects it: seconds, a duration string or unset."""
+    value = Config.OLLAMA_KEEP_ALIVE
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def ollama_options() -> dict:
+    options = {}
+    if Config.OLLAMA_NUM_CTX:
+        options["num_ctx"] = Config.OLLAMA_NUM_CTX
+    return options
+
+
+def ollama_payload(model: str, messages: list, stream: bool = False) -> dict:
+    """Body for Ollama's /api/chat."""
+    payload = {"model": model, "messages": messages, "stream": stream}
+    keep_alive = ollama_keep_alive()
+    if keep_alive is not None:
+        payload["keep_alive"] = keep_alive
+    options = ollama_options()
+    if options:
+        payload["options"] = options
+    return payload
+
+
+class OllamaBackend(LLMBackend):
+    def __init__(self, model: str = None):
+        self.model = model or Config.OLLAMA_MODEL
+        self.name = self.model
+
+    def chat(self, messages: list) -> str:
+        import ollama
+
+        response = ollama.chat(
+            model=self.model,
+            messages=messages,
+            options=ollama_options() or None,
+            keep_alive=ollama_keep_alive(),
+        )
+        return response["message"]["content"]
+
+    def warmup(self):
+        import ollama  # noqa: F401
+
+
+class AsyncOllamaBackend(LLMBackend):
+    """
+    Talks to Ollama over one shared httpx.AsyncClient.
+
+    The client and semaphore live on a private event loop thread, so
+    sync callers (queue consumers, thread pools) and async callers share
+    the same connection pool and concurrency limit.
+    """
+
+    def __init__(self, model: str = None, host: str = None,
+                 timeout: float = None, concurrency: int = None):
+        self.model = model or Config.OLLAMA_MODEL
+        self.name = self.model
+        self.host = (host or Config.OLLAMA_HOST).rstrip("/")
+        self.timeout = timeout or Config.LLM_TIMEOUT_SECONDS
+        self.concurrency = concurrency or Config.LLM_CONCURRENCY
+
+        self._loop = None
+        self._client = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                import httpx
+
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=loop.run_forever, name="llm-client", daemon=True
+                ).start()
+
+                async def setup():
+                    self._client = httpx.AsyncClient(
+                        base_url=self.host,
+                        timeout=httpx.Timeout(self.timeout, connect=10.0),
+                        limits=httpx.Limits(
+                            max_connections=self.concurrency,
+                            max_keepalive_connections=self.concurrency,
+                        ),
+                    )
+                    self._slots = asyncio.Semaphore(self.concurrency)
+
+                asyncio.run_coroutine_threadsafe(setup(), loop).result()
+                self._loop = loop
+        return self._loop
+
+    async def _post(self, messages: list) -> str:
+        async with self._slots:
+            response = await self._client.post(
+                "/api/chat", json=ollama_payload(self.model, messages)
+            )
+            response.raise_for_status()
+            return response.json()["message"]["content"]
+
+    def warmup(self):
+        self._ensure_loop()
+
+    def chat(self, messages: list) -> str:
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self._post(messages), loop).result()
+
+    async def achat(self, messages: list) -> str:
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self._post(messages), loop)
+        return await asyncio.wrap_future(future)
+
+    def close(self):
+        with self._lock:
+            if self._loop is None:
+                return
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
+
+
+# -----------------------------
+# Fake
+# -----------------------------
+_TRANSCRIPT_PATTERN = re.compile(r'"""(.*?)"""', re.S)
+
+_CATEGORY_WORDS = {
+    "billing": ("bill", "charge", "invoice", "payment", "subscription"),
+    "delivery": ("deliver", "shipping", "package", "courier", "tracking"),
+    "refund": ("refund", "money back", "return"),
+    "technical": ("error", "not working", "crash", "login", "internet", "the app"),
+}
+_NEGATIVE_WORDS = ("angry", "terrible", "worst", "frustrated", "unacceptable", "not working")
+_POSITIVE_WORDS = ("thank", "great", "perfect", "appreciate", "working now")
+_URGENT_WORDS = ("urgent", "immediately", "asap", "right now", "emergency")
+_RESOLVED_WORDS = ("fixed", "resolved", "working now", "processed", "done")
+
+
+class FakeBackend(LLMBackend):
+    """Deterministic keyword classifier with simulated latency."""
+
+    name = "fake"
+
+    def __init__(self, latency_ms: float = None, jitter_ms: float = None,
+                 ms_per_1k_chars: float = None):
+        self.latency_ms = Config.LLM_FAKE_LATENCY_MS if latency_ms is None else latency_ms
+        self.jitter_ms = Config.LLM_FAKE_JITTER_MS if jitter_ms is None else jitter_ms
+        self.ms_per_1k_chars = (
+            Config.LLM_FAKE_MS_PER_1K_CHARS if ms_per_1k_chars is None else ms_per_1k_chars
+        )
+
+    def _delay(self, prompt: str) -> float:
+        jitter = random.uniform(-self.jitter_ms, self.jitter_ms)
+        per_chars = self.ms_per_1k_chars * len(prompt) / 1000
+        return max(0.0, self.latency_ms + per_chars + jitter) / 1000
+
+    def chat(self, messages: list) -> str:
+        prompt = "\n".join(m["content"] for m in messages)
+        time.sleep(self._delay(prompt))
+        return self.respond(prompt)
+
+    async def achat(self, messages: list) -> str:
+        prompt = "\n".join(m["content"] for m in messages)
+        await asyncio.sleep(self._delay(prompt))
+        return self.respond(prompt)
+
+    @classmethod
+    def respond(cls, prompt: str) -> str:
+        transcripts = _TRANSCRIPT_PATTERN.findall(prompt)
+        if len(transcripts) > 1:
+            # Batch prompt: indexed JSON array, one object per transcript
+            return json.dumps([
+                {"index": i, **cls.classify(t)} for i, t in enumerate(transcripts, 1)
+            ])
+        return json.dumps(cls.classify(transcripts[0] if transcripts else prompt))
+
+    @staticmethod
+    def classify(text: str) -> dict:
+        text = text.lower()
+
+        def has(words):
+            return any(w in text for w in words)
+
+        categories = [c for c, words in _CATEGORY_WORDS.items() if has(words)]
+        resolved = has(_RESOLVED_WORDS)
+
+        if has(_NEGATIVE_WORDS):
+            sentiment = "negative"
+        elif has(_POSITIVE_WORDS):
+            sentiment = "positive"
+        else:
+            sentiment = "neutral"
+
+        if has(_URGENT_WORDS):
+            urgency = "high"
+        elif sentiment == "negative":
+            urgency = "medium"
+        else:
+            urgency = "low"
+
+        return {
+            "sentiment": sentiment,
+            "issue_category": categories or ["other"],
+            "urgency": urgency,
+            "agent_behavior": "polite" if "sorry" in text or "thank" in text else "neutral",
+            "resolution_action_taken": "yes" if resolved else "no",
+            "customer_confirmation": "yes" if resolved and sentiment == "positive" else "no",
+            "pending_followup": "no" if resolved else "yes",
+        }
+
+
+# -----------------------------
+# Selection
+# -----------------------------
+BACKENDS = {
+    "ollama": OllamaBackend,
+    "ollama_async": AsyncOllamaBackend,
+    "fake": FakeBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_llm_backend() -> LLMBackend:
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if Config.LLM_BACKEND not in BACKENDS:
+                    raise ValueError(f"Unknown LLM backend: {Config.LLM_BACKEND}")
+                _backend = BACKENDS[Config.LLM_BACKEND]()
+    return _backend
+
+
+def set_llm_backend(backend: LLMBackend):
+    """Swap the process-wide backend (benchmarks, tooling)."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
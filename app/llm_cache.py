@@ -0,0 +1,158 @@
+"""
+Content-addressed cache for LLM classification results.
+
+Keys hash the normalized transcript together with the prompt version and
+model name. Lookups go through a small in-process LRU first, then the
+llm_cache table shared by all workers. Entries expire after
+LLM_CACHE_TTL_SECONDS and the table is trimmed to LLM_CACHE_MAX_ENTRIES
+(least recently hit first).
+"""
+import copy
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+from app.config import Config
+from app.database import get_connection
+
+# Trim the table every this many puts (per process)
+EVICT_EVERY = 100
+
+_memory = OrderedDict()
+_lock = threading.Lock()
+_stats = {"memory_hits": 0, "db_hits": 0, "misses": 0, "stores": 0, "evicted": 0}
+
+
+def normalize_transcript(transcript: str) -> str:
+    return " ".join(transcript.split()).casefold()
+
+
+def cache_key(transcript: str, prompt_version: str, model: str) -> str:
+    material = f"{model}\0{prompt_version}\0{normalize_transcript(transcript)}"
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+def _count(name: str, n: int = 1):
+    with _lock:
+        _stats[name] += n
+
+
+def _remember(key: str, result: dict, expires_at: float):
+    with _lock:
+        _memory[key] = (result, expires_at)
+        _memory.move_to_end(key)
+        while len(_memory) > Config.LLM_CACHE_MEMORY_ITEMS:
+            _memory.popitem(last=False)
+
+
+def get(key: str):
+    """Cached result for `key`, or None. Returns a fresh copy."""
+    now = time.time()
+
+    with _lock:
+        entry = _memory.get(key)
+        if entry and entry[1] > now:
+            _memory.move_to_end(key)
+            _stats["memory_hits"] += 1
+            return copy.deepcopy(entry[0])
+        if entry:
+            del _memory[key]
+
+    try:
+        with get_connection() as conn:
+            row = conn.execute(
+                "SELECT result, created_at FROM llm_cache WHERE key = ? AND created_at > ?",
+                (key, now - Config.LLM_CACHE_TTL_SECONDS)
+            ).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE llm_cache SET last_hit_at = ? WHERE key = ?", (now, key)
+                )
+                conn.commit()
+    except sqlite3.OperationalError:
+        row = None
+
+    if row is None:
+        _count("misses")
+        return None
+
+    result = json.loads(row["result"])
+    _remember(key, result, row["created_at"] + Config.LLM_CACHE_TTL_SECONDS)
+    _count("db_hits")
+    return copy.deepcopy(result)
+
+
+def put(key: str, result: dict):
+    now = time.time()
+    _remember(key, copy.deepcopy(result), now + Config.LLM_CACHE_TTL_SECONDS)
+
+    try:
+        with get_connection() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO llm_cache (key, result, created_at, last_hit_at)
+                VALUES (?, ?, ?, ?)
+            """, (key, json.dumps(result), now, now))
+            conn.commit()
+    except sqlite3.OperationalError:
+        return
+
+    with _lock:
+        _stats["stores"] += 1
+        due = _stats["stores"] % EVICT_EVERY == 0
+
+    if due:
+        evict()
+
+
+def evict() -> int:
+    """Drop expired entries, then the least recently hit beyond the size cap."""
+    now = time.time()
+    with get_connection() as conn:
+        cursor = conn.execute(
+            "DELETE FROM llm_cache WHERE created_at <= ?",
+            (now - Config.LLM_CACHE_TTL_SECONDS,)
+        )
+        removed = cursor.rowcount
+
+        total = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        excess = total - Config.LLM_CACHE_MAX_ENTRIES
+        if excess > 0:
+            cursor = conn.execute("""
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY last_hit_at LIMIT ?
+                )
+            """, (excess,))
+            removed += cursor.rowcount
+
+        conn.commit()
+
+    _count("evicted", removed)
+    return removed
+
+
+def stats() -> dict:
+    """Hit/miss counters for this process plus the shared table size."""
+    with _lock:
+        counters = dict(_stats)
+        memory_items = len(_memory)
+
+    try:
+        with get_connection() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+    except sqlite3.OperationalError:
+        entries = 0
+
+    lookups = counters["memory_hits"] + counters["db_hits"] + counters["misses"]
+    hits = counters["memory_hits"] + counters["db_hits"]
+
+    return {
+        **counters,
+        "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        "memory_items": memory_items,
+        "entries": entries,
+        "max_entries": Config.LLM_CACHE_MAX_ENTRIES,
+        "ttl_seconds": Config.LLM_CACHE_TTL_SECONDS,
+    }
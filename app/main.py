@@ -1,30 +1,76 @@
 import os
 import uuid
 import asyncio
+import json
 import hashlib
+import zipfile
+from datetime import date
+from typing import List, Literal, Optional
+from app import llm_cache, triage
 from app.config import Config
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
-from app.pipeline import analyze_input
+from app.pipeline import (
+    analyze_input,
+    analyze_transcript,
+    iter_transcription,
+    segments_to_transcript,
+    warmup,
+)
 from app.database import (
     init_db,
     insert_call,
-    fetch_all_calls,
+    fetch_call,
+    fetch_calls,
     fetch_summary,
+    fetch_overview,
+    fetch_call_segments,
+    search_calls,
     call_exists,
     delete_call_by_id
 )
 
-# Import ONLY the one function that exists
-from app.analytics import calculate_operational_risk
+from app.analytics import calculate_operational_risk, schedule_risk_refresh
+from app.similar import find_similar, NotEmbeddedYet
+from app.jobs import Consumer, create_job, get_job
 
 # -----------------------------
 # App setup
 # -----------------------------
 app = FastAPI(title="Customer Support Call Analytics API")
 
+MAX_FILE_SIZE = Config.MAX_FILE_SIZE
+# Multipart boundaries and part headers on top of the file itself
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+SINGLE_UPLOAD_PATHS = {"/analyze-call", "/analyze-call/stream"}
+
+
+# Registered before CORSMiddleware so CORS stays the outer layer and
+# the 413 still carries CORS headers
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """
+    Refuse single-file uploads whose declared Content-Length is already
+    over the limit, before the multipart body is read and spooled.
+    Chunked bodies are still caught by save_upload_stream.
+    """
+    if request.method == "POST" and request.url.path in SINGLE_UPLOAD_PATHS:
+        length = request.headers.get("content-length")
+        if length and length.isdigit() and int(length) > MAX_FILE_SIZE + UPLOAD_FORM_OVERHEAD:
+            return JSONResponse(
+                status_code=413,
+                content={
+                    "status": "failed",
+                    "reason": "file_too_large",
+                    "max_size_mb": MAX_FILE_SIZE // (1024 * 1024),
+                },
+            )
+    return await call_next(request)
+
+
 # Get allowed origins from environment variable
 allowed_origins_str = os.getenv("ALLOWED_ORIGINS", "")
 if allowed_origins_str:
@@ -38,14 +84,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 UPLOAD_DIR = os.path.join(BASE_DIR, Config.UPLOAD_DIR)
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-MAX_FILE_SIZE = Config.MAX_FILE_SIZE
-
 ALLOWED_EXTENSIONS = {".wav", ".mp3", ".m4a", ".aac", ".ogg", ".flac"}
 ALLOWED_MIME_TYPES = {
     "audio/wav", "audio/x-wav", "audio/mpeg", "audio/mp3", "audio/mp4",
@@ -59,11 +104,183 @@ ALLOWED_MIME_TYPES = {
 def startup():
     init_db()
 
+    if Config.PRELOAD_MODELS:
+        warmup()
+
+    # Single-process setups work the queue in-process; otherwise run
+    # `python -m app.worker` alongside the API workers.
+    if Config.EMBEDDED_WORKER:
+        app.state.consumer = Consumer()
+        app.state.consumer.start_in_background()
+
+@app.on_event("shutdown")
+def shutdown():
+    consumer = getattr(app.state, "consumer", None)
+    if consumer:
+        consumer.stop()
+
 # -----------------------------
 # Helpers
 # -----------------------------
-def compute_file_hash(file_bytes: bytes) -> str:
-    return hashlib.sha256(file_bytes).hexdigest()
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class FileTooLargeError(Exception):
+    pass
+
+
+def save_upload_stream(src, dest_path: str, max_size: int = MAX_FILE_SIZE):
+    """
+    Copy a file object to disk in chunks, hashing on the fly.
+
+    Returns (sha256 hex digest, size in bytes). Raises FileTooLargeError
+    as soon as max_size is exceeded; the partial file is removed.
+    """
+    sha = hashlib.sha256()
+    size = 0
+
+    try:
+        with open(dest_path, "wb") as out:
+            while chunk := src.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise FileTooLargeError(dest_path)
+                sha.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        raise
+
+    return sha.hexdigest(), size
+
+
+def stage_upload(file: UploadFile):
+    """
+    Spool a single upload to UPLOAD_DIR and pre-check it.
+
+    Returns (file_path, file_hash, None), or (None, None, response) when
+    the file is rejected: invalid type, empty, too large or a duplicate.
+    Nothing here touches Whisper.
+    """
+    safe_name = os.path.basename(file.filename or "")
+    ext = os.path.splitext(safe_name.lower())[1]
+
+    if ext not in ALLOWED_EXTENSIONS:
+        return None, None, {
+            "status": "failed",
+            "reason": "invalid_file_type",
+            "allowed_extensions": sorted(ALLOWED_EXTENSIONS),
+        }
+
+    file_path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4()}_{safe_name}")
+
+    try:
+        file_hash, size = save_upload_stream(file.file, file_path)
+    except FileTooLargeError:
+        return None, None, {
+            "status": "failed",
+            "reason": "file_too_large",
+            "max_size_mb": MAX_FILE_SIZE // (1024 * 1024),
+        }
+
+    if size == 0:
+        os.remove(file_path)
+        return None, None, {"status": "failed", "reason": "empty_file"}
+
+    existing = call_exists(file_hash)
+    if existing:
+        os.remove(file_path)
+        return None, None, {
+            "status": "duplicate",
+            "message": "This call has already been analyzed",
+            "existing_call_id": existing["id"],
+        }
+
+    return file_path, file_hash, None
+
+
+def stage_batch_file(filename: str, src, seen_hashes: set) -> dict:
+    """
+    Write one batch member to UPLOAD_DIR and pre-check it.
+
+    Invalid, empty, oversized and duplicate files get a final status
+    here so the job never spends Whisper time on them.
+    """
+    safe_name = os.path.basename(filename or "")
+    ext = os.path.splitext(safe_name.lower())[1]
+
+    if ext not in ALLOWED_EXTENSIONS:
+        return {"filename": safe_name, "status": "failed", "error": "invalid_file_type"}
+
+    file_path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4()}_{safe_name}")
+
+    try:
+        file_hash, size = save_upload_stream(src, file_path)
+    except FileTooLargeError:
+        return {"filename": safe_name, "status": "failed", "error": "file_too_large"}
+
+    if size == 0:
+        os.remove(file_path)
+        return {"filename": safe_name, "status": "failed", "error": "empty_file"}
+
+    existing = call_exists(file_hash)
+    if existing or file_hash in seen_hashes:
+        os.remove(file_path)
+        return {
+            "filename": safe_name,
+            "status": "duplicate",
+            "call_id": existing["id"] if existing else None,
+        }
+
+    seen_hashes.add(file_hash)
+    return {"filename": safe_name, "path": file_path, "file_hash": file_hash}
+
+def store_analysis(file_hash, transcript, insights, segments=None) -> dict:
+    """Insert an analyzed call and build the /analyze-call response."""
+    issue_category = insights.get("issue_category", ["other"])
+    if isinstance(issue_category, list):
+        insights["issue_category"] = ",".join(issue_category)
+    elif isinstance(issue_category, str):
+        insights["issue_category"] = issue_category
+    else:
+        insights["issue_category"] = "other"
+
+    insert_result = insert_call(
+        file_hash=file_hash,
+        transcript=transcript,
+        insights=insights,
+        segments=segments,
+    )
+
+    if insert_result.get("inserted"):
+        schedule_risk_refresh()
+        return {
+            "status": "success",
+            "analysis": {
+                "id": insert_result["id"],
+                "transcript": transcript,
+                "insights": insights,
+            },
+        }
+
+    if insert_result.get("reason") == "duplicate":
+        existing = call_exists(file_hash)
+        return {
+            "status": "duplicate",
+            "message": "This call has already been analyzed",
+            "existing_call_id": existing["id"] if existing else None,
+        }
+
+    return {
+        "status": "failed",
+        "reason": insert_result.get("reason"),
+        "error": insert_result.get("error"),
+    }
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 # -----------------------------
 # Health
@@ -72,6 +289,14 @@ def compute_file_hash(file_bytes: bytes) -> str:
 def root():
     return {"message": "Customer Support Call Analytics API is running"}
 
+# -----------------------------
+# Warmup
+# -----------------------------
+@app.post("/warmup")
+def warmup_models():
+    """Preload models so the first analysis request is not slowed down"""
+    return {"status": "ready", "load_seconds": warmup()}
+
 # -----------------------------
 # Analyze Call (AUDIO)
 # -----------------------------
@@ -80,98 +305,156 @@ async def analyze_call(file: UploadFile = File(...)):
     file_path = None
 
     try:
-        filename = file.filename.lower()
-        ext = os.path.splitext(filename)[1]
+        # Copied to disk in 1 MB chunks off the event loop; the hash, size
+        # limit and duplicate check are done before any Whisper work
+        file_path, file_hash, rejected = await asyncio.to_thread(stage_upload, file)
+        if rejected:
+            return rejected
+
+        analysis = await asyncio.to_thread(analyze_input, file_path, "call")
 
-        if ext not in ALLOWED_EXTENSIONS:
+        transcript = analysis.get("transcript", "")
+        insights = analysis.get("insights", analysis)
+
+        if not transcript.strip():
             return {
                 "status": "failed",
-                "reason": "invalid_file_type",
-                "allowed_extensions": sorted(ALLOWED_EXTENSIONS),
+                "reason": "transcription_failed"
             }
 
-        file_bytes = await file.read()
+        result = store_analysis(
+            file_hash, transcript, insights, analysis.get("segments")
+        )
+        if result["status"] == "success":
+            # Seconds of silence/non-speech cut before Whisper
+            result["analysis"]["preprocessing"] = analysis.get("preprocessing")
+        return result
 
-        if not file_bytes:
-            return {"status": "failed", "reason": "empty_file"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        if len(file_bytes) > MAX_FILE_SIZE:
-            return {
-                "status": "failed",
-                "reason": "file_too_large",
-                "max_size_mb": 50,
-            }
+    finally:
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
 
-        file_hash = compute_file_hash(file_bytes)
-        existing = call_exists(file_hash)
+# -----------------------------
+# Streaming Analyze (AUDIO)
+# -----------------------------
+def stream_analysis(file_path: str, file_hash: str):
+    """
+    SSE events for one call: "info", one "segment" per decoded segment,
+    then "result" (same body as /analyze-call) or "error".
+    """
+    try:
+        segments = []
+        for kind, payload in iter_transcription(file_path):
+            if kind == "segment":
+                segments.append(payload)
+            yield sse_event(kind, payload)
 
-        if existing:
-            return {
-                "status": "duplicate",
-                "message": "This call has already been analyzed",
-                "existing_call_id": existing["id"],
-            }
+        segments.sort(key=lambda seg: (seg["start"], seg["end"]))
+        transcript = segments_to_transcript(segments)
+        if not transcript:
+            yield sse_event("error", {"status": "failed", "reason": "transcription_failed"})
+            return
 
-        safe_name = os.path.basename(file.filename)
-        file_id = str(uuid.uuid4())
-        file_path = os.path.join(UPLOAD_DIR, f"{file_id}_{safe_name}")
+        insights = analyze_transcript(transcript, segments)
+        yield sse_event("result", store_analysis(file_hash, transcript, insights, segments))
 
-        with open(file_path, "wb") as f:
-            f.write(file_bytes)
+    except Exception as e:
+        yield sse_event("error", {"status": "failed", "reason": "exception", "error": str(e)})
 
-        analysis = await asyncio.to_thread(analyze_input, file_path, "call")
+    finally:
+        if os.path.exists(file_path):
+            os.remove(file_path)
 
-        transcript = analysis.get("transcript", "")
-        insights = analysis.get("insights", analysis)
 
-        if not transcript.strip():
-            return {
-                "status": "failed",
-                "reason": "transcription_failed"
-            }
+@app.post("/analyze-call/stream")
+def analyze_call_stream(file: UploadFile = File(...)):
+    """
+    Like /analyze-call, but streams transcript segments as Server-Sent
+    Events while Whisper decodes, so long calls show output in seconds.
 
-        issue_category = insights.get("issue_category", ["other"])
-        if isinstance(issue_category, list):
-            insights["issue_category"] = ",".join(issue_category)
-        elif isinstance(issue_category, str):
-            insights["issue_category"] = issue_category
+    Validation failures and duplicates are answered with plain JSON.
+    """
+    file_path, file_hash, rejected = stage_upload(file)
+    if rejected:
+        return rejected
+
+    return StreamingResponse(
+        stream_analysis(file_path, file_hash),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# -----------------------------
+# Batch Analyze (AUDIO)
+# -----------------------------
+@app.post("/analyze-calls/batch", status_code=202)
+def analyze_calls_batch(files: List[UploadFile] = File(...)):
+    """
+    Queue many recordings (individual files and/or .zip archives).
+
+    Returns a job ID immediately; poll /jobs/{job_id} for progress.
+    """
+    staged = []
+    seen_hashes = set()
+
+    def discard_staged():
+        for entry in staged:
+            path = entry.get("path")
+            if path and os.path.exists(path):
+                os.remove(path)
+
+    def add(filename, src):
+        if len(staged) >= Config.BATCH_MAX_FILES:
+            discard_staged()
+            raise HTTPException(
+                status_code=413,
+                detail=f"Too many files (max {Config.BATCH_MAX_FILES})"
+            )
+        staged.append(stage_batch_file(filename, src, seen_hashes))
+
+    for upload in files:
+        if upload.filename.lower().endswith(".zip"):
+            try:
+                with zipfile.ZipFile(upload.file) as archive:
+                    for member in archive.infolist():
+                        if member.is_dir():
+                            continue
+                        with archive.open(member) as src:
+                            add(member.filename, src)
+            except zipfile.BadZipFile:
+                discard_staged()
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Invalid zip archive: {upload.filename}"
+                )
         else:
-            insights["issue_category"] = "other"
+            add(upload.filename, upload.file)
 
-        insert_result = insert_call(
-            file_hash=file_hash,
-            transcript=transcript,
-            insights=insights,
-        )
+    if not staged:
+        raise HTTPException(status_code=400, detail="No files in upload")
 
-        if insert_result.get("inserted"):
-            return {
-                "status": "success",
-                "analysis": {
-                    "transcript": transcript,
-                    "insights": insights,
-                },
-            }
+    job_id = create_job(staged)
 
-        if insert_result.get("reason") == "duplicate":
-            return {
-                "status": "duplicate",
-                "message": "This call has already been analyzed",
-                "existing_call_id": existing["id"] if existing else None,
-            }
+    return {
+        "status": "queued",
+        "job_id": job_id,
+        "total_files": len(staged),
+    }
 
-        return {
-            "status": "failed",
-            "reason": insert_result.get("reason"),
-            "error": insert_result.get("error"),
-        }
+# -----------------------------
+# Jobs
+# -----------------------------
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = get_job(job_id)
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
 
-    finally:
-        if file_path and os.path.exists(file_path):
-            os.remove(file_path)
+    return job
 
 # -----------------------------
 # Unified Analyze (TEXT)
@@ -188,8 +471,112 @@ def analyze(payload: AnalyzeRequest):
 # Fetch calls
 # -----------------------------
 @app.get("/calls")
-def get_calls():
-    return fetch_all_calls()
+def get_calls(
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    sentiment: Optional[Literal["positive", "neutral", "negative"]] = None,
+    urgency: Optional[Literal["low", "medium", "high"]] = None,
+    outcome: Optional[Literal["resolved", "unresolved"]] = None,
+    category: Optional[Literal["billing", "delivery", "refund", "technical", "other"]] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    fields: Optional[str] = None,
+):
+    """
+    Newest-first call listing.
+
+    Returns at most `limit` calls (default 50); the cursor for the next
+    page is returned in the X-Next-Cursor header. `fields=id,sentiment,...`
+    skips columns such as the transcript.
+    """
+    try:
+        page = fetch_calls(
+            limit=limit,
+            cursor=cursor,
+            sentiment=sentiment,
+            urgency=urgency,
+            outcome=outcome,
+            category=category,
+            start_date=start_date,
+            end_date=end_date,
+            fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if page["next_cursor"]:
+        response.headers["X-Next-Cursor"] = page["next_cursor"]
+
+    return page["items"]
+
+# -----------------------------
+# Search
+# -----------------------------
+# Declared before /calls/{call_id} so "search" isn't taken as a call id
+@app.get("/calls/search")
+def search(
+    q: str = Query(..., min_length=1, max_length=500),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10000),
+    sentiment: Optional[Literal["positive", "neutral", "negative"]] = None,
+    urgency: Optional[Literal["low", "medium", "high"]] = None,
+    outcome: Optional[Literal["resolved", "unresolved"]] = None,
+    category: Optional[Literal["billing", "delivery", "refund", "technical", "other"]] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+):
+    """
+    Full-text search over transcripts, best match first.
+
+    Every word must match; use "quotes" for phrases and a trailing *
+    for prefixes (refund*). Each result carries a `snippet` with the
+    matches in <mark> tags.
+    """
+    try:
+        return search_calls(
+            q,
+            limit=limit,
+            offset=offset,
+            sentiment=sentiment,
+            urgency=urgency,
+            outcome=outcome,
+            category=category,
+            start_date=start_date,
+            end_date=end_date,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# -----------------------------
+# Segments
+# -----------------------------
+@app.get("/calls/{call_id}/segments")
+def get_call_segments(call_id: int):
+    return fetch_call_segments(call_id)
+
+# -----------------------------
+# Similar calls
+# -----------------------------
+@app.get("/calls/{call_id}/similar")
+def get_similar_calls(
+    call_id: int,
+    limit: int = Query(10, ge=1, le=100),
+    outcome: Optional[Literal["resolved", "unresolved"]] = None,
+):
+    """
+    Stored calls with the most similar transcripts, best first.
+    `outcome=resolved` shows how calls like this one were resolved.
+    """
+    if Config.EMBEDDING_BACKEND == "off":
+        raise HTTPException(status_code=503, detail="Similar-call lookup is disabled")
+
+    try:
+        return find_similar(call_id, limit=limit, outcome=outcome)
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Call not found")
+    except NotEmbeddedYet as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
 # -----------------------------
 # Delete
@@ -201,6 +588,8 @@ def delete_call(call_id: int):
     if deleted == 0:
         raise HTTPException(status_code=404, detail="Call not found")
 
+    schedule_risk_refresh()
+
     return {
         "status": "deleted",
         "id": call_id
@@ -213,11 +602,40 @@ def delete_call(call_id: int):
 def get_summary():
     return fetch_summary()
 
+# -----------------------------
+# Call detail
+# -----------------------------
+# Declared after /calls/summary so that path isn't taken as a call id
+@app.get("/calls/{call_id}")
+def get_call(call_id: int):
+    call = fetch_call(call_id)
+    if call is None:
+        raise HTTPException(status_code=404, detail="Call not found")
+    return call
+
 # =======================
 # Analytics Endpoints - SINGLE ML FEATURE
 # =======================
 
 @app.get("/analytics/operational-risk")
 def operational_risk():
-    """ML-powered operational risk score"""
-    return calculate_operational_risk()
\ No newline at end of file
+    """ML-powered operational risk score, served from the cached model"""
+    return calculate_operational_risk()
+
+
+@app.get("/analytics/llm-cache")
+def llm_cache_stats():
+    """LLM result cache hit/miss counters (this process) and size"""
+    return llm_cache.stats()
+
+
+@app.get("/analytics/preclassifier")
+def preclassifier_stats():
+    """Share of calls handled without the LLM, and accuracy against LLM labels"""
+    return triage.stats()
+
+
+@app.get("/analytics/overview")
+def analytics_overview(window: Literal["7d", "30d", "all"] = "7d"):
+    """Dashboard aggregates for a time window, computed server-side"""
+    return fetch_overview(window)
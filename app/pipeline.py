@@ -1,13 +1,98 @@
-from faster_whisper import WhisperModel
-import ollama
+import re
+import time
+import queue
+import asyncio
+import textwrap
+import threading
 import json
+from concurrent.futures import Future, ThreadPoolExecutor
 import json5
+from app import llm_cache
+from app.config import Config
+from app.llm import get_llm_backend
 from app.models import CallAnalysis
 
-OLLAMA_MODEL = "phi3"
+# Bump whenever the classification prompt changes; it is part of the
+# LLM cache key, so old cached results stop matching.
+PROMPT_VERSION = "2"
 
-# Load Whisper once
-whisper_model = WhisperModel("base", device="cpu", compute_type="float32")
+# Whisper is loaded once per process, on first use. In "service" mode
+# API processes never load it; the transcription service owns the model.
+_whisper_models = {}
+_whisper_lock = threading.Lock()
+
+
+def get_whisper_settings(profile: str = None) -> dict:
+    """Resolve a Whisper profile from Config, applying WHISPER_* overrides."""
+    name = profile or Config.WHISPER_PROFILE
+    if name not in Config.WHISPER_PROFILES:
+        raise ValueError(f"Unknown Whisper profile: {name}")
+
+    settings = dict(Config.WHISPER_PROFILES[name])
+    settings["cpu_threads"] = Config.WHISPER_CPU_THREADS
+    settings["num_workers"] = Config.WHISPER_NUM_WORKERS
+
+    # Explicit overrides only apply to the configured profile
+    if profile is None:
+        if Config.WHISPER_MODEL_SIZE:
+            settings["model_size"] = Config.WHISPER_MODEL_SIZE
+        if Config.WHISPER_COMPUTE_TYPE:
+            settings["compute_type"] = Config.WHISPER_COMPUTE_TYPE
+        if Config.WHISPER_BEAM_SIZE:
+            settings["beam_size"] = int(Config.WHISPER_BEAM_SIZE)
+        if Config.WHISPER_VAD_FILTER:
+            settings["vad_filter"] = Config.WHISPER_VAD_FILTER == "1"
+
+    return settings
+
+
+def get_whisper_model(profile: str = None):
+    settings = get_whisper_settings(profile)
+    key = (
+        settings["model_size"],
+        settings["compute_type"],
+        settings["cpu_threads"],
+        settings["num_workers"],
+    )
+
+    with _whisper_lock:
+        if key not in _whisper_models:
+            from faster_whisper import WhisperModel
+            _whisper_models[key] = WhisperModel(
+                settings["model_size"],
+                device="cpu",
+                compute_type=settings["compute_type"],
+                cpu_threads=settings["cpu_threads"],
+                num_workers=settings["num_workers"],
+            )
+        return _whisper_models[key]
+
+
+def warmup() -> dict:
+    """
+    Load the heavy dependencies now instead of on the first request.
+
+    Returns seconds spent per component.
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    if Config.TRANSCRIPTION_MODE == "service":
+        from app.transcription_service import service_available
+        timings["transcription_service_available"] = service_available()
+    else:
+        get_whisper_model()
+    timings["whisper"] = round(time.perf_counter() - start, 3)
+
+    start = time.perf_counter()
+    get_llm_backend().warmup()
+    timings["llm"] = round(time.perf_counter() - start, 3)
+
+    start = time.perf_counter()
+    import app.risk_model  # noqa: F401
+    timings["risk_model"] = round(time.perf_counter() - start, 3)
+
+    return timings
 
 
 # -----------------------------
@@ -16,25 +101,261 @@ whisper_model = WhisperModel("base", device="cpu", compute_type="float32")
 def transcribe_audio(audio_path: str) -> dict:
     """
     Returns transcription result with status metadata.
+
+    Uses the shared transcription service when TRANSCRIPTION_MODE is
+    "service", otherwise the in-process model.
+    """
+    if Config.TRANSCRIPTION_MODE == "service":
+        from app.transcription_service import transcribe_via_service
+        return transcribe_via_service(audio_path)
+
+    return transcribe_audio_local(audio_path)
+
+
+def iter_transcription(audio_path: str):
+    """
+    Stream a transcription as Whisper decodes it.
+
+    Yields ("info", {"language", "duration"}) first, then one
+    ("segment", {"start", "end", "text"}) per decoded segment.
+    """
+    if Config.TRANSCRIPTION_MODE == "service":
+        from app.transcription_service import stream_via_service
+        yield from stream_via_service(audio_path)
+        return
+
+    yield from iter_transcription_local(audio_path)
+
+
+# The prompt's speaker rule names these roles, so they are the only
+# labels SPEAKER_CHANNELS accepts
+SPEAKER_ROLES = ("agent", "customer")
+
+
+def speaker_labels() -> list:
+    labels = [s.strip().lower() for s in Config.SPEAKER_CHANNELS.split(",") if s.strip()]
+    if labels and sorted(labels) != sorted(SPEAKER_ROLES):
+        raise ValueError(
+            "SPEAKER_CHANNELS names the stereo channels in order and must be "
+            "agent,customer or customer,agent"
+        )
+    return labels
+
+
+def _prepare_audio(audio_path: str):
+    """
+    What to hand Whisper: a list of (speaker, audio, kept spans), one per
+    speaker channel or a single (None, ...) entry, plus the preprocessing
+    report (None when the file goes to Whisper as is).
+    """
+    labels = speaker_labels()
+    if labels:
+        from app.audio import preprocess_channels
+        channels = preprocess_channels(audio_path)
+        if len(channels) == 2:
+            reports = {label: ch["report"] for label, ch in zip(labels, channels)}
+            kept = sum(r["kept_seconds"] for r in reports.values())
+            original = channels[0]["report"]["original_seconds"]
+            report = {
+                "mode": Config.AUDIO_PREPROCESS,
+                "original_seconds": original,
+                # Audio seconds sent to Whisper over all channels
+                "kept_seconds": round(kept, 2),
+                "removed_seconds": round(original * len(channels) - kept, 2),
+                "speakers": reports,
+            }
+            return [
+                (label, ch["audio"], ch["spans"]) for label, ch in zip(labels, channels)
+            ], report
+
+        # Mono or dual mono: use the mix from the same decode
+        prepared = channels[0]
+        if Config.AUDIO_PREPROCESS == "off":
+            return [(None, prepared["audio"], None)], None
+        return [(None, prepared["audio"], prepared["spans"])], prepared["report"]
+
+    if Config.AUDIO_PREPROCESS == "off":
+        return [(None, audio_path, None)], None
+
+    from app.audio import preprocess
+    prepared = preprocess(audio_path)
+    return [(None, prepared["audio"], prepared["spans"])], prepared["report"]
+
+
+def _channel_segments(segments, spans, speaker):
+    """Segment dicts in original-recording time, labelled with the speaker."""
+    if spans is not None:
+        from app.audio import to_original_seconds
+
+    # faster-whisper decodes lazily: each segment is ready as soon as
+    # its window has been decoded
+    for seg in segments:
+        text = seg.text.strip()
+        if not text:
+            continue
+        start, end = seg.start, seg.end
+        if spans is not None:
+            start = to_original_seconds(start, spans)
+            end = to_original_seconds(end, spans, is_end=True)
+        segment = {"start": round(float(start), 2), "end": round(float(end), 2), "text": text}
+        if speaker:
+            segment["speaker"] = speaker
+        yield segment
+
+
+def _transcribe_channels(model, settings, channels):
+    """
+    Decode every channel on its own thread (real parallelism needs
+    WHISPER_NUM_WORKERS >= channels). Yields ("info", ...) per channel,
+    then ("segment", ...) in the order they are decoded.
+
+    If the caller stops early (an SSE client disconnects) or a channel
+    fails, the other channels stop at their next segment; nothing waits
+    for them to finish.
+    """
+    events = queue.Queue()
+    stop = threading.Event()
+
+    def run(speaker, audio, spans):
+        try:
+            if spans == []:
+                events.put(("info", None))
+                return
+            segments, info = model.transcribe(
+                audio,
+                beam_size=settings["beam_size"],
+                vad_filter=settings["vad_filter"],
+            )
+            events.put(("info", info))
+            # faster-whisper decodes lazily, so this is where work stops
+            for segment in _channel_segments(segments, spans, speaker):
+                if stop.is_set():
+                    return
+                events.put(("segment", segment))
+        except Exception as e:
+            events.put(("error", e))
+        finally:
+            events.put(("done", None))
+
+    pool = ThreadPoolExecutor(max_workers=len(channels), thread_name_prefix="whisper-channel")
+    try:
+        for channel in channels:
+            pool.submit(run, *channel)
+
+        running = len(channels)
+        while running:
+            kind, payload = events.get()
+            if kind == "done":
+                running -= 1
+            elif kind == "error":
+                raise payload
+            else:
+                yield kind, payload
+    finally:
+        stop.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_transcription_local(audio_path: str, profile: str = None):
+    settings = get_whisper_settings(profile)
+
+    # Decode, trim and normalize up front (AUDIO_PREPROCESS), split into
+    # speaker channels if SPEAKER_CHANNELS is set; Whisper then gets
+    # arrays and timestamps are mapped back to the recording
+    channels, report = _prepare_audio(audio_path)
+    duration = report["original_seconds"] if report else None
+
+    if all(spans == [] for _, _, spans in channels):
+        # Nothing but silence: skip Whisper entirely
+        yield "info", {"language": None, "duration": duration, "preprocessing": report}
+        return
+
+    model = get_whisper_model(profile)
+
+    if len(channels) == 1:
+        _, audio, spans = channels[0]
+        segments, info = model.transcribe(
+            audio,
+            beam_size=settings["beam_size"],
+            vad_filter=settings["vad_filter"],
+        )
+        yield "info", {
+            "language": info.language if info else None,
+            "duration": duration if report else (info.duration if info else None),
+            "preprocessing": report,
+        }
+        for segment in _channel_segments(segments, spans, None):
+            yield "segment", segment
+        return
+
+    # Speaker channels: hold segments back until every channel has
+    # reported its info, so "info" is still the first event
+    infos, pending = [], []
+    for kind, payload in _transcribe_channels(model, settings, channels):
+        if kind == "info":
+            infos.append(payload)
+            if len(infos) == len(channels):
+                language = next((i.language for i in infos if i), None)
+                yield "info", {"language": language, "duration": duration, "preprocessing": report}
+                for segment in pending:
+                    yield "segment", segment
+                pending = None
+        elif pending is not None:
+            pending.append(payload)
+        else:
+            yield "segment", payload
+
+
+def segments_to_transcript(segments: list) -> str:
+    """
+    Plain text for the LLM. Speaker-labelled segments are put in time
+    order and merged into turns, one "Speaker: ..." line per turn.
     """
+    if not any(seg.get("speaker") for seg in segments):
+        return " ".join(seg["text"] for seg in segments).strip()
+
+    turns = []
+    for seg in sorted(segments, key=lambda s: (s["start"], s["end"])):
+        speaker = (seg.get("speaker") or "unknown").capitalize()
+        if turns and turns[-1][0] == speaker:
+            turns[-1][1].append(seg["text"])
+        else:
+            turns.append((speaker, [seg["text"]]))
+    return "\n".join(f"{speaker}: {' '.join(texts)}" for speaker, texts in turns)
+
+
+def transcribe_audio_local(audio_path: str, profile: str = None) -> dict:
     try:
-        segments, info = whisper_model.transcribe(audio_path)
+        info = {}
+        segments = []
+        for kind, payload in iter_transcription_local(audio_path, profile):
+            if kind == "info":
+                info = payload
+            else:
+                segments.append(payload)
 
-        text = " ".join(seg.text for seg in segments).strip()
+        segments.sort(key=lambda seg: (seg["start"], seg["end"]))
+        text = segments_to_transcript(segments)
 
         if not text:
             return {
                 "success": False,
                 "text": "",
                 "error": "empty_transcript",
-                "language": info.language if info else None
+                "language": info.get("language"),
+                "duration": info.get("duration"),
+                "preprocessing": info.get("preprocessing"),
+                "segments": []
             }
 
         return {
             "success": True,
             "text": text,
             "error": None,
-            "language": info.language if info else None
+            "language": info.get("language"),
+            "duration": info.get("duration"),
+            "preprocessing": info.get("preprocessing"),
+            "segments": segments
         }
 
     except Exception as e:
@@ -42,11 +363,11 @@ def transcribe_audio(audio_path: str) -> dict:
             "success": False,
             "text": "",
             "error": f"transcription_exception: {str(e)}",
-            "language": None
+            "language": None,
+            "segments": []
         }
 
 
-
 # -----------------------------
 # Unified Input Analysis
 # -----------------------------
@@ -64,6 +385,8 @@ def analyze_input(content: str, input_type: str = "call") -> dict:
             }
 
         transcript = tx["text"]
+        segments = tx.get("segments", [])
+        preprocessing = tx.get("preprocessing")
 
     else:
         transcript = content.strip()
@@ -75,12 +398,16 @@ def analyze_input(content: str, input_type: str = "call") -> dict:
                 "transcript": "",
                 "insights": {}
             }
+        segments = []
+        preprocessing = None
 
-    analysis = analyze_transcript(transcript)
+    analysis = analyze_transcript(transcript, segments)
 
     return {
         "status": "success",
         "transcript": transcript,
+        "segments": segments,
+        "preprocessing": preprocessing,
         "insights": analysis
     }
 
@@ -101,7 +428,7 @@ def derive_call_outcome(data: dict) -> str:
 # -----------------------------
 # STRICT LLM ANALYSIS
 # -----------------------------
-def analyze_transcript(transcript: str) -> dict:
+def _guard_result(transcript: str):
     # 🚨 HARD GUARD: empty or meaningless transcript
     if not transcript or len(transcript.strip()) < 5:
         return {
@@ -111,8 +438,103 @@ def analyze_transcript(transcript: str) -> dict:
             "agent_behavior": "unknown",
             "call_outcome": "unresolved",
         }
+    return None
+
+
+def _preclassify(transcript: str):
+    """Confident result from the first-tier classifier, or None."""
+    if not Config.PRECLASSIFIER_ENABLED:
+        return None
+    from app import triage
+    return triage.preclassify(transcript)
+
+
+def _observe(transcript: str, result: dict):
+    if Config.PRECLASSIFIER_ENABLED:
+        from app import triage
+        triage.observe(transcript, result)
+
+
+def _cache_key(transcript: str) -> str:
+    # The layout changes what the model sees, so it is part of the version
+    version = f"{PROMPT_VERSION}/{Config.LLM_PROMPT_LAYOUT}"
+    return llm_cache.cache_key(transcript, version, get_llm_backend().name)
+
+
+def analyze_transcript(transcript: str, segments: list = None) -> dict:
+    """
+    Classify one transcript. Transcripts longer than LLM_CHUNK_CHARS are
+    classified in overlapping chunks (split on the Whisper `segments`
+    when given) and the chunk results merged.
+    """
+    guarded = _guard_result(transcript)
+    if guarded is not None:
+        return guarded
+
+    # Identical transcripts (after normalization) reuse earlier results
+    key = None
+    if Config.LLM_CACHE_ENABLED:
+        key = _cache_key(transcript)
+        cached = llm_cache.get(key)
+        if cached is not None:
+            return cached
 
-    prompt = f"""
+    preclassified = _preclassify(transcript)
+    if preclassified is not None:
+        return preclassified
+
+    result, cacheable = _classify(transcript, segments)
+    _observe(transcript, result)
+
+    if key and cacheable:
+        llm_cache.put(key, result)
+
+    return result
+
+
+async def analyze_transcript_async(transcript: str, segments: list = None) -> dict:
+    """
+    analyze_transcript() for asyncio callers, via the backend's achat().
+    The cache and the first-tier classifier read SQLite, so they run in
+    worker threads rather than on the event loop.
+    """
+    guarded = _guard_result(transcript)
+    if guarded is not None:
+        return guarded
+
+    backend = get_llm_backend()
+
+    key = None
+    if Config.LLM_CACHE_ENABLED:
+        key = _cache_key(transcript)
+        cached = await asyncio.to_thread(llm_cache.get, key)
+        if cached is not None:
+            return cached
+
+    preclassified = await asyncio.to_thread(_preclassify, transcript)
+    if preclassified is not None:
+        return preclassified
+
+    if len(transcript) > Config.LLM_CHUNK_CHARS:
+        chunks = chunk_transcript(transcript, segments)
+        replies = await asyncio.gather(*(backend.achat(build_messages(c)) for c in chunks))
+        result, cacheable = merge_chunk_replies(replies)
+    else:
+        raw = await backend.achat(build_messages(transcript))
+        result, cacheable = interpret_llm_output(raw)
+    _observe(transcript, result)
+
+    if key and cacheable:
+        await asyncio.to_thread(llm_cache.put, key, result)
+
+    return result
+
+
+# Static instructions and few-shot examples shared by single and batch
+# prompts; only the TASK section differs. With the "split" layout they are
+# sent as an unchanging system message, so the runtime can reuse the
+# cached prefix and only process the per-call user message.
+PROMPT_INSTRUCTIONS = """
 You are a STRICT classification engine for customer support calls.
 You are NOT an assistant.
 You do NOT explain.
@@ -154,6 +576,8 @@ CRITICAL RULES
 - If a refund is requested, processed, confirmed, discussed, or mentioned at ANY point,
   you MUST include "refund" in issue_category.
 - NEVER infer missing facts
+- If lines start with "Agent:" or "Customer:", judge agent_behavior only from
+  Agent lines, and customer_confirmation only from Customer lines
 - If transcript lacks sufficient information, default safely
 - Output INVALID values = FAILURE
 
@@ -164,7 +588,7 @@ FEW-SHOT EXAMPLES
 Transcript:
 "Thank you for calling, we will look into this and get back to you."
 JSON:
-{{
+{
   "sentiment": "neutral",
   "issue_category": ["other"],
   "urgency": "medium",
@@ -172,12 +596,12 @@ JSON:
   "resolution_action_taken": "no",
   "customer_confirmation": "no",
   "pending_followup": "yes"
-}}
+}
 
 Transcript:
 "I was charged twice yesterday. You have confirmed the refund to my card."
 JSON:
-{{
+{
   "sentiment": "neutral",
   "issue_category": ["billing", "refund"],
   "urgency": "medium",
@@ -185,13 +609,13 @@ JSON:
   "resolution_action_taken": "yes",
   "customer_confirmation": "yes",
   "pending_followup": "no"
-}}
+}
 
 
 Transcript:
 "My package arrived late and I was charged extra."
 JSON:
-{{
+{
   "sentiment": "negative",
   "issue_category": ["delivery", "billing"],
   "urgency": "medium",
@@ -199,12 +623,12 @@ JSON:
   "resolution_action_taken": "no",
   "customer_confirmation": "no",
   "pending_followup": "yes"
-}}
+}
 
 Transcript:
 "I'm still facing the issue. You said it would be fixed yesterday."
 JSON:
-{{
+{
   "sentiment": "negative",
   "issue_category": ["technical"],
   "urgency": "high",
@@ -212,12 +636,12 @@ JSON:
   "resolution_action_taken": "no",
   "customer_confirmation": "no",
   "pending_followup": "yes"
-}}
+}
 
 Transcript:
 "Yes, it is working now. Thanks for fixing it."
 JSON:
-{{
+{
   "sentiment": "positive",
   "issue_category": ["technical"],
   "urgency": "low",
@@ -225,12 +649,12 @@ JSON:
   "resolution_action_taken": "yes",
   "customer_confirmation": "yes",
   "pending_followup": "no"
-}}
+}
 
 Transcript:
 "I understand the issue, but I cannot resolve this right now."
 JSON:
-{{
+{
   "sentiment": "neutral",
   "issue_category": ["other"],
   "urgency": "medium",
@@ -238,9 +662,23 @@ JSON:
   "resolution_action_taken": "no",
   "customer_confirmation": "no",
   "pending_followup": "yes"
-}}
+}
 
-====================
+"""
+
+
+def _layout(task: str) -> list:
+    """Chat messages for one request, per LLM_PROMPT_LAYOUT."""
+    if Config.LLM_PROMPT_LAYOUT == "single":
+        return [{"role": "user", "content": PROMPT_INSTRUCTIONS + task}]
+    return [
+        {"role": "system", "content": PROMPT_INSTRUCTIONS},
+        {"role": "user", "content": task},
+    ]
+
+
+def build_messages(transcript: str) -> list:
+    return _layout(f"""====================
 TASK
 ====================
 
@@ -250,9 +688,14 @@ No markdown. No explanation.
 
 Transcript:
 \"\"\"{transcript}\"\"\"
-"""
+""")
+
 
-    raw = _call_llm(prompt)
+def interpret_llm_output(raw: str):
+    """
+    Parse and validate one LLM reply. Returns (result, cacheable);
+    results built from fallbacks are not cacheable.
+    """
     parsed = _extract_json(raw)
 
     fallback = {
@@ -265,6 +708,7 @@ Transcript:
         "pending_followup": "no",
     }
 
+    cacheable = bool(parsed)
     if not parsed:
         parsed = fallback
 
@@ -272,8 +716,10 @@ Transcript:
 
     try:
         validated = CallAnalysis(**parsed).dict()
-        validated["_llm_status"] = "ok"
-        return validated
+        # Canned defaults must not pass for the model's answer downstream
+        # (pre-classifier training and shadow scoring)
+        validated["_llm_status"] = "ok" if cacheable else "fallback"
+        return validated, cacheable
 
     except Exception:
         return {
@@ -283,19 +729,366 @@ Transcript:
             "agent_behavior": "unknown",
             "call_outcome": "unresolved",
             "_llm_status": "validation_failed"
-        }
+        }, False
+
 
+def _classify(transcript: str, segments: list = None):
+    """Uncached LLM classification. Returns (result, cacheable)."""
+    if len(transcript) > Config.LLM_CHUNK_CHARS:
+        return _classify_chunked(transcript, segments)
+    return interpret_llm_output(_call_llm(build_messages(transcript)))
 
 
 # -----------------------------
-# Helpers
+# CHUNKED ANALYSIS (long calls)
+# -----------------------------
+URGENCY_ORDER = ("low", "medium", "high")
+# agent_behavior merges to the worst behaviour seen anywhere in the call
+BEHAVIOR_SEVERITY = ("unknown", "polite", "neutral", "rude")
+CATEGORY_ORDER = ("billing", "delivery", "refund", "technical", "other")
+EVIDENCE_DEFAULTS = {
+    "resolution_action_taken": "unclear",
+    "customer_confirmation": "unclear",
+    "pending_followup": "no",
+}
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def chunk_transcript(transcript: str, segments: list = None) -> list:
+    """
+    Split into chunks of at most LLM_CHUNK_CHARS on Whisper segment
+    boundaries (sentence boundaries without segments). Each chunk starts
+    with up to LLM_CHUNK_OVERLAP_CHARS of the previous one's tail so
+    context spanning a boundary is seen by both; less of it when the
+    chunk would otherwise outgrow LLM_CHUNK_CHARS.
+    """
+    max_chars = Config.LLM_CHUNK_CHARS
+    overlap = Config.LLM_CHUNK_OVERLAP_CHARS
+
+    if segments and any(seg.get("speaker") for seg in segments):
+        # One piece per speaker turn; parts of a long turn keep the label
+        pieces = []
+        for line in segments_to_transcript(segments).split("\n"):
+            speaker, _, text = line.partition(": ")
+            pieces += [
+                f"{speaker}: {part}"
+                for part in textwrap.wrap(text, max(1, max_chars - len(speaker) - 2))
+            ]
+    elif segments:
+        pieces = [seg["text"].strip() for seg in segments if (seg.get("text") or "").strip()]
+    else:
+        pieces = [p for p in _SENTENCE_END.split(transcript.strip()) if p]
+
+    # A single piece can't exceed the chunk size either
+    pieces = [
+        part
+        for piece in pieces
+        for part in (textwrap.wrap(piece, max_chars) if len(piece) > max_chars else [piece])
+    ]
+
+    chunks, current, size = [], [], 0
+    for piece in pieces:
+        if current and size + len(piece) > max_chars:
+            chunks.append(" ".join(current))
+            carry, carry_size = [], 0
+            for previous in reversed(current):
+                if carry_size + len(previous) + 1 > overlap:
+                    break
+                carry.insert(0, previous)
+                carry_size += len(previous) + 1
+            current, size = carry, carry_size
+            while current and size + len(piece) > max_chars:
+                size -= len(current.pop(0)) + 1
+        current.append(piece)
+        size += len(piece) + 1
+
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def merge_chunk_results(parts: list) -> dict:
+    """
+    Deterministically merge per-chunk classifications, given in time order.
+
+    Categories are unioned ("other" only if nothing else), urgency and
+    agent behaviour take the most severe value, sentiment the last
+    non-neutral one, and each evidence field its last definite yes/no, so
+    the outcome reflects how the call ended.
+    """
+    categories = {c for part in parts for c in part["issue_category"]}
+    if len(categories) > 1:
+        categories.discard("other")
+
+    sentiments = [p["sentiment"] for p in parts if p["sentiment"] != "neutral"]
+
+    merged = {
+        "sentiment": sentiments[-1] if sentiments else "neutral",
+        "issue_category": [c for c in CATEGORY_ORDER if c in categories],
+        "urgency": max((p["urgency"] for p in parts), key=URGENCY_ORDER.index),
+        "agent_behavior": max((p["agent_behavior"] for p in parts), key=BEHAVIOR_SEVERITY.index),
+    }
+
+    for field, default in EVIDENCE_DEFAULTS.items():
+        definite = [p.get(field) for p in parts if p.get(field) in ("yes", "no")]
+        merged[field] = definite[-1] if definite else default
+
+    return merged
+
+
+def _parse_chunk_reply(raw: str):
+    """A chunk reply with its evidence fields, or None if it doesn't validate."""
+    parsed = _extract_json(raw)
+    if not parsed:
+        return None
+    try:
+        CallAnalysis(**{**parsed, "call_outcome": derive_call_outcome(parsed)})
+    except Exception:
+        return None
+    return parsed
+
+
+def merge_chunk_replies(replies: list):
+    """Parse, validate and merge raw chunk replies. Returns (result, cacheable)."""
+    parts = [p for p in map(_parse_chunk_reply, replies) if p is not None]
+    if not parts:
+        return interpret_llm_output(None)
+
+    merged = merge_chunk_results(parts)
+    merged["call_outcome"] = derive_call_outcome(merged)
+    validated = CallAnalysis(**merged).dict()
+    validated["_llm_status"] = "ok"
+    validated["_chunks"] = len(replies)
+    # A partial merge is served but not cached
+    return validated, len(parts) == len(replies)
+
+
+# One pool for every chunked call in the process, so consumers classifying
+# long calls at the same time share LLM_CONCURRENCY chunk requests rather
+# than each bringing that many of their own.
+_chunk_pool = None
+_chunk_pool_lock = threading.Lock()
+
+
+def _get_chunk_pool() -> ThreadPoolExecutor:
+    global _chunk_pool
+    with _chunk_pool_lock:
+        if _chunk_pool is None:
+            _chunk_pool = ThreadPoolExecutor(
+                max_workers=Config.LLM_CONCURRENCY, thread_name_prefix="llm-chunk"
+            )
+        return _chunk_pool
+
+
+def _classify_chunked(transcript: str, segments: list = None):
+    chunks = chunk_transcript(transcript, segments)
+    pool = _get_chunk_pool()
+    replies = list(pool.map(lambda c: _call_llm(build_messages(c)), chunks))
+    return merge_chunk_replies(replies)
+
+
 # -----------------------------
-def _call_llm(prompt: str) -> str:
-    response = ollama.chat(
-        model=OLLAMA_MODEL,
-        messages=[{"role": "user", "content": prompt}],
+# BATCHED LLM ANALYSIS
+# -----------------------------
+def build_batch_messages(transcripts: list) -> list:
+    blocks = "\n\n".join(
+        f'Transcript {i}:\n"""{t}"""' for i, t in enumerate(transcripts, 1)
     )
-    return response["message"]["content"]
+    return _layout(f"""====================
+TASK
+====================
+
+Analyze each of the following {len(transcripts)} transcripts independently.
+Return ONLY a valid JSON array with exactly {len(transcripts)} objects, one per
+transcript, in order. Each object has the fields shown above plus "index",
+the transcript number.
+No markdown. No explanation.
+
+{blocks}
+""")
+
+
+def _split_batches(transcripts: list) -> list:
+    """
+    Group by LLM_BATCH_SIZE, keeping each prompt under LLM_BATCH_MAX_CHARS.
+    Transcripts long enough to be chunked always get a batch of their own.
+    """
+    batches, current, chars = [], [], 0
+    for t in transcripts:
+        if len(t) > Config.LLM_CHUNK_CHARS:
+            batches.append([t])
+            continue
+        if current and (
+            len(current) >= Config.LLM_BATCH_SIZE
+            or chars + len(t) > Config.LLM_BATCH_MAX_CHARS
+        ):
+            batches.append(current)
+            current, chars = [], 0
+        current.append(t)
+        chars += len(t)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _classify_batch(transcripts: list) -> list:
+    """
+    One LLM round trip for several transcripts. Entries missing from the
+    reply or failing validation come back as None.
+    """
+    items = _extract_json_array(_call_llm(build_batch_messages(transcripts))) or []
+
+    by_index = {}
+    for position, item in enumerate(items, 1):
+        if not isinstance(item, dict):
+            continue
+        try:
+            index = int(item.pop("index", position))
+        except (TypeError, ValueError):
+            continue
+        by_index.setdefault(index, item)
+
+    results = []
+    for i in range(1, len(transcripts) + 1):
+        item = by_index.get(i)
+        if item is None:
+            results.append(None)
+            continue
+        item["call_outcome"] = derive_call_outcome(item)
+        try:
+            validated = CallAnalysis(**item).dict()
+        except Exception:
+            results.append(None)
+            continue
+        validated["_llm_status"] = "ok"
+        results.append(validated)
+    return results
+
+
+def analyze_transcripts(transcripts: list) -> list:
+    """
+    analyze_transcript() for many transcripts, packing up to
+    LLM_BATCH_SIZE of them into each LLM request. Entries a batch reply
+    gets wrong are retried one at a time. Results keep input order.
+    """
+    results = [None] * len(transcripts)
+    keys = [None] * len(transcripts)
+    pending = []
+
+    for i, transcript in enumerate(transcripts):
+        guarded = _guard_result(transcript)
+        if guarded is not None:
+            results[i] = guarded
+            continue
+        if Config.LLM_CACHE_ENABLED:
+            keys[i] = _cache_key(transcript)
+            cached = llm_cache.get(keys[i])
+            if cached is not None:
+                results[i] = cached
+                continue
+        preclassified = _preclassify(transcript)
+        if preclassified is not None:
+            results[i] = preclassified
+            continue
+        pending.append(i)
+
+    done = 0
+    for batch in _split_batches([transcripts[i] for i in pending]):
+        indexes = pending[done:done + len(batch)]
+        done += len(batch)
+
+        if len(batch) > 1:
+            batch_results = _classify_batch(batch)
+        else:
+            batch_results = [None]
+
+        for i, result in zip(indexes, batch_results):
+            cacheable = True
+            if result is None:
+                result, cacheable = _classify(transcripts[i])
+            _observe(transcripts[i], result)
+            if keys[i] and cacheable:
+                llm_cache.put(keys[i], result)
+            results[i] = result
+
+    return results
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent analyze requests into analyze_transcripts() calls.
+
+    A dispatcher thread waits for the first request, then collects more
+    until it has LLM_BATCH_SIZE or LLM_BATCH_MAX_WAIT_MS has passed.
+    Batches run on a small pool so a slow reply doesn't hold up the next.
+    """
+
+    def __init__(self, max_size: int = None, max_wait_ms: float = None, workers: int = None):
+        self.max_size = max_size or Config.LLM_BATCH_SIZE
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else Config.LLM_BATCH_MAX_WAIT_MS) / 1000
+        self._queue = queue.Queue()
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers or Config.LLM_CONCURRENCY, thread_name_prefix="llm-batch"
+        )
+        threading.Thread(target=self._dispatch, name="llm-batcher", daemon=True).start()
+
+    def submit(self, transcript: str) -> Future:
+        future = Future()
+        self._queue.put((transcript, future))
+        return future
+
+    def _dispatch(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._pool.submit(self._run, batch)
+
+    @staticmethod
+    def _run(batch):
+        try:
+            results = analyze_transcripts([t for t, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def analyze_transcript_batched(transcript: str, segments: list = None) -> dict:
+    """
+    analyze_transcript(), sharing LLM requests with concurrent callers
+    when LLM_BATCH_SIZE > 1. Meant for the queue consumer's worker threads.
+    Long (chunked) transcripts are never batched.
+    """
+    global _batcher
+    if Config.LLM_BATCH_SIZE <= 1 or len(transcript) > Config.LLM_CHUNK_CHARS:
+        return analyze_transcript(transcript, segments)
+
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = MicroBatcher()
+    return _batcher.submit(transcript).result()
+
+
+# -----------------------------
+# Helpers
+# -----------------------------
+def _call_llm(messages: list) -> str:
+    return get_llm_backend().chat(messages)
 
 
 def _extract_json(text: str) -> dict | None:
@@ -315,3 +1108,23 @@ def _extract_json(text: str) -> dict | None:
             return json5.loads(candidate)
         except Exception:
             return None
+
+
+def _extract_json_array(text: str) -> list | None:
+    if not text:
+        return None
+
+    start = text.find("[")
+    end = text.rfind("]") + 1
+    if start == -1 or end == 0:
+        return None
+
+    candidate = text[start:end]
+    try:
+        parsed = json.loads(candidate)
+    except json.JSONDecodeError:
+        try:
+            parsed = json5.loads(candidate)
+        except Exception:
+            return None
+    return parsed if isinstance(parsed, list) else None
@@ -0,0 +1,187 @@
+"""
+First-tier transcript classifier: keyword/regex features plus hashed word
+n-grams, one logistic regression per CallAnalysis field, trained on the
+labels the LLM stored in support_calls.
+
+Kept apart from app.triage so NumPy, SciPy and scikit-learn are only
+imported by processes that train or pre-classify.
+"""
+import re
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import LogisticRegression
+
+SINGLE_LABEL_FIELDS = ("sentiment", "urgency", "agent_behavior", "call_outcome")
+CATEGORIES = ("billing", "delivery", "refund", "technical", "other")
+
+# Need at least this many LLM-labelled calls to train
+MIN_TRAINING_CALLS = 200
+HOLDOUT_FRACTION = 0.2
+THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.98)
+
+RULES = {
+    "thanks": r"\b(thanks?|thank you|appreciate)\b",
+    "working_now": r"\b(working|works) (now|again|fine)\b",
+    "fixed": r"\b(fixed|resolved|sorted|solved|processed)\b",
+    "not_working": r"\b(not|isn't|doesn't|won't|stopped) (work|working|load|loading|connect)",
+    "still": r"\bstill\b",
+    "again_repeat": r"\b(again|third time|second time|keep (calling|having))\b",
+    "urgent": r"\b(urgent|immediately|asap|right now|emergency|today)\b",
+    "angry": r"\b(angry|furious|ridiculous|unacceptable|terrible|worst|frustrat\w*)\b",
+    "cancel": r"\b(cancel|close my account|switch provider)\w*",
+    "escalate": r"\b(manager|supervisor|escalat\w*|complaint)\b",
+    "follow_up": r"\b(call you back|get back to you|follow up|within \d+ (hours|days))\b",
+    "cannot": r"\b(can ?not|can't|unable to) (help|resolve|do)\b",
+    "apology": r"\b(sorry|apologi[sz]e)\b",
+    "rude_agent": r"\b(not my problem|calm down|whatever|shut up)\b",
+    "billing": r"\b(bill\w*|charge[ds]?|invoice|payment|subscription|overcharg\w*)\b",
+    "delivery": r"\b(deliver\w*|shipping|shipment|package|parcel|courier|tracking)\b",
+    "refund": r"\b(refund\w*|money back|reimburs\w*|return(ed)?)\b",
+    "technical": r"\b(error|crash\w*|login|log in|password|internet|wifi|app|website|bug)\b",
+    "question": r"\?",
+}
+_RULES = [re.compile(pattern, re.I) for pattern in RULES.values()]
+
+_vectorizer = HashingVectorizer(
+    n_features=2 ** 16, ngram_range=(1, 2), alternate_sign=False, norm="l2"
+)
+
+
+def rule_features(texts):
+    return sparse.csr_matrix(
+        [[1.0 if rule.search(t) else 0.0 for rule in _RULES] for t in texts]
+    )
+
+
+def build_features(texts):
+    return sparse.hstack([_vectorizer.transform(texts), rule_features(texts)]).tocsr()
+
+
+def _fit_field(X, y):
+    if len(set(y)) < 2:
+        return None
+    model = LogisticRegression(max_iter=1000, C=4.0)
+    model.fit(X, y)
+    return model
+
+
+def fit_models(transcripts, labels):
+    """One model per field; None where the training labels never vary."""
+    X = build_features(transcripts)
+    models = {f: _fit_field(X, [l[f] for l in labels]) for f in SINGLE_LABEL_FIELDS}
+    models["issue_category"] = {
+        c: _fit_field(X, [c in l["issue_category"] for l in labels]) for c in CATEGORIES
+    }
+    return models
+
+
+def predict(models, transcripts):
+    """Yield (analysis dict, confidence) per transcript.
+
+    Confidence is the lowest per-field probability of the chosen label, so
+    one uncertain field is enough to escalate to the LLM. A field without
+    a model (constant in training) counts as unknown: confidence 0.
+    """
+    X = build_features(transcripts)
+    n = len(transcripts)
+    fields = {}
+    confidence = np.ones(n)
+
+    for field in SINGLE_LABEL_FIELDS:
+        model = models[field]
+        if model is None:
+            return [(None, 0.0)] * n
+        proba = model.predict_proba(X)
+        fields[field] = model.classes_[proba.argmax(axis=1)]
+        confidence = np.minimum(confidence, proba.max(axis=1))
+
+    chosen = [[] for _ in range(n)]
+    for category, model in models["issue_category"].items():
+        if model is None:
+            continue
+        p = model.predict_proba(X)[:, list(model.classes_).index(True)]
+        confidence = np.minimum(confidence, np.maximum(p, 1 - p))
+        for i in np.flatnonzero(p >= 0.5):
+            chosen[i].append(category)
+
+    return [
+        (
+            {
+                **{f: str(fields[f][i]) for f in SINGLE_LABEL_FIELDS},
+                "issue_category": chosen[i] or ["other"],
+            },
+            float(confidence[i]),
+        )
+        for i in range(n)
+    ]
+
+
+def _matches(predicted, label):
+    return all(predicted[f] == label[f] for f in SINGLE_LABEL_FIELDS) and (
+        sorted(predicted["issue_category"]) == sorted(label["issue_category"])
+    )
+
+
+def evaluate(models, transcripts, labels):
+    """Coverage (share at/above threshold) and exact-match accuracy vs the LLM."""
+    scored = [
+        (confidence, predicted is not None and _matches(predicted, label))
+        for (predicted, confidence), label in zip(predict(models, transcripts), labels)
+    ]
+
+    sweep = []
+    for threshold in THRESHOLDS:
+        handled = [ok for confidence, ok in scored if confidence >= threshold]
+        sweep.append({
+            "threshold": threshold,
+            "coverage": round(len(handled) / len(scored), 3) if scored else 0.0,
+            "accuracy": round(sum(handled) / len(handled), 3) if handled else None,
+        })
+    return sweep
+
+
+def fit_preclassifier(rows, seed=0):
+    """
+    Fit on rows of (transcript, sentiment, urgency, agent_behavior,
+    issue_category, call_outcome). Returns (models, metrics); models is
+    None when there is not enough data.
+
+    Metrics come from a held-out split; the returned models are then
+    refit on every row.
+    """
+    rows = [r for r in rows if r[0] and r[1]]
+    if len(rows) < MIN_TRAINING_CALLS:
+        return None, {
+            "trained_on": len(rows),
+            "message": f"Need at least {MIN_TRAINING_CALLS} LLM-labelled calls",
+        }
+
+    transcripts = [r[0] for r in rows]
+    labels = [
+        {
+            "sentiment": r[1],
+            "urgency": r[2],
+            "agent_behavior": r[3],
+            "issue_category": [c for c in (r[4] or "other").split(",") if c] or ["other"],
+            "call_outcome": r[5],
+        }
+        for r in rows
+    ]
+
+    order = np.random.default_rng(seed).permutation(len(rows))
+    cut = int(len(rows) * (1 - HOLDOUT_FRACTION))
+    train, test = order[:cut], order[cut:]
+
+    holdout_models = fit_models([transcripts[i] for i in train], [labels[i] for i in train])
+    sweep = evaluate(holdout_models, [transcripts[i] for i in test], [labels[i] for i in test])
+
+    models = fit_models(transcripts, labels)
+    if any(models[f] is None for f in SINGLE_LABEL_FIELDS):
+        return None, {
+            "trained_on": len(rows),
+            "message": "Every single-label field needs at least two distinct values",
+        }
+
+    return models, {"trained_on": len(rows), "holdout": len(test), "thresholds": sweep}
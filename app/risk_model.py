@@ -0,0 +1,162 @@
+"""
+Operational-risk model: feature construction and fitting.
+
+Kept apart from app.analytics so NumPy and scikit-learn are only
+imported by processes that actually train.
+"""
+from sklearn.linear_model import LogisticRegression
+import numpy as np
+
+URGENCY_CODES = {"low": 0, "medium": 1, "high": 2}
+SENTIMENT_CODES = {"positive": 0, "neutral": 1, "negative": 2}
+BEHAVIOR_CODES = {"polite": 0, "neutral": 1, "rude": 2, "unknown": 3}
+
+# Categories with fewer calls than this get the default risk
+MIN_CATEGORY_CALLS = 3
+DEFAULT_CATEGORY_RISK = 0.5
+
+def encode_urgency(urgency):
+    return URGENCY_CODES.get(urgency, 1)
+
+def encode_sentiment(sentiment):
+    return SENTIMENT_CODES.get(sentiment, 1)
+
+def encode_behavior(behavior):
+    return BEHAVIOR_CODES.get(behavior, 1)
+
+def split_categories(issue_category):
+    return [c.strip() for c in (issue_category or "").split(",") if c.strip()]
+
+def _factorize(values):
+    """Distinct values (first-seen order) and each row's index into them."""
+    index = {}
+    inverse = np.fromiter(
+        (index.setdefault(v, len(index)) for v in values),
+        dtype=np.int64,
+        count=len(values)
+    )
+    return list(index), inverse
+
+def _encode_column(values, codes, default):
+    # Map each distinct value once, then broadcast back to the rows
+    uniques, inverse = _factorize(values)
+    mapped = np.array([codes.get(u, default) for u in uniques], dtype=np.float64)
+    return mapped[inverse]
+
+def encode_category_risk(categories, unresolved):
+    """
+    Historical unresolved rate per row, from one group-by over categories.
+
+    Multi-label values ("billing,refund") are split into labels; a row's
+    risk is the highest rate among its labels.
+    """
+    uniques, inverse = _factorize(categories)
+    totals = np.bincount(inverse, minlength=len(uniques))
+    unresolved_totals = np.bincount(inverse, weights=unresolved, minlength=len(uniques))
+
+    # Per-label counts, accumulated over the distinct category strings
+    label_calls = {}
+    label_unresolved = {}
+    labels_per_unique = []
+    for value, calls, bad in zip(uniques, totals, unresolved_totals):
+        labels = split_categories(value)
+        labels_per_unique.append(labels)
+        for label in labels:
+            label_calls[label] = label_calls.get(label, 0) + calls
+            label_unresolved[label] = label_unresolved.get(label, 0) + bad
+
+    def label_risk(label):
+        if label_calls[label] < MIN_CATEGORY_CALLS:
+            return DEFAULT_CATEGORY_RISK
+        return label_unresolved[label] / label_calls[label]
+
+    unique_risk = np.array([
+        max((label_risk(l) for l in labels), default=DEFAULT_CATEGORY_RISK)
+        for labels in labels_per_unique
+    ], dtype=np.float64)
+
+    return unique_risk[inverse]
+
+def build_features(rows):
+    """
+    Feature matrix and target for rows of
+    (urgency, sentiment, agent_behavior, issue_category, call_outcome).
+    """
+    urgency, sentiment, behavior, category, outcome = zip(*rows)
+
+    # Target: 1 if unresolved, 0 if resolved
+    y = _encode_column(outcome, {"unresolved": 1}, 0).astype(np.int64)
+
+    X = np.column_stack([
+        _encode_column(urgency, URGENCY_CODES, 1),
+        _encode_column(sentiment, SENTIMENT_CODES, 1),
+        _encode_column(behavior, BEHAVIOR_CODES, 1),
+        encode_category_risk(category, y)
+    ])
+
+    return X, y
+
+def fit_risk_model(rows, previous_model=None):
+    """
+    Fit on rows of (urgency, sentiment, agent_behavior, issue_category,
+    call_outcome). Returns (model, result); model is None when there is
+    not enough data.
+
+    Passing a previous model warm-starts the solver from its
+    coefficients, which converges in far fewer iterations.
+    """
+    if len(rows) < 10:
+        return None, {
+            "risk_score": 0,
+            "level": "Insufficient Data",
+            "message": "Need at least 10 calls for prediction"
+        }
+    
+    # Prepare features
+    X, y = build_features(rows)
+
+    if len(np.unique(y)) < 2:
+        return None, {
+            "risk_score": 0,
+            "level": "Insufficient Data",
+            "message": "Need both resolved and unresolved calls for prediction"
+        }
+    
+    # Train model
+    if previous_model is not None:
+        model = previous_model
+    else:
+        model = LogisticRegression(max_iter=1000, warm_start=True)
+    model.fit(X, y)
+    
+    # Get average predicted risk
+    predictions = model.predict_proba(X)[:, 1]
+    avg_risk = np.mean(predictions) * 100
+    
+    # Get top contributing factor
+    feature_names = ["urgency", "sentiment", "behavior", "category"]
+    coefficients = model.coef_[0]
+    top_idx = np.argmax(np.abs(coefficients))
+    top_factor = feature_names[top_idx]
+    top_direction = "increases" if coefficients[top_idx] > 0 else "decreases"
+    
+    # Determine level
+    if avg_risk < 30:
+        level = "Low"
+    elif avg_risk < 60:
+        level = "Medium"
+    else:
+        level = "High"
+    
+    result = {
+        "risk_score": round(float(avg_risk), 1),
+        "level": level,
+        "top_factor": {
+            "name": top_factor,
+            "impact": top_direction,
+            "coefficient": round(float(coefficients[top_idx]), 3)
+        },
+        "total_calls_used": len(rows)
+    }
+
+    return model, result
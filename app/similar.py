@@ -0,0 +1,371 @@
+"""
+Similar-call lookup: the stored calls whose transcripts are closest to a
+given call's, e.g. to see how calls like an unresolved one were resolved.
+
+Every stored call gets an embedding in call_embeddings (see
+app.embeddings). A lookup searches the current memory-mapped index
+snapshot plus the vectors stored since it was built. Queue consumers
+(app.worker) embed their calls as they store them. Every
+REBUILD_CHECK_SECONDS they also embed calls stored without a vector
+(e.g. uploads analyzed in API workers, which never load the embedder),
+then build a new snapshot once EMBEDDING_REBUILD_EVERY vectors have
+piled up. API requests never build. Builds hold an flock on <index dir>/.build.lock, so only one
+process builds at a time. Deleted calls are dropped when the results
+are joined with support_calls.
+
+    python -m app.similar backfill   # embed calls stored without a vector, then build
+    python -m app.similar build      # write a new index snapshot
+    python -m app.similar stats
+"""
+import os
+import sys
+import json
+import time
+import fcntl
+import logging
+import threading
+
+from app import database
+from app.config import Config
+from app.database import get_connection, unpack_transcript
+
+logger = logging.getLogger(__name__)
+
+# How often a process checks for a newer snapshot, and how often queue
+# consumers check whether a new one should be built
+RELOAD_CHECK_SECONDS = 10
+REBUILD_CHECK_SECONDS = 60
+BACKFILL_BATCH_SIZE = 500
+# Extra neighbours fetched to make up for deleted and filtered-out calls
+OVERFETCH = 20
+
+_lock = threading.Lock()
+_state = {"dir": None, "name": None, "index": None, "checked_at": 0.0}
+_tail = {"after": 0, "ids": None, "vectors": None}
+# Highest call id embed_missing() has looked at, per embedder
+_embedded_through = {}
+
+RESULT_FIELDS = (
+    "id", "sentiment", "issue_category", "urgency",
+    "agent_behavior", "call_outcome", "created_at",
+)
+
+
+def index_dir() -> str:
+    return Config.EMBEDDING_INDEX_DIR or os.path.join(
+        os.path.dirname(database.DB_PATH) or ".", "embeddings"
+    )
+
+
+def _current_name(directory):
+    try:
+        with open(os.path.join(directory, "CURRENT")) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def _load(model: str):
+    """
+    The current snapshot (None if there is none for this embedder) and
+    the (ids, vectors) stored after it, caught up with the database.
+    """
+    import numpy as np
+    from app.embeddings import VectorIndex, decode
+
+    directory = index_dir()
+    now = time.monotonic()
+    with _lock:
+        if _state["dir"] != directory or now - _state["checked_at"] >= RELOAD_CHECK_SECONDS:
+            name = _current_name(directory)
+            if _state["dir"] != directory or name != _state["name"]:
+                index = None
+                if name:
+                    try:
+                        index = VectorIndex(os.path.join(directory, name))
+                    except FileNotFoundError:
+                        # Incomplete snapshot: search the database tail
+                        # only, and look again on the next check
+                        name = None
+                if index is not None and index.meta["model"] != model:
+                    index = None
+                _state.update(dir=directory, name=name, index=index)
+                _tail.update(after=snapshot_seq(index), ids=None, vectors=None)
+            _state["checked_at"] = now
+
+        with get_connection() as conn:
+            # By write order, not call id: calls stored by API workers
+            # are embedded later than newer calls from the queue
+            rows = conn.execute("""
+                SELECT call_id, scale, vector, embedded_seq FROM call_embeddings
+                WHERE embedded_seq > ? AND model = ?
+                ORDER BY embedded_seq
+            """, (_tail["after"], model)).fetchall()
+
+        if rows:
+            ids = np.array([r["call_id"] for r in rows], dtype=np.int64)
+            vectors = np.stack([decode(r["scale"], r["vector"]) for r in rows])
+            if _tail["ids"] is not None:
+                ids = np.concatenate([_tail["ids"], ids])
+                vectors = np.concatenate([_tail["vectors"], vectors])
+            _tail.update(after=rows[-1]["embedded_seq"], ids=ids, vectors=vectors)
+
+        return _state["index"], _tail["ids"], _tail["vectors"]
+
+
+def snapshot_seq(index) -> int:
+    """Highest embedded_seq in a snapshot (0 without one)."""
+    if index is None:
+        return 0
+    # Snapshots written before embedded_seq existed: it equalled call_id
+    return index.meta.get("max_seq", index.meta["max_id"])
+
+
+class NotEmbeddedYet(Exception):
+    """The call is stored but the queue consumer hasn't embedded it yet."""
+
+
+def _query_vector(call_id: int, model: str):
+    """
+    The call's stored vector, or None if its transcript is empty. Never
+    embeds here: API workers don't load the embedder (see
+    database.insert_calls), so a call without a vector yet raises
+    NotEmbeddedYet until the consumers' next embed_missing() pass.
+    """
+    from app.embeddings import decode
+
+    with get_connection() as conn:
+        row = conn.execute(
+            "SELECT scale, vector FROM call_embeddings WHERE call_id = ? AND model = ?",
+            (call_id, model)
+        ).fetchone()
+        if row:
+            return decode(row["scale"], row["vector"])
+
+        row = conn.execute("""
+            SELECT ct.transcript FROM support_calls
+            LEFT JOIN call_transcripts AS ct ON ct.call_id = support_calls.id
+            WHERE support_calls.id = ?
+        """, (call_id,)).fetchone()
+
+    if row is None:
+        raise LookupError("Call not found")
+    transcript = unpack_transcript(row["transcript"])
+    if not transcript or not transcript.strip():
+        return None
+    raise NotEmbeddedYet("This call hasn't been indexed for similarity yet; try again shortly")
+
+
+def find_similar(call_id: int, limit: int = 10, outcome: str = None) -> list:
+    """
+    The `limit` calls most similar to `call_id`, best first, each with
+    its labels and a cosine `similarity`. `outcome` keeps only calls
+    with that call_outcome. Raises LookupError for an unknown call and
+    NotEmbeddedYet for one that has no vector yet.
+    """
+    import numpy as np
+    from app.embeddings import model_name, top_k
+
+    model = model_name()
+    query = _query_vector(call_id, model)
+    if query is None:
+        return []
+
+    index, tail_ids, tail_vectors = _load(model)
+    # Filters are applied after the search, so look further ahead
+    wanted = (limit + 1) * (4 if outcome else 1) + OVERFETCH
+
+    ids = [np.empty(0, dtype=np.int64)]
+    scores = [np.empty(0, dtype=np.float32)]
+    if index is not None:
+        found = index.search(query, wanted)
+        ids.append(found[0])
+        scores.append(found[1])
+    if tail_ids is not None:
+        ids.append(tail_ids)
+        scores.append(tail_vectors @ query)
+    ids, scores = top_k(np.concatenate(ids), np.concatenate(scores), wanted)
+
+    candidates = {int(i): float(s) for i, s in zip(ids, scores) if int(i) != call_id}
+    if not candidates:
+        return []
+
+    conditions = [f"id IN ({', '.join('?' * len(candidates))})"]
+    params = list(candidates)
+    if outcome:
+        conditions.append("call_outcome = ?")
+        params.append(outcome)
+
+    with get_connection() as conn:
+        rows = conn.execute(f"""
+            SELECT {', '.join(RESULT_FIELDS)} FROM support_calls
+            WHERE {' AND '.join(conditions)}
+        """, params).fetchall()
+
+    results = []
+    for row in sorted(rows, key=lambda r: -candidates[r["id"]])[:limit]:
+        item = dict(row)
+        item["created_at"] = database._to_iso(item["created_at"])
+        item["similarity"] = round(candidates[row["id"]], 4)
+        results.append(item)
+    return results
+
+
+def build() -> dict:
+    """
+    Write a new index snapshot from call_embeddings. Returns None without
+    building if another thread or process is already building one.
+    """
+    directory = index_dir()
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, ".build.lock"), "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return None
+
+        import numpy as np
+        from app.embeddings import VectorIndex, build_index, model_name
+
+        model = model_name()
+        with get_connection() as conn:
+            rows = conn.execute("""
+                SELECT call_id, scale, vector, embedded_seq FROM call_embeddings
+                WHERE model = ? ORDER BY call_id
+            """, (model,)).fetchall()
+
+        max_seq = max((r["embedded_seq"] for r in rows), default=0)
+        ids = np.array([r["call_id"] for r in rows], dtype=np.int64)
+        scales = np.array([r["scale"] for r in rows], dtype=np.float32)
+        vectors = np.frombuffer(b"".join(r["vector"] for r in rows), dtype=np.int8)
+        vectors = vectors.reshape(len(rows), -1) if len(rows) else vectors.reshape(0, 0)
+        del rows
+
+        meta = build_index(
+            directory, ids, scales, vectors, model,
+            previous=VectorIndex.open_current(directory), max_seq=max_seq,
+        )
+
+    with _lock:
+        _state["checked_at"] = 0.0
+    return meta
+
+
+def rebuild_if_stale():
+    """
+    Build a snapshot once EMBEDDING_REBUILD_EVERY vectors were stored
+    after the current one (a build can take a while, e.g. ~30s for the
+    IVF fit at 1M calls). Returns the new snapshot's meta, or None.
+    """
+    from app.embeddings import VectorIndex, model_name
+
+    model = model_name()
+    current = VectorIndex.open_current(index_dir())
+    after = snapshot_seq(current) if current and current.meta["model"] == model else 0
+
+    with get_connection() as conn:
+        pending = conn.execute("""
+            SELECT COUNT(*) FROM (
+                SELECT 1 FROM call_embeddings WHERE embedded_seq > ? AND model = ? LIMIT ?
+            )
+        """, (after, model, Config.EMBEDDING_REBUILD_EVERY)).fetchone()[0]
+
+    if pending < Config.EMBEDDING_REBUILD_EVERY:
+        return None
+    return build()
+
+
+def run_rebuilds(stop: threading.Event):
+    """
+    Every REBUILD_CHECK_SECONDS until `stop` is set: embed new calls
+    stored without a vector, then call rebuild_if_stale().
+    """
+    while not stop.wait(REBUILD_CHECK_SECONDS):
+        try:
+            embed_missing(stop)
+            rebuild_if_stale()
+        except Exception:
+            logger.exception("Similar-call index maintenance failed")
+
+
+def embed_missing(stop: threading.Event = None, from_start: bool = False) -> int:
+    """
+    Embed calls stored without a vector from the current embedder.
+    Picks up after the highest call id this process already looked at,
+    unless `from_start`; stops early once `stop` is set. Returns how
+    many calls were embedded.
+    """
+    from app.embeddings import encode, model_name
+
+    model = model_name()
+    embedded = 0
+    last_id = 0 if from_start else _embedded_through.get(model, 0)
+    while stop is None or not stop.is_set():
+        with get_connection() as conn:
+            rows = conn.execute("""
+                SELECT support_calls.id, ct.transcript
+                FROM support_calls
+                JOIN call_transcripts AS ct ON ct.call_id = support_calls.id
+                LEFT JOIN call_embeddings AS ce ON ce.call_id = support_calls.id
+                WHERE support_calls.id > ? AND (ce.model IS NULL OR ce.model != ?)
+                ORDER BY support_calls.id
+                LIMIT ?
+            """, (last_id, model, BACKFILL_BATCH_SIZE)).fetchall()
+            if not rows:
+                break
+
+            encoded = encode([unpack_transcript(r["transcript"]) for r in rows])
+            conn.executemany(
+                database.INSERT_EMBEDDING_SQL,
+                [(r["id"], *e) for r, e in zip(rows, encoded) if e is not None]
+            )
+            conn.commit()
+        embedded += sum(e is not None for e in encoded)
+        last_id = rows[-1]["id"]
+        _embedded_through[model] = last_id
+
+    return embedded
+
+
+def backfill() -> dict:
+    """Embed every call stored without a vector from the current embedder, then rebuild."""
+    return {"embedded": embed_missing(from_start=True), "index": build()}
+
+
+def stats() -> dict:
+    from app.embeddings import model_name
+
+    with get_connection() as conn:
+        by_model = {
+            r["model"]: r["n"]
+            for r in conn.execute(
+                "SELECT model, COUNT(*) AS n FROM call_embeddings GROUP BY model"
+            )
+        }
+        calls = conn.execute("SELECT COUNT(*) FROM support_calls").fetchone()[0]
+
+    from app.embeddings import VectorIndex
+
+    directory = index_dir()
+    current = VectorIndex.open_current(directory)
+
+    return {
+        "model": model_name(),
+        "calls": calls,
+        "embeddings_by_model": by_model,
+        "index_dir": directory,
+        "snapshot": current.meta if current else None,
+    }
+
+
+if __name__ == "__main__":
+    database.init_db()
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "backfill":
+        print(json.dumps(backfill(), indent=2))
+    elif command == "build":
+        print(json.dumps(build(), indent=2))
+    elif command == "stats":
+        print(json.dumps(stats(), indent=2))
+    else:
+        sys.exit("usage: python -m app.similar [backfill|build|stats]")
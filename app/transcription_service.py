@@ -0,0 +1,177 @@
+"""
+Shared transcription service.
+
+One process owns the Whisper model; API workers and queue consumers send
+it audio paths over a Unix socket instead of each loading their own copy.
+
+    python -m app.transcription_service
+
+Protocol: one JSON object per line in each direction.
+    {"op": "transcribe", "audio_path": "..."}        -> transcribe_audio() result
+    {"op": "transcribe_stream", "audio_path": "..."} -> one {"kind", "payload"}
+        line per iter_transcription() event, then {"kind": "end"}
+    {"op": "ping"}                                   -> {"ok": true}
+"""
+import os
+import json
+import socket
+import logging
+import threading
+import socketserver
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def _socket_path():
+    return os.path.abspath(Config.TRANSCRIPTION_SOCKET)
+
+
+# -----------------------------
+# Client
+# -----------------------------
+def _request_lines(payload: dict, timeout: float):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(_socket_path())
+        sock.sendall(json.dumps(payload).encode() + b"\n")
+
+        with sock.makefile("rb") as reader:
+            for line in reader:
+                yield json.loads(line)
+
+
+def _request(payload: dict, timeout: float) -> dict:
+    for response in _request_lines(payload, timeout):
+        return response
+    raise ConnectionError("transcription service closed the connection")
+
+
+def transcribe_via_service(audio_path: str) -> dict:
+    try:
+        return _request(
+            {"op": "transcribe", "audio_path": os.path.abspath(audio_path)},
+            timeout=Config.TRANSCRIPTION_TIMEOUT_SECONDS,
+        )
+    except Exception as e:
+        return {
+            "success": False,
+            "text": "",
+            "error": f"transcription_exception: service unavailable ({e})",
+            "language": None,
+            "segments": []
+        }
+
+
+def stream_via_service(audio_path: str):
+    """Client side of iter_transcription(); raises on service errors."""
+    payload = {"op": "transcribe_stream", "audio_path": os.path.abspath(audio_path)}
+
+    for event in _request_lines(payload, timeout=Config.TRANSCRIPTION_TIMEOUT_SECONDS):
+        if event["kind"] == "end":
+            return
+        if event["kind"] == "error":
+            raise RuntimeError(event["payload"])
+        yield event["kind"], event["payload"]
+
+    raise ConnectionError("transcription service closed the connection")
+
+
+def service_available(timeout: float = 1.0) -> bool:
+    try:
+        return _request({"op": "ping"}, timeout=timeout).get("ok", False)
+    except Exception:
+        return False
+
+
+# -----------------------------
+# Server
+# -----------------------------
+class _Handler(socketserver.StreamRequestHandler):
+    def _send(self, message: dict):
+        self.wfile.write(json.dumps(message).encode() + b"\n")
+        self.wfile.flush()
+
+    def _stream(self, audio_path: str):
+        from app.pipeline import iter_transcription_local
+
+        try:
+            with self.server.slots:
+                for kind, payload in iter_transcription_local(audio_path):
+                    self._send({"kind": kind, "payload": payload})
+        except (BrokenPipeError, ConnectionResetError):
+            return
+        except Exception as e:
+            self._send({"kind": "error", "payload": str(e)})
+            return
+
+        self._send({"kind": "end"})
+
+    def handle(self):
+        from app.pipeline import transcribe_audio_local
+
+        line = self.rfile.readline()
+        if not line:
+            return
+
+        try:
+            request = json.loads(line)
+            op = request.get("op")
+
+            if op == "transcribe_stream":
+                self._stream(request["audio_path"])
+                return
+            elif op == "ping":
+                response = {"ok": True}
+            elif op == "transcribe":
+                with self.server.slots:
+                    response = transcribe_audio_local(request["audio_path"])
+            else:
+                response = {"ok": False, "error": f"unknown op: {op}"}
+        except Exception as e:
+            response = {
+                "success": False,
+                "text": "",
+                "error": f"transcription_exception: {e}",
+                "language": None,
+                "segments": []
+            }
+
+        self._send(response)
+
+
+class TranscriptionServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, concurrency: int):
+        # Bounds concurrent Whisper runs; extra requests wait their turn
+        self.slots = threading.BoundedSemaphore(concurrency)
+        super().__init__(path, _Handler)
+
+
+def serve(path: str = None, concurrency: int = None):
+    from app.pipeline import get_whisper_model
+
+    path = path or _socket_path()
+    concurrency = concurrency or Config.TRANSCRIBE_CONCURRENCY
+
+    # Load the model before accepting connections
+    get_whisper_model()
+
+    if os.path.exists(path):
+        os.remove(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    with TranscriptionServer(path, concurrency) as server:
+        logger.info("Transcription service listening on %s (concurrency=%d)", path, concurrency)
+        try:
+            server.serve_forever()
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    serve()
@@ -0,0 +1,190 @@
+"""
+First-tier triage in front of the LLM.
+
+preclassify() answers from the stored pre-classifier when every field is
+at least PRECLASSIFIER_THRESHOLD confident and returns None otherwise, so
+the caller escalates to the LLM. A PRECLASSIFIER_SHADOW_RATE share of
+confident calls is escalated anyway and compared with the LLM's answer,
+which gives a live accuracy figure for tuning the threshold.
+
+    python -m app.triage train     # fit on LLM-labelled calls and store
+    python -m app.triage stats     # holdout coverage/accuracy per threshold
+"""
+import sys
+import json
+import time
+import pickle
+import random
+import hashlib
+import threading
+from collections import OrderedDict
+
+from app.config import Config
+from app.database import (
+    get_connection,
+    save_preclassifier_model,
+    load_latest_preclassifier_model,
+    unpack_transcript,
+)
+
+# How often a process checks for a newer stored model
+RELOAD_CHECK_SECONDS = 60
+# Shadowed predictions waiting for the LLM's answer
+MAX_PENDING_SHADOWS = 1000
+
+_lock = threading.Lock()
+_model = {"version": None, "models": None, "checked_at": 0.0}
+_pending = OrderedDict()
+_stats = {
+    "handled": 0, "escalated": 0,
+    "shadowed": 0, "shadow_compared": 0, "shadow_agreed": 0,
+}
+
+
+def _count(name: str, n: int = 1):
+    with _lock:
+        _stats[name] += n
+
+
+def _current_models():
+    now = time.monotonic()
+    with _lock:
+        if now - _model["checked_at"] < RELOAD_CHECK_SECONDS:
+            return _model["models"]
+        _model["checked_at"] = now
+
+    stored = load_latest_preclassifier_model()
+    if stored and stored["version"] != _model["version"]:
+        stored = load_latest_preclassifier_model(include_model=True)
+        models = pickle.loads(stored["model"])
+        with _lock:
+            _model.update(version=stored["version"], models=models)
+
+    return _model["models"]
+
+
+def _shadow_key(transcript: str) -> str:
+    return hashlib.sha256(transcript.encode()).hexdigest()
+
+
+def preclassify(transcript: str):
+    """Confident first-tier result, or None to escalate to the LLM."""
+    models = _current_models()
+    if models is None:
+        return None
+
+    from app.preclassifier import predict
+
+    [(predicted, confidence)] = predict(models, [transcript])
+    if predicted is None or confidence < Config.PRECLASSIFIER_THRESHOLD:
+        _count("escalated")
+        return None
+
+    if random.random() < Config.PRECLASSIFIER_SHADOW_RATE:
+        with _lock:
+            _pending[_shadow_key(transcript)] = predicted
+            while len(_pending) > MAX_PENDING_SHADOWS:
+                _pending.popitem(last=False)
+        _count("shadowed")
+        return None
+
+    _count("handled")
+    return {
+        **predicted,
+        "confidence": round(confidence, 3),
+        "_llm_status": "preclassified",
+    }
+
+
+def observe(transcript: str, llm_result: dict):
+    """Compare the LLM's answer with a shadowed prediction, if there was one."""
+    with _lock:
+        predicted = _pending.pop(_shadow_key(transcript), None)
+    if predicted is None or llm_result.get("_llm_status") != "ok":
+        return
+
+    from app.preclassifier import SINGLE_LABEL_FIELDS
+
+    _count("shadow_compared")
+    agreed = all(predicted[f] == llm_result.get(f) for f in SINGLE_LABEL_FIELDS) and (
+        sorted(predicted["issue_category"]) == sorted(llm_result.get("issue_category") or [])
+    )
+    if agreed:
+        _count("shadow_agreed")
+
+
+def train() -> dict:
+    """
+    Fit on calls the LLM actually labelled (not fallback defaults or
+    older calls with no recorded tier) and store the model with its
+    metrics.
+    """
+    from app.preclassifier import fit_preclassifier
+
+    with get_connection() as conn:
+        rows = conn.execute("""
+            SELECT ct.transcript, sentiment, urgency, agent_behavior, issue_category, call_outcome
+            FROM support_calls
+            JOIN call_transcripts AS ct ON ct.call_id = support_calls.id
+            WHERE classified_by = 'llm'
+        """).fetchall()
+
+    models, metrics = fit_preclassifier(
+        [(unpack_transcript(r[0]), *tuple(r)[1:]) for r in rows]
+    )
+    if models is None:
+        return metrics
+
+    version = save_preclassifier_model(metrics, pickle.dumps(models))
+    with _lock:
+        _model["checked_at"] = 0.0
+    return {**metrics, "version": version}
+
+
+def stats() -> dict:
+    """Live tier split for this process plus the stored holdout evaluation."""
+    with _lock:
+        counters = dict(_stats)
+
+    decided = counters["handled"] + counters["escalated"] + counters["shadowed"]
+    stored = load_latest_preclassifier_model()
+
+    with get_connection() as conn:
+        by_tier = {
+            (r["classified_by"] or "unrecorded"): r["n"]
+            for r in conn.execute("""
+                SELECT classified_by, COUNT(*) AS n FROM support_calls GROUP BY classified_by
+            """)
+        }
+    stored_total = sum(by_tier.values())
+
+    return {
+        "enabled": Config.PRECLASSIFIER_ENABLED,
+        "threshold": Config.PRECLASSIFIER_THRESHOLD,
+        "model_version": stored["version"] if stored else None,
+        "trained_at": stored["trained_at"] if stored else None,
+        **counters,
+        "handled_rate": round(counters["handled"] / decided, 3) if decided else 0.0,
+        "shadow_accuracy": (
+            round(counters["shadow_agreed"] / counters["shadow_compared"], 3)
+            if counters["shadow_compared"] else None
+        ),
+        "stored_calls_by_tier": by_tier,
+        "stored_preclassified_rate": (
+            round(by_tier.get("preclassifier", 0) / stored_total, 3) if stored_total else 0.0
+        ),
+        "evaluation": stored["metrics"] if stored else None,
+    }
+
+
+if __name__ == "__main__":
+    from app.database import init_db
+
+    init_db()
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "train":
+        print(json.dumps(train(), indent=2))
+    elif command == "stats":
+        print(json.dumps(stats(), indent=2))
+    else:
+        sys.exit("usage: python -m app.triage [train|stats]")
@@ -0,0 +1,43 @@
+"""
+Queue consumer process.
+
+    python -m app.worker [--transcribe-workers N] [--llm-workers N]
+    python -m app.worker --requeue-dead [--job JOB_ID]
+
+Run one or more of these next to the API. Each process leases items
+from the SQLite job queue and works them at a fixed concurrency.
+"""
+import argparse
+import logging
+import signal
+
+from app.database import init_db
+from app.jobs import Consumer, requeue_dead
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Call analysis queue consumer")
+    parser.add_argument("--transcribe-workers", type=int, default=None)
+    parser.add_argument("--llm-workers", type=int, default=None)
+    parser.add_argument(
+        "--requeue-dead", action="store_true",
+        help="Move dead-lettered items back to the queue and exit"
+    )
+    parser.add_argument("--job", default=None, help="Limit --requeue-dead to one job")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    init_db()
+
+    if args.requeue_dead:
+        print(f"Requeued {requeue_dead(args.job)} item(s)")
+        return
+
+    consumer = Consumer(args.transcribe_workers, args.llm_workers)
+    signal.signal(signal.SIGTERM, lambda *_: consumer.stop())
+    signal.signal(signal.SIGINT, lambda *_: consumer.stop())
+    consumer.run_forever()
+
+
+if __name__ == "__main__":
+    main()
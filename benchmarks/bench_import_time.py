@@ -0,0 +1,80 @@
+"""
+Cold-start import report for the API (like `python -X importtime`).
+
+Usage:
+    python -m benchmarks.bench_import_time [--module app.main] [--runs 5] [--top 15]
+
+Imports the module in fresh interpreters, reports the median cumulative
+import time, the slowest packages, and whether any of the heavy
+model/ML dependencies were pulled in. Exits non-zero with
+--fail-on-heavy if they were, so read-only replicas stay fast to start.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ("faster_whisper", "ctranslate2", "ollama", "sklearn", "numpy", "av")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_profile(module):
+    """Return {module name: cumulative microseconds} for one cold import."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    profile = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            profile[name.strip()] = int(cumulative)
+        except ValueError:
+            continue  # header line
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API cold-start import report")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--fail-on-heavy", action="store_true")
+    args = parser.parse_args()
+
+    # First run warms the bytecode cache and is discarded
+    import_profile(args.module)
+    profiles = [import_profile(args.module) for _ in range(args.runs)]
+
+    totals = [p.get(args.module, 0) for p in profiles]
+    print(f"{args.module}: median {statistics.median(totals) / 1000:.1f} ms "
+          f"over {args.runs} runs (min {min(totals) / 1000:.1f}, max {max(totals) / 1000:.1f})")
+
+    # Slowest top-level packages in the median run
+    median_run = sorted(profiles, key=lambda p: p.get(args.module, 0))[len(profiles) // 2]
+    packages = {}
+    for name, us in median_run.items():
+        top = name.split(".")[0]
+        packages[top] = max(packages.get(top, 0), us)
+
+    print(f"\n{'package':<30} {'cumulative ms':>14}")
+    for name, us in sorted(packages.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"{name:<30} {us / 1000:>14.1f}")
+
+    heavy = sorted({n.split(".")[0] for n in median_run} & set(HEAVY_MODULES))
+    print(f"\nheavy modules imported: {', '.join(heavy) if heavy else 'none'}")
+
+    if args.fail_on_heavy and heavy:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
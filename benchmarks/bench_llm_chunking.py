@@ -0,0 +1,85 @@
+"""
+Long-call latency: one prompt for the whole transcript vs. chunked
+map-reduce classification, using the fake LLM backend.
+
+Usage:
+    python -m benchmarks.bench_llm_chunking [--lengths 2000 8000 32000 64000]
+        [--latency-ms 300] [--ms-per-1k-chars 150] [--concurrency 4]
+
+The fake backend charges a fixed latency plus --ms-per-1k-chars of the
+user message, standing in for prompt processing with the static system
+prefix already cached. Single-prompt latency grows linearly with length
+(and real models fail beyond their context window); chunked latency grows
+with ceil(chunks / concurrency).
+"""
+import argparse
+import time
+
+from app.config import Config
+from app.llm import FakeBackend, set_llm_backend
+from app.pipeline import analyze_transcript, chunk_transcript
+
+from benchmarks.bench_llm_pipeline import PHRASES
+
+
+class PrefixCachedFake(FakeBackend):
+    """Charges prompt processing for the user message only."""
+
+    def _delay(self, prompt):
+        return super()._delay(prompt.split("====================\nTASK", 1)[-1])
+
+
+def make_long_transcript(chars):
+    words, i = [], 0
+    while sum(len(w) + 1 for w in words) < chars:
+        words.append(PHRASES[i % len(PHRASES)])
+        i += 1
+    return " ".join(words)
+
+
+def timed(transcript):
+    start = time.perf_counter()
+    result = analyze_transcript(transcript)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[2000, 8000, 32000, 64000])
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--ms-per-1k-chars", type=float, default=150)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    Config.LLM_CACHE_ENABLED = False
+    Config.LLM_CONCURRENCY = args.concurrency
+    Config.LLM_PROMPT_LAYOUT = "split"
+    set_llm_backend(PrefixCachedFake(
+        latency_ms=args.latency_ms, jitter_ms=0, ms_per_1k_chars=args.ms_per_1k_chars
+    ))
+    chunk_chars = Config.LLM_CHUNK_CHARS
+
+    print(
+        f"chunk {chunk_chars} chars, overlap {Config.LLM_CHUNK_OVERLAP_CHARS}, "
+        f"concurrency {args.concurrency}\n"
+    )
+    print(f"{'chars':>8}{'chunks':>8}{'single s':>10}{'chunked s':>11}{'speedup':>9}")
+
+    for length in args.lengths:
+        transcript = make_long_transcript(length)
+        chunks = len(chunk_transcript(transcript))
+
+        Config.LLM_CHUNK_CHARS = 10 ** 9
+        single, _ = timed(transcript)
+
+        Config.LLM_CHUNK_CHARS = chunk_chars
+        chunked, result = timed(transcript)
+
+        print(
+            f"{length:>8}{chunks:>8}{single:>10.2f}{chunked:>11.2f}"
+            f"{single / chunked:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
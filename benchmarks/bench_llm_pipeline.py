@@ -0,0 +1,119 @@
+"""
+Classification throughput with the in-process fake LLM backend.
+
+Usage:
+    python -m benchmarks.bench_llm_pipeline [--calls 200] [--latency-ms 200]
+        [--jitter-ms 50] [--ms-per-1k-chars 0] [--concurrency 1 4 16]
+        [--batch-sizes 4 8]
+
+Runs analyze_transcript() from a thread pool and analyze_transcript_async()
+under asyncio.gather at each concurrency level, with the LLM cache off, so
+the numbers reflect prompt building, backend round trips, parsing and
+validation. "batch" rows send the same calls through analyze_transcripts()
+from the thread pool, one batch per task. Set --ms-per-1k-chars to charge
+for prompt length, which is what batching saves. No Ollama server is needed.
+"""
+import argparse
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import Config
+from app.llm import FakeBackend, set_llm_backend
+from app.pipeline import analyze_transcript, analyze_transcript_async, analyze_transcripts
+
+PHRASES = [
+    "I was charged twice on my last bill.",
+    "My package never arrived and the tracking page is empty.",
+    "I want a refund for the order I returned last week.",
+    "The app shows an error every time I try to login.",
+    "This is urgent, I need it fixed right now.",
+    "Thank you, it is working now.",
+    "I am really frustrated, this is unacceptable.",
+    "Could you tell me when my subscription renews?",
+]
+
+
+def make_transcripts(n, seed=0):
+    rng = random.Random(seed)
+    return [
+        f"Call {i}. " + " ".join(rng.choice(PHRASES) for _ in range(rng.randint(2, 6)))
+        for i in range(n)
+    ]
+
+
+def run_threads(transcripts, concurrency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(analyze_transcript, transcripts))
+    return time.perf_counter() - start, results
+
+
+def run_async(transcripts, concurrency):
+    async def main():
+        slots = asyncio.Semaphore(concurrency)
+
+        async def one(text):
+            async with slots:
+                return await analyze_transcript_async(text)
+
+        return await asyncio.gather(*(one(t) for t in transcripts))
+
+    start = time.perf_counter()
+    results = asyncio.run(main())
+    return time.perf_counter() - start, results
+
+
+def run_batches(transcripts, concurrency, batch_size):
+    Config.LLM_BATCH_SIZE = batch_size
+    Config.LLM_BATCH_MAX_CHARS = 10 ** 9
+    chunks = [transcripts[i:i + batch_size] for i in range(0, len(transcripts), batch_size)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = [r for chunk in pool.map(analyze_transcripts, chunks) for r in chunk]
+    return time.perf_counter() - start, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--ms-per-1k-chars", type=float, default=0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--batch-sizes", type=int, nargs="*", default=[4, 8])
+    args = parser.parse_args()
+
+    Config.LLM_CACHE_ENABLED = False
+    set_llm_backend(FakeBackend(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        ms_per_1k_chars=args.ms_per_1k_chars,
+    ))
+    transcripts = make_transcripts(args.calls)
+
+    print(
+        f"{args.calls} calls, fake latency {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms"
+        f" + {args.ms_per_1k_chars:.0f} ms/1k chars\n"
+    )
+    print(f"{'mode':<10}{'conc':>6}{'seconds':>10}{'calls/s':>10}{'ok':>6}")
+
+    for concurrency in args.concurrency:
+        runs = [("threads", run_threads), ("async", run_async)]
+        runs += [
+            (f"batch{size}", lambda t, c, size=size: run_batches(t, c, size))
+            for size in args.batch_sizes
+        ]
+        for mode, runner in runs:
+            elapsed, results = runner(transcripts, concurrency)
+            ok = sum(1 for r in results if r.get("_llm_status") == "ok")
+            print(
+                f"{mode:<10}{concurrency:>6}{elapsed:>10.2f}"
+                f"{len(transcripts) / elapsed:>10.1f}{ok:>6}"
+            )
+
+
+if __name__ == "__main__":
+    main()
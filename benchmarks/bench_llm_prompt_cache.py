@@ -0,0 +1,223 @@
+"""
+Prompt layout benchmark: time-to-first-token and total latency, original
+single-message prompt vs. static system message + per-call user message.
+
+Usage:
+    python -m benchmarks.bench_llm_prompt_cache [--calls 100]
+        [--prefill-ms-per-token 0.5] [--decode-ms-per-token 4]
+        [--output-tokens 60] [--load-ms 1500] [--url http://localhost:11434]
+
+Without --url a local stand-in for Ollama's /api/chat is started. It
+renders messages with a phi3-style chat template, charges prefill time
+only for tokens after the longest prefix shared with the previous prompt
+(as llama.cpp's KV cache does), then streams --output-tokens tokens. The
+model is "loaded" on the first request and unloaded once keep_alive
+expires. Each layout is also run with prefix reuse disabled, which is
+what every call costs when the model is reloaded or the prefix differs.
+
+With --url the same requests go to a real Ollama server.
+"""
+import argparse
+import json
+import re
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from app.config import Config
+from app.llm import ollama_payload
+from app.pipeline import build_messages
+
+from benchmarks.bench_llm_pipeline import make_transcripts
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+# -----------------------------
+# Stand-in server
+# -----------------------------
+def parse_keep_alive(value, default=300.0):
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return float("inf") if value < 0 else float(value)
+    units = {"s": 1, "m": 60, "h": 3600}
+    if value[-1] in units:
+        return float(value[:-1]) * units[value[-1]]
+    return float(value)
+
+
+class StandInModel:
+    def __init__(self, prefill_ms, decode_ms, output_tokens, load_ms, prefix_cache=True):
+        self.prefill_ms = prefill_ms
+        self.decode_ms = decode_ms
+        self.output_tokens = output_tokens
+        self.load_ms = load_ms
+        self.prefix_cache = prefix_cache
+
+        self.lock = threading.Lock()
+        self.cached_tokens = []
+        self.loaded_until = 0.0
+
+    @staticmethod
+    def render(messages):
+        text = "".join(f"<|{m['role']}|>\n{m['content']}<|end|>\n" for m in messages)
+        return text + "<|assistant|>\n"
+
+    def prefill(self, messages, keep_alive):
+        """Sleep for load + uncached prefill; returns (prompt tokens, cached tokens)."""
+        tokens = TOKEN_PATTERN.findall(self.render(messages))
+
+        # One slot: requests are processed one at a time, like Ollama with
+        # OLLAMA_NUM_PARALLEL=1
+        with self.lock:
+            now = time.monotonic()
+            if now > self.loaded_until:
+                time.sleep(self.load_ms / 1000)
+                self.cached_tokens = []
+
+            shared = 0
+            if self.prefix_cache:
+                for a, b in zip(self.cached_tokens, tokens):
+                    if a != b:
+                        break
+                    shared += 1
+
+            time.sleep((len(tokens) - shared) * self.prefill_ms / 1000)
+            self.cached_tokens = tokens
+            self.loaded_until = time.monotonic() + parse_keep_alive(keep_alive)
+
+        return len(tokens), shared
+
+
+def make_handler(model):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _chunk(self, body: dict):
+            data = json.dumps(body).encode() + b"\n"
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            prompt_tokens, cached = model.prefill(request["messages"], request.get("keep_alive"))
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            for _ in range(model.output_tokens):
+                self._chunk({"message": {"role": "assistant", "content": " x"}, "done": False})
+                time.sleep(model.decode_ms / 1000)
+            self._chunk({
+                "message": {"role": "assistant", "content": ""},
+                "done": True,
+                "prompt_eval_count": prompt_tokens - cached,
+                "cached_tokens": cached,
+            })
+            self.wfile.write(b"0\r\n\r\n")
+
+    return Handler
+
+
+def start_stand_in(model):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(model))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# -----------------------------
+# Client
+# -----------------------------
+def timed_chat(client, messages):
+    """(seconds to first token, total seconds) for one streamed request."""
+    payload = ollama_payload(Config.OLLAMA_MODEL, messages, stream=True)
+    start = time.perf_counter()
+    first = None
+
+    with client.stream("POST", "/api/chat", json=payload) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if first is None and chunk.get("message", {}).get("content"):
+                first = time.perf_counter() - start
+
+    total = time.perf_counter() - start
+    return first if first is not None else total, total
+
+
+def run_layout(url, layout, transcripts):
+    Config.LLM_PROMPT_LAYOUT = layout
+    ttft, totals = [], []
+
+    with httpx.Client(base_url=url, timeout=Config.LLM_TIMEOUT_SECONDS) as client:
+        for transcript in transcripts:
+            first, total = timed_chat(client, build_messages(transcript))
+            ttft.append(first)
+            totals.append(total)
+
+    return ttft, totals
+
+
+def p95(values):
+    ordered = sorted(values)
+    return ordered[int(0.95 * (len(ordered) - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--prefill-ms-per-token", type=float, default=0.5)
+    parser.add_argument("--decode-ms-per-token", type=float, default=4)
+    parser.add_argument("--output-tokens", type=int, default=60)
+    parser.add_argument("--load-ms", type=float, default=1500)
+    parser.add_argument("--url", help="benchmark a real Ollama server instead")
+    args = parser.parse_args()
+
+    transcripts = make_transcripts(args.calls)
+    runs = []
+
+    if args.url:
+        for layout in ("single", "split"):
+            runs.append((layout, "server", *run_layout(args.url, layout, transcripts)))
+    else:
+        for prefix_cache in (False, True):
+            for layout in ("single", "split"):
+                model = StandInModel(
+                    args.prefill_ms_per_token, args.decode_ms_per_token,
+                    args.output_tokens, args.load_ms, prefix_cache=prefix_cache,
+                )
+                server, url = start_stand_in(model)
+                try:
+                    ttft, totals = run_layout(url, layout, transcripts)
+                finally:
+                    server.shutdown()
+                runs.append((layout, "on" if prefix_cache else "off", ttft, totals))
+
+    print(f"{args.calls} calls, keep_alive={Config.OLLAMA_KEEP_ALIVE!r}\n")
+    print(
+        f"{'layout':<8}{'prefix':>8}{'ttft p50':>10}{'ttft p95':>10}"
+        f"{'total p50':>11}{'total p95':>11}{'sum s':>8}"
+    )
+    for layout, prefix, ttft, totals in runs:
+        print(
+            f"{layout:<8}{prefix:>8}"
+            f"{statistics.median(ttft) * 1000:>9.0f}ms{p95(ttft) * 1000:>8.0f}ms"
+            f"{statistics.median(totals) * 1000:>9.0f}ms{p95(totals) * 1000:>9.0f}ms"
+            f"{sum(totals):>8.1f}"
+        )
+    print("\nFirst call of each run includes the model load.")
+
+
+if __name__ == "__main__":
+    main()
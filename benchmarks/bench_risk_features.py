@@ -0,0 +1,97 @@
+"""
+Risk feature construction: quadratic per-row scan vs. vectorized group-by.
+
+Usage:
+    python -m benchmarks.bench_risk_features [--sizes 10000 100000 1000000]
+
+The legacy implementation is O(n^2); above --legacy-max rows its time is
+extrapolated from a run at --legacy-max and marked "(est.)".
+"""
+import argparse
+import random
+import time
+
+from app.risk_model import (
+    build_features,
+    encode_behavior,
+    encode_sentiment,
+    encode_urgency,
+)
+
+CATEGORIES = [
+    "billing", "delivery", "refund", "technical", "other",
+    "billing,refund", "delivery,billing",
+]
+
+
+def make_rows(n, seed=0):
+    rng = random.Random(seed)
+    return [
+        (
+            rng.choice(["low", "medium", "high"]),
+            rng.choice(["positive", "neutral", "negative"]),
+            rng.choice(["polite", "neutral", "rude", "unknown"]),
+            rng.choice(CATEGORIES),
+            rng.choice(["resolved", "unresolved"]),
+        )
+        for _ in range(n)
+    ]
+
+
+def legacy_build_features(rows):
+    # Previous implementation, kept here for comparison only
+    def encode_category_risk(category, all_rows):
+        category_calls = [r for r in all_rows if category in (r[3] or "")]
+        if len(category_calls) < 3:
+            return 0.5
+        unresolved = sum(1 for r in category_calls if r[4] == "unresolved")
+        return unresolved / len(category_calls)
+
+    X, y = [], []
+    for row in rows:
+        y.append(1 if row[4] == "unresolved" else 0)
+        X.append([
+            encode_urgency(row[0]),
+            encode_sentiment(row[1]),
+            encode_behavior(row[2]),
+            encode_category_risk(row[3], rows),
+        ])
+    return X, y
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--legacy-max", type=int, default=10_000)
+    args = parser.parse_args()
+
+    legacy_base = None
+
+    print(f"{'rows':>10}  {'legacy (s)':>16}  {'vectorized (s)':>14}  {'speedup':>9}")
+    for n in args.sizes:
+        rows = make_rows(n)
+        vectorized = timed(build_features, rows)
+
+        if n <= args.legacy_max:
+            legacy = timed(legacy_build_features, rows)
+            legacy_base = (n, legacy)
+            label = f"{legacy:.3f}"
+        else:
+            if legacy_base is None:
+                base_n = args.legacy_max
+                legacy_base = (base_n, timed(legacy_build_features, make_rows(base_n)))
+            base_n, base_t = legacy_base
+            legacy = base_t * (n / base_n) ** 2
+            label = f"{legacy:.1f} (est.)"
+
+        print(f"{n:>10}  {label:>16}  {vectorized:>14.3f}  {legacy / vectorized:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
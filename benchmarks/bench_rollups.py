@@ -0,0 +1,116 @@
+"""
+Dashboard reads: GROUP BY over support_calls / call_categories vs. the
+daily rollup tables.
+
+Usage:
+    python -m benchmarks.bench_rollups [--rows 200000] [--days 365] [--repeat 20]
+
+Seeds a fresh database in a temporary directory with --rows calls spread
+over --days days, then times the raw aggregate queries the endpoints used
+to run against fetch_summary() and fetch_overview() as they are now.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import app.database as db
+
+RAW_QUERIES = {
+    "summary": [
+        "SELECT sentiment, COUNT(*) FROM support_calls GROUP BY sentiment",
+        "SELECT urgency, COUNT(*) FROM support_calls GROUP BY urgency",
+        "SELECT call_outcome, COUNT(*) FROM support_calls GROUP BY call_outcome",
+    ],
+    "overview": [
+        "SELECT sentiment, urgency, call_outcome, COUNT(*) FROM support_calls "
+        "INDEXED BY idx_window_covering {where} GROUP BY sentiment, urgency, call_outcome",
+        "SELECT category, COUNT(*), SUM(call_outcome = 'resolved') FROM call_categories "
+        "INDEXED BY idx_call_categories_window {where} GROUP BY category",
+        "SELECT date(created_at) AS day, COUNT(*), SUM(call_outcome = 'resolved') "
+        "FROM support_calls {where} GROUP BY day",
+    ],
+}
+
+
+def seed(rows, days):
+    rng = random.Random(0)
+    calls = [
+        {
+            "file_hash": f"h{i}",
+            "transcript": "",
+            "insights": {
+                "sentiment": rng.choice(["positive", "neutral", "negative"]),
+                "issue_category": rng.sample(["billing", "delivery", "refund", "technical"], rng.randint(1, 2)),
+                "urgency": rng.choice(["low", "medium", "high"]),
+                "agent_behavior": "polite",
+                "call_outcome": rng.choice(["resolved", "unresolved"]),
+            },
+        }
+        for i in range(rows)
+    ]
+    for i in range(0, rows, 5000):
+        db.insert_calls(calls[i:i + 5000])
+
+    # Spread the calls over the requested number of days
+    with db.get_connection() as conn:
+        conn.execute(
+            "UPDATE support_calls SET created_at = datetime('now', '-' || (abs(random()) % ?) || ' seconds')",
+            (days * 86400,)
+        )
+        conn.commit()
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def raw(name, window):
+    modifier = db.OVERVIEW_WINDOWS[window]
+    where = "WHERE created_at >= datetime('now', ?)" if modifier else ""
+    params = (modifier,) if modifier else ()
+
+    def run():
+        with db.get_connection() as conn:
+            for sql in RAW_QUERIES[name]:
+                conn.execute(sql.format(where=where), params if "{where}" in sql else ()).fetchall()
+
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    db.DB_PATH = os.path.join(tempfile.mkdtemp(prefix="bench_rollups_"), "calls.db")
+    db.init_db()
+    seed(args.rows, args.days)
+
+    with db.get_connection() as conn:
+        rollup_rows = sum(
+            conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in db.ROLLUP_SOURCE_SQL
+        )
+    print(f"{args.rows} calls over {args.days} days, {rollup_rows} rollup rows\n")
+    print(f"{'query':<18}{'raw ms':>10}{'rollup ms':>11}{'speedup':>9}")
+
+    cases = [("summary", "all", db.fetch_summary)] + [
+        ("overview", window, lambda window=window: db.fetch_overview(window))
+        for window in ("7d", "30d", "all")
+    ]
+    for name, window, current in cases:
+        before = timed(raw(name, window), args.repeat)
+        after = timed(current, args.repeat)
+        label = name if name == "summary" else f"{name} {window}"
+        print(f"{label:<18}{before:>10.1f}{after:>11.1f}{before / after:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
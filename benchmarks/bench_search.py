@@ -0,0 +1,88 @@
+"""
+Transcript search: /calls/search (search_calls) latency by query type.
+
+Usage:
+    python -m benchmarks.bench_search [--rows 1000000] [--repeat 5]
+
+Seeds a fresh database in a temporary directory with --rows calls. Each
+transcript mixes the benchmark phrases, so words like "refund" match
+roughly half of all calls, with a few order numbers and product names
+that only match a handful. Then it times search_calls() (ranking, filters
+and snippets for one page of 20) against a warm page cache.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import app.database as db
+
+from benchmarks.bench_llm_pipeline import PHRASES
+
+PRODUCTS = [f"model{n}" for n in range(2000)]
+
+QUERIES = {
+    "rare word": ("model1234", {}),
+    "rare word + filters": ("model1234", {"sentiment": "negative", "category": "billing"}),
+    "common word": ("refund", {}),
+    "common word + filters": ("refund", {"sentiment": "negative", "category": "billing"}),
+    "common phrase": ('"charged twice"', {}),
+    "two common words": ("package error", {}),
+    "prefix": ("subscri*", {}),
+}
+
+
+def seed(rows):
+    rng = random.Random(0)
+    for i in range(0, rows, 5000):
+        db.insert_calls([
+            {
+                "file_hash": f"h{j}",
+                "transcript": (
+                    f"Order {rng.randint(100000, 999999)}, my {rng.choice(PRODUCTS)}. "
+                    + " ".join(rng.choice(PHRASES) for _ in range(rng.randint(2, 6)))
+                ),
+                "insights": {
+                    "sentiment": rng.choice(["positive", "neutral", "negative"]),
+                    "issue_category": rng.sample(["billing", "delivery", "refund", "technical"], rng.randint(1, 2)),
+                    "urgency": rng.choice(["low", "medium", "high"]),
+                    "agent_behavior": "polite",
+                    "call_outcome": rng.choice(["resolved", "unresolved"]),
+                },
+            }
+            for j in range(i, min(i + 5000, rows))
+        ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    db.DB_PATH = os.path.join(tempfile.mkdtemp(prefix="bench_search_"), "calls.db")
+    db.init_db()
+
+    start = time.perf_counter()
+    seed(args.rows)
+    print(f"seeded {args.rows} calls in {time.perf_counter() - start:.0f}s\n")
+
+    print(f"{'query':<24}{'hits':>10}{'ms':>10}")
+    for name, (q, filters) in QUERIES.items():
+        with db.get_connection() as conn:
+            hits = conn.execute(
+                "SELECT COUNT(*) FROM call_search WHERE call_search MATCH ?",
+                (db.search_query(q),)
+            ).fetchone()[0]
+
+        db.search_calls(q, **filters)
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            db.search_calls(q, **filters)
+        ms = (time.perf_counter() - start) / args.repeat * 1000
+        print(f"{name:<24}{hits:>10}{ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
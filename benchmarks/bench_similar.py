@@ -0,0 +1,103 @@
+"""
+Similar-call index: query latency and recall of brute force vs. IVF.
+
+Usage:
+    python -m benchmarks.bench_similar [--sizes 100000 1000000] [--queries 50]
+        [--nprobe 8 16 32 64]
+
+Embeds synthetic transcripts (the benchmark phrases plus order numbers and
+product names) with the configured embedder, writes one snapshot per mode
+with build_index() into a temporary directory and times
+VectorIndex.search() for the 10 nearest neighbours of --queries stored
+calls. Recall is the share of IVF's top 10 that score at least as high
+as the exact (brute-force) 10th neighbour.
+"""
+import argparse
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from app.config import Config
+from app.embeddings import VectorIndex, build_index, embed, model_name, quantize
+
+from benchmarks.bench_llm_pipeline import PHRASES
+
+K = 10
+EMBED_BATCH = 10000
+
+
+def make_vectors(n, seed=0):
+    rng = random.Random(seed)
+    products = [f"model{i}" for i in range(2000)]
+    ids, scales, vectors = [], [], []
+    for start in range(0, n, EMBED_BATCH):
+        texts = [
+            f"Order {rng.randint(100000, 999999)}, my {rng.choice(products)}. "
+            + " ".join(rng.choice(PHRASES) for _ in range(rng.randint(2, 6)))
+            for _ in range(min(EMBED_BATCH, n - start))
+        ]
+        rows, row_scales = quantize(embed(texts))
+        vectors.append(rows)
+        scales.append(row_scales)
+    return np.arange(1, n + 1), np.concatenate(scales), np.concatenate(vectors)
+
+
+def timed_search(index, queries, **kwargs):
+    results = []
+    start = time.perf_counter()
+    for query in queries:
+        results.append(index.search(query, K, **kwargs)[1])
+    return (time.perf_counter() - start) / len(queries) * 1000, results
+
+
+def recall(found, exact):
+    # By score rather than id: many synthetic calls tie exactly
+    return np.mean([
+        np.sum(f >= e[-1] - 1e-6) / K for f, e in zip(found, exact)
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 16, 32, 64])
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        start = time.perf_counter()
+        ids, scales, vectors = make_vectors(n)
+        embed_s = time.perf_counter() - start
+
+        rng = np.random.default_rng(1)
+        picked = rng.choice(n, args.queries, replace=False)
+        queries = [vectors[i].astype(np.float32) * scales[i] for i in picked]
+
+        Config.EMBEDDING_IVF_MIN_VECTORS = n + 1
+        brute_dir = tempfile.mkdtemp(prefix="bench_similar_")
+        build_index(brute_dir, ids, scales, vectors, model_name())
+        brute = VectorIndex.open_current(brute_dir)
+
+        Config.EMBEDDING_IVF_MIN_VECTORS = 1
+        ivf_dir = tempfile.mkdtemp(prefix="bench_similar_")
+        ivf_meta = build_index(ivf_dir, ids, scales, vectors, model_name())
+        ivf = VectorIndex.open_current(ivf_dir)
+
+        print(
+            f"\n{n} vectors x {vectors.shape[1]} int8 ({vectors.nbytes / 1e6:.0f} MB); "
+            f"embedded in {embed_s:.0f}s, IVF build {ivf_meta['build_seconds']:.0f}s "
+            f"({ivf_meta['lists']} lists)"
+        )
+        print(f"{'mode':<20}{'ms/query':>10}{'recall@10':>11}")
+        timed_search(brute, queries[:3])
+        brute_ms, exact = timed_search(brute, queries)
+        print(f"{'brute force':<20}{brute_ms:>10.1f}{1.0:>11.3f}")
+        for nprobe in args.nprobe:
+            ms, found = timed_search(ivf, queries, nprobe=nprobe)
+            print(f"{f'ivf nprobe={nprobe}':<20}{ms:>10.1f}{recall(found, exact):>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
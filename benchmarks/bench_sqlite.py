@@ -0,0 +1,159 @@
+"""
+SQLite write path: per-query connections with default journaling (the
+original get_connection) vs. pooled WAL connections, plus insert_calls().
+
+Usage:
+    python -m benchmarks.bench_sqlite [--rows 2000] [--batch 100]
+        [--writers 4] [--readers 4] [--seconds 5]
+
+Part 1 times single-threaded inserts. Part 2 runs writer and reader
+processes side by side (like several uvicorn workers) and counts writes,
+reads (fetch_summary + one page of fetch_calls) and "database is locked"
+errors. Each mode uses a fresh database in a temporary directory.
+"""
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+
+import app.database as db
+
+INSIGHTS = {
+    "sentiment": "negative",
+    "issue_category": ["billing"],
+    "urgency": "high",
+    "agent_behavior": "polite",
+    "call_outcome": "unresolved",
+}
+TRANSCRIPT = "I was charged twice this month and nobody has called me back. " * 8
+
+
+@contextmanager
+def legacy_connection():
+    conn = sqlite3.connect(db.DB_PATH)
+    conn.row_factory = sqlite3.Row
+    # The search index triggers need it
+    conn.create_function("unpack_transcript", 1, db.unpack_transcript, deterministic=True)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def use_mode(mode, path):
+    db.DB_PATH = path
+    if mode == "legacy":
+        db.get_connection = legacy_connection
+    db.init_db()
+
+
+def timed_inserts(mode, path, rows, batch):
+    use_mode(mode, path)
+    start = time.perf_counter()
+    if mode == "bulk":
+        for i in range(0, rows, batch):
+            db.insert_calls([
+                {"file_hash": f"h{j}", "transcript": TRANSCRIPT, "insights": INSIGHTS}
+                for j in range(i, min(i + batch, rows))
+            ])
+    else:
+        for i in range(rows):
+            db.insert_call(f"h{i}", TRANSCRIPT, INSIGHTS)
+    return rows / (time.perf_counter() - start)
+
+
+# -----------------------------
+# Concurrent workload
+# -----------------------------
+def _writer(mode, path, seconds, counts):
+    use_mode(mode, path)
+    pid = os.getpid()
+    done = locked = i = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        result = db.insert_call(f"{pid}-{i}", TRANSCRIPT, INSIGHTS)
+        i += 1
+        if result.get("inserted"):
+            done += 1
+        elif "locked" in (result.get("error") or ""):
+            locked += 1
+    counts.put(("write", done, locked))
+
+
+def _reader(mode, path, seconds, counts):
+    use_mode(mode, path)
+    done = locked = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            db.fetch_summary()
+            db.fetch_calls(limit=50)
+            done += 1
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e):
+                raise
+            locked += 1
+    counts.put(("read", done, locked))
+
+
+def concurrent_run(mode, path, writers, readers, seconds):
+    ctx = multiprocessing.get_context("fork")
+    use_mode(mode, path)
+    counts = ctx.Queue()
+    procs = [ctx.Process(target=_writer, args=(mode, path, seconds, counts)) for _ in range(writers)]
+    procs += [ctx.Process(target=_reader, args=(mode, path, seconds, counts)) for _ in range(readers)]
+    for p in procs:
+        p.start()
+
+    totals = {"write": [0, 0], "read": [0, 0]}
+    for _ in procs:
+        kind, done, locked = counts.get()
+        totals[kind][0] += done
+        totals[kind][1] += locked
+    for p in procs:
+        p.join()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_sqlite_")
+    pooled_connection = db.get_connection
+
+    print(f"Single-threaded inserts ({args.rows} rows)")
+    for mode in ("legacy", "pooled", "bulk"):
+        db.get_connection = pooled_connection
+        rate = timed_inserts(mode, os.path.join(tmp, f"inserts_{mode}.db"), args.rows, args.batch)
+        label = f"bulk (insert_calls x{args.batch})" if mode == "bulk" else mode
+        print(f"  {label:<28}{rate:>10.0f} rows/s")
+
+    print(
+        f"\nConcurrent: {args.writers} writers + {args.readers} readers, "
+        f"{args.seconds:.0f}s (processes)"
+    )
+    print(f"  {'mode':<10}{'writes/s':>10}{'reads/s':>10}{'locked':>8}")
+    for mode in ("legacy", "pooled"):
+        db.get_connection = pooled_connection
+        totals = concurrent_run(
+            mode, os.path.join(tmp, f"concurrent_{mode}.db"),
+            args.writers, args.readers, args.seconds,
+        )
+        print(
+            f"  {mode:<10}{totals['write'][0] / args.seconds:>10.0f}"
+            f"{totals['read'][0] / args.seconds:>10.0f}"
+            f"{totals['write'][1] + totals['read'][1]:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
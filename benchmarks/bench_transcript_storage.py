@@ -0,0 +1,139 @@
+"""
+Transcript storage: inline TEXT column in support_calls (the original
+layout) vs. zlib-compressed rows in call_transcripts.
+
+Usage:
+    python -m benchmarks.bench_transcript_storage [--rows 20000]
+        [--min-chars 1000] [--max-chars 8000] [--repeat 5]
+
+Builds a database with the original support_calls layout, where the
+transcript sits before the label columns, and measures its size and scan
+times. Then it runs init_db(), which moves the transcripts out and drops
+the column, runs VACUUM, and measures again. Scans run against a warm
+page cache, so they show the CPU and page-walking cost, not disk reads.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+import app.database as db
+
+from benchmarks.bench_llm_pipeline import PHRASES
+
+LEGACY_TABLE = """
+CREATE TABLE support_calls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    file_hash TEXT UNIQUE,
+    transcript TEXT,
+    sentiment TEXT,
+    issue_category TEXT,
+    urgency TEXT,
+    agent_behavior TEXT,
+    call_outcome TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+SCANS = {
+    "label scan": (
+        "SELECT urgency, sentiment, agent_behavior, issue_category, call_outcome "
+        "FROM support_calls"
+    ),
+    "unindexed filter": "SELECT COUNT(*) FROM support_calls WHERE agent_behavior = 'rude'",
+}
+
+
+def make_transcript(rng, min_chars, max_chars):
+    target = rng.randint(min_chars, max_chars)
+    words = []
+    while sum(len(w) + 1 for w in words) < target:
+        words.append(rng.choice(PHRASES))
+    return " ".join(words)
+
+
+def seed_legacy(path, rows, min_chars, max_chars):
+    rng = random.Random(0)
+    conn = sqlite3.connect(path)
+    conn.execute(LEGACY_TABLE)
+    conn.executemany(
+        "INSERT INTO support_calls (file_hash, transcript, sentiment, issue_category, "
+        "urgency, agent_behavior, call_outcome) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            (
+                f"h{i}", make_transcript(rng, min_chars, max_chars),
+                rng.choice(["positive", "neutral", "negative"]),
+                rng.choice(["billing", "delivery", "refund", "technical", "billing,refund"]),
+                rng.choice(["low", "medium", "high"]),
+                rng.choice(["polite", "neutral", "rude", "unknown"]),
+                rng.choice(["resolved", "unresolved"]),
+            )
+            for i in range(rows)
+        )
+    )
+    conn.commit()
+    conn.close()
+
+
+def measure(path, repeat):
+    conn = sqlite3.connect(path)
+    stats = {"file MB": os.path.getsize(path) / 1e6}
+    try:
+        for name, size in conn.execute(
+            "SELECT name, SUM(pgsize) FROM dbstat "
+            "WHERE name IN ('support_calls', 'call_transcripts') GROUP BY name"
+        ):
+            stats[f"{name} MB"] = size / 1e6
+    except sqlite3.OperationalError:
+        pass  # SQLite built without dbstat
+
+    for name, sql in SCANS.items():
+        conn.execute(sql).fetchall()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            conn.execute(sql).fetchall()
+        stats[f"{name} ms"] = (time.perf_counter() - start) / repeat * 1000
+    conn.close()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--min-chars", type=int, default=1000)
+    parser.add_argument("--max-chars", type=int, default=8000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    db.DB_PATH = os.path.join(tempfile.mkdtemp(prefix="bench_transcripts_"), "calls.db")
+    seed_legacy(db.DB_PATH, args.rows, args.min_chars, args.max_chars)
+    before = measure(db.DB_PATH, args.repeat)
+
+    start = time.perf_counter()
+    db.init_db()
+    migrate_s = time.perf_counter() - start
+    db.close_connection()
+
+    conn = sqlite3.connect(db.DB_PATH)
+    conn.execute("VACUUM")
+    conn.close()
+    after = measure(db.DB_PATH, args.repeat)
+
+    print(
+        f"{args.rows} calls, transcripts {args.min_chars}-{args.max_chars} chars; "
+        f"migration {migrate_s:.1f}s\n"
+    )
+    print(f"{'':<24}{'inline':>10}{'side table':>12}")
+    for key in list(before) + [k for k in after if k not in before]:
+        cells = [f"{s[key]:.1f}" if key in s else "-" for s in (before, after)]
+        print(f"{key:<24}{cells[0]:>10}{cells[1]:>12}")
+    print(
+        "\nfile size after includes the indexes, category table and rollups "
+        "that init_db() also creates"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Whisper profile benchmark: real-time factor and WER per profile.
+
+Usage:
+    python -m benchmarks.bench_whisper_profiles SAMPLE_DIR [--profiles default fast ...]
+        [--preprocess off energy vad]
+
+SAMPLE_DIR holds audio files, each with a reference transcript next to
+it under the same name with a .txt extension (call1.wav + call1.txt).
+Files without a reference are timed but left out of the WER.
+
+RTF is transcription wall time / audio duration (lower is faster). Each
+profile runs once per --preprocess mode (AUDIO_PREPROCESS); the wall
+time includes decoding and trimming, and "cut" is the share of the
+recordings removed before Whisper.
+"""
+import argparse
+import os
+import re
+import time
+
+from app.config import Config
+from app.pipeline import get_whisper_model, get_whisper_settings, transcribe_audio_local
+
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".m4a", ".aac", ".ogg", ".flac"}
+
+
+def normalize_words(text):
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_errors(reference, hypothesis):
+    """Word-level edit distance (substitutions + insertions + deletions)."""
+    ref = normalize_words(reference)
+    hyp = normalize_words(hypothesis)
+
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i]
+        for j, h in enumerate(hyp, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (r != h),
+            ))
+        previous = current
+    return previous[-1], len(ref)
+
+
+def load_samples(sample_dir):
+    samples = []
+    for name in sorted(os.listdir(sample_dir)):
+        base, ext = os.path.splitext(name)
+        if ext.lower() not in AUDIO_EXTENSIONS:
+            continue
+        ref_path = os.path.join(sample_dir, base + ".txt")
+        reference = None
+        if os.path.exists(ref_path):
+            with open(ref_path, encoding="utf-8") as f:
+                reference = f.read()
+        samples.append((os.path.join(sample_dir, name), reference))
+    return samples
+
+
+def run_profile(profile, samples):
+    # Load outside the timed region
+    get_whisper_model(profile)
+
+    wall = audio = removed = 0.0
+    errors = words = 0
+    failures = 0
+
+    for path, reference in samples:
+        start = time.perf_counter()
+        result = transcribe_audio_local(path, profile=profile)
+        wall += time.perf_counter() - start
+
+        if not result["success"] and result["error"] != "empty_transcript":
+            failures += 1
+            continue
+
+        audio += result.get("duration") or 0.0
+        removed += (result.get("preprocessing") or {}).get("removed_seconds", 0.0)
+        if reference is not None:
+            e, n = word_errors(reference, result["text"])
+            errors += e
+            words += n
+
+    return {
+        "rtf": wall / audio if audio else None,
+        "wer": errors / words if words else None,
+        "audio_seconds": audio,
+        "cut": removed / audio if audio else None,
+        "wall_seconds": wall,
+        "failures": failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Whisper profile benchmark")
+    parser.add_argument("sample_dir")
+    parser.add_argument("--profiles", nargs="+", default=list(Config.WHISPER_PROFILES))
+    parser.add_argument(
+        "--preprocess", nargs="+", default=[Config.AUDIO_PREPROCESS],
+        choices=["off", "energy", "vad"],
+    )
+    args = parser.parse_args()
+
+    samples = load_samples(args.sample_dir)
+    if not samples:
+        parser.error(f"no audio files in {args.sample_dir}")
+
+    cores = Config.WHISPER_CPU_THREADS or os.cpu_count() or 1
+
+    print(f"{len(samples)} samples, {cores} core(s)\n")
+    print(f"{'profile':<10} {'model':<6} {'compute':<13} {'beam':>4} {'vad':>5} {'pre':>6} "
+          f"{'cut':>5} {'RTF':>7} {'WER':>7} {'audio s / core s':>17} {'fail':>5}")
+
+    for profile in args.profiles:
+        settings = get_whisper_settings(profile)
+        for mode in args.preprocess:
+            Config.AUDIO_PREPROCESS = mode
+            r = run_profile(profile, samples)
+
+            cut = f"{r['cut'] * 100:.0f}%" if r["cut"] is not None else "-"
+            rtf = f"{r['rtf']:.3f}" if r["rtf"] is not None else "-"
+            wer = f"{r['wer'] * 100:.1f}%" if r["wer"] is not None else "-"
+            per_core = f"{1 / (r['rtf'] * cores):.2f}" if r["rtf"] else "-"
+
+            print(f"{profile:<10} {settings['model_size']:<6} {settings['compute_type']:<13} "
+                  f"{settings['beam_size']:>4} {str(settings['vad_filter']):>5} {mode:>6} "
+                  f"{cut:>5} {rtf:>7} {wer:>7} {per_core:>17} {r['failures']:>5}")
+
+
+if __name__ == "__main__":
+    main()
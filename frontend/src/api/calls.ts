@@ -3,6 +3,8 @@ import type {
   SummaryResponse,
   AnalyzeApiResponse,
   HistoryCall,  
+  OverviewResponse,
+  OverviewWindow,
 } from "../types/analysis";
 
 export const fetchSummary = async (): Promise<SummaryResponse> => {
@@ -29,15 +31,33 @@ export const analyzeCall = async (file: File): Promise<AnalyzeApiResponse> => {
   return res.data;
 };
 
+export interface CallsPage {
+  items: HistoryCall[];
+  // Cursor for the next (older) page; null on the last page
+  nextCursor: string | null;
+}
+
 export const fetchCalls = async (params?: {
   sentiment?: string;
   urgency?: string;
   outcome?: string;
+  category?: string;
   start_date?: string;
   end_date?: string;
-}): Promise<HistoryCall[]> => {
-  const res = await api.get("/calls", { params });
-  return res.data;
+  limit?: number;
+  cursor?: string;
+  fields?: string;
+}): Promise<CallsPage> => {
+  const res = await api.get<HistoryCall[]>("/calls", { params });
+
+  if (!Array.isArray(res.data)) {
+    throw new Error("Invalid response format from server");
+  }
+
+  return {
+    items: res.data,
+    nextCursor: res.headers["x-next-cursor"] ?? null,
+  };
 };
 
 // =======================
@@ -53,8 +73,23 @@ export interface OperationalRisk {
     coefficient: number;
   };
   total_calls_used: number;
+  model_version?: number;
+  trained_at?: string;
+  staleness?: {
+    calls_since_training: number;
+    age_seconds: number;
+  };
 }
 
+export const fetchOverview = async (
+  timeframe: OverviewWindow
+): Promise<OverviewResponse> => {
+  const res = await api.get<OverviewResponse>("/analytics/overview", {
+    params: { window: timeframe },
+  });
+  return res.data;
+};
+
 export const getOperationalRisk = async (): Promise<OperationalRisk> => {
   const res = await api.get("/analytics/operational-risk");
   return res.data;
@@ -1,6 +1,6 @@
 import { useEffect, useState } from "react"
-import { getOperationalRisk, fetchCalls } from "../api/calls"
-import type { HistoryCall } from "../types/analysis"
+import { getOperationalRisk, fetchOverview } from "../api/calls"
+import type { OverviewResponse } from "../types/analysis"
 import type { OperationalRisk } from "../api/calls"
 import { 
   PieChart, Pie, Cell,
@@ -20,20 +20,28 @@ const COLORS = {
 
 export default function Analytics() {
   const [riskData, setRiskData] = useState<OperationalRisk | null>(null)
-  const [calls, setCalls] = useState<HistoryCall[]>([])
+  const [overview, setOverview] = useState<OverviewResponse | null>(null)
   const [loading, setLoading] = useState(true)
   const [timeframe, setTimeframe] = useState<'7d' | '30d' | 'all'>('7d')
 
   useEffect(() => {
-    async function loadAnalytics() {
+    async function loadRisk() {
+      try {
+        setRiskData(await getOperationalRisk())
+      } catch (error) {
+        console.error("Failed to load operational risk", error)
+      }
+    }
+
+    loadRisk()
+  }, [])
+
+  // Aggregates are computed server-side per timeframe
+  useEffect(() => {
+    async function loadOverview() {
       setLoading(true)
       try {
-        const [risk, callsData] = await Promise.all([
-          getOperationalRisk(),
-          fetchCalls()
-        ])
-        setRiskData(risk)
-        setCalls(callsData)
+        setOverview(await fetchOverview(timeframe))
       } catch (error) {
         console.error("Failed to load analytics", error)
       } finally {
@@ -41,88 +49,37 @@ export default function Analytics() {
       }
     }
     
-    loadAnalytics()
-  }, [])
+    loadOverview()
+  }, [timeframe])
 
-  // ========== FILTER CALLS BY TIMEFRAME ==========
+  // ========== METRICS FOR SELECTED TIMEFRAME ==========
   
-  const getFilteredCalls = () => {
-    if (timeframe === 'all') return calls
-    
-    const now = new Date()
-    const cutoff = new Date()
-    
-    if (timeframe === '7d') {
-      cutoff.setDate(now.getDate() - 7)
-    } else if (timeframe === '30d') {
-      cutoff.setDate(now.getDate() - 30)
-    }
-    
-    return calls.filter(call => new Date(call.created_at) >= cutoff)
-  }
-
-  const filteredCalls = getFilteredCalls()
-  const totalFilteredCalls = filteredCalls.length
-
-  // ========== METRICS BASED ON FILTERED CALLS ==========
-  
-  const resolvedCalls = filteredCalls.filter(c => c.call_outcome === 'resolved').length
-  const resolutionRate = totalFilteredCalls ? Math.round((resolvedCalls / totalFilteredCalls) * 100) : 0
+  const totalFilteredCalls = overview?.total_calls ?? 0
+  const resolvedCalls = overview?.resolved_calls ?? 0
+  const resolutionRate = overview?.resolution_rate ?? 0
   
-  const highUrgencyCount = filteredCalls.filter(c => c.urgency === 'high').length
-  const mediumUrgencyCount = filteredCalls.filter(c => c.urgency === 'medium').length
-  const lowUrgencyCount = filteredCalls.filter(c => c.urgency === 'low').length
+  const urgency = overview?.urgency_distribution ?? {}
+  const highUrgencyCount = urgency.high ?? 0
+  const mediumUrgencyCount = urgency.medium ?? 0
+  const lowUrgencyCount = urgency.low ?? 0
   
-  const negativeSentimentCount = filteredCalls.filter(c => c.sentiment === 'negative').length
-  const neutralSentimentCount = filteredCalls.filter(c => c.sentiment === 'neutral').length
-  const positiveSentimentCount = filteredCalls.filter(c => c.sentiment === 'positive').length
+  const sentiment = overview?.sentiment_distribution ?? {}
+  const negativeSentimentCount = sentiment.negative ?? 0
+  const neutralSentimentCount = sentiment.neutral ?? 0
+  const positiveSentimentCount = sentiment.positive ?? 0
 
-  // ========== CATEGORY DATA BASED ON FILTERED CALLS ==========
-  
-  const categoryMap = new Map<string, { count: number; resolved: number }>()
-  
-  filteredCalls.forEach(call => {
-    const categories = call.issue_category.split(',').map(c => c.trim())
-    categories.forEach(cat => {
-      if (!cat) return
-      const existing = categoryMap.get(cat) || { count: 0, resolved: 0 }
-      existing.count += 1
-      if (call.call_outcome === 'resolved') {
-        existing.resolved += 1
-      }
-      categoryMap.set(cat, existing)
-    })
-  })
-
-  const categoryData = Array.from(categoryMap.entries())
-    .map(([name, data]) => ({
-      name: name.charAt(0).toUpperCase() + name.slice(1),
-      count: data.count,
-      resolved: data.resolved,
-      color: getCategoryColor(name)
-    }))
-    .sort((a, b) => b.count - a.count)
+  // ========== CATEGORY DATA ==========
 
-  // ========== WEEK-OVER-WEEK TRENDS (still based on all calls for comparison) ==========
-  
-  const lastWeekCalls = calls.filter(c => {
-    const weekAgo = new Date()
-    weekAgo.setDate(weekAgo.getDate() - 7)
-    return new Date(c.created_at) >= weekAgo
-  }).length
+  const categoryData = (overview?.categories ?? []).map(cat => ({
+    name: cat.name.charAt(0).toUpperCase() + cat.name.slice(1),
+    count: cat.count,
+    resolved: cat.resolved,
+    color: getCategoryColor(cat.name)
+  }))
 
-  const previousWeekCalls = calls.filter(c => {
-    const twoWeeksAgo = new Date()
-    twoWeeksAgo.setDate(twoWeeksAgo.getDate() - 14)
-    const oneWeekAgo = new Date()
-    oneWeekAgo.setDate(oneWeekAgo.getDate() - 7)
-    const callDate = new Date(c.created_at)
-    return callDate >= twoWeeksAgo && callDate < oneWeekAgo
-  }).length
+  // ========== WEEK-OVER-WEEK TRENDS (independent of timeframe) ==========
 
-  const volumeTrend = previousWeekCalls 
-    ? Math.round(((lastWeekCalls - previousWeekCalls) / previousWeekCalls) * 100) 
-    : 0
+  const volumeTrend = overview?.week_over_week.volume_trend ?? 0
 
   // ========== TREND DATA BASED ON TIMEFRAME ==========
   
@@ -135,9 +92,9 @@ export default function Analytics() {
     } else if (timeframe === '30d') {
       startDate.setDate(startDate.getDate() - 30)
     } else { // 'all'
-      if (calls.length > 0) {
-        const dates = calls.map(c => new Date(c.created_at).getTime())
-        startDate.setTime(Math.min(...dates))
+      const firstDay = overview?.daily[0]?.day
+      if (firstDay) {
+        startDate.setTime(new Date(`${firstDay}T00:00:00Z`).getTime())
       } else {
         startDate.setDate(startDate.getDate() - 30)
       }
@@ -148,13 +105,17 @@ export default function Analytics() {
 
   const generateTrendData = () => {
     const { startDate, endDate } = getDateRange()
+    const buckets = new Map((overview?.daily ?? []).map(d => [d.day, d]))
     
+    // The API buckets calls by UTC day, so days are stepped, looked up
+    // and labelled in UTC too
     const dates: Date[] = []
     const currentDate = new Date(startDate)
+    currentDate.setUTCHours(0, 0, 0, 0)
     
     while (currentDate <= endDate) {
       dates.push(new Date(currentDate))
-      currentDate.setDate(currentDate.getDate() + 1)
+      currentDate.setUTCDate(currentDate.getUTCDate() + 1)
     }
     
     let displayDates = dates
@@ -164,18 +125,15 @@ export default function Analytics() {
     }
     
     return displayDates.map(date => {
-      const dayCalls = filteredCalls.filter(call => {
-        const callDate = new Date(call.created_at)
-        return callDate.toDateString() === date.toDateString()
-      })
+      const bucket = buckets.get(date.toISOString().slice(0, 10))
       
       return {
         day: timeframe === 'all' 
-          ? date.toLocaleDateString('en-US', { month: 'short', day: 'numeric' })
-          : date.toLocaleDateString('en-US', { weekday: 'short' }),
-        resolved: dayCalls.filter(c => c.call_outcome === 'resolved').length,
-        unresolved: dayCalls.filter(c => c.call_outcome === 'unresolved').length,
-        volume: dayCalls.length
+          ? date.toLocaleDateString('en-US', { month: 'short', day: 'numeric', timeZone: 'UTC' })
+          : date.toLocaleDateString('en-US', { weekday: 'short', timeZone: 'UTC' }),
+        resolved: bucket?.resolved ?? 0,
+        unresolved: bucket?.unresolved ?? 0,
+        volume: bucket?.volume ?? 0
       }
     })
   }
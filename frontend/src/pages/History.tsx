@@ -1,9 +1,25 @@
-import { useEffect, useState } from "react"
+import { useEffect, useRef, useState } from "react"
 import { useSearchParams } from "react-router-dom"
+import { fetchCalls } from "../api/calls"
 import type { HistoryCall } from "../types/analysis"
-import { formatHistoryDate, parseFilterDate } from "../utils/date"
+import { formatHistoryDate } from "../utils/date"
 import "./History.css"
 
+const PAGE_SIZE = 50
+
+// Maps the page's URL filters onto GET /calls query parameters
+function callsQuery(params: URLSearchParams) {
+  return {
+    outcome: params.get("status") || undefined,
+    urgency: params.get("urgency") || undefined,
+    sentiment: params.get("sentiment") || undefined,
+    category: params.get("category") || undefined,
+    start_date: params.get("from") || undefined,
+    end_date: params.get("to") || undefined,
+    limit: PAGE_SIZE,
+  }
+}
+
 // Helper function to truncate at word boundaries
 function truncateAtWord(text: string, limit: number): string {
   if (text.length <= limit) return text
@@ -18,73 +34,63 @@ export default function History() {
   const [sortOrder, setSortOrder] = useState<"newest" | "oldest">("newest")
   const [expandedCardId, setExpandedCardId] = useState<number | null>(null)
   const [loading, setLoading] = useState(true)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [error, setError] = useState<string | null>(null)
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  // Bumped whenever the filters change so stale responses are dropped
+  const requestId = useRef(0)
 
+  // Filters are applied by the server; changing them starts over at page one
   useEffect(() => {
+    const id = ++requestId.current
+
     async function loadCalls() {
       setLoading(true)
       setError(null)
-      
+
       try {
-        // Use environment variable or fallback to localhost
-        const apiUrl = import.meta.env.VITE_API_URL || "http://localhost:8000"
-        const res = await fetch(`${apiUrl}/calls`)
-        
-        if (!res.ok) {
-          throw new Error(`Failed to fetch calls: ${res.status} ${res.statusText}`)
-        }
-        
-        const data: unknown = await res.json()
-
-        if (Array.isArray(data)) {
-          setCalls(data as HistoryCall[])
-        } else {
-          throw new Error("Invalid response format from server")
-        }
+        const page = await fetchCalls(callsQuery(params))
+        if (id !== requestId.current) return
+        setCalls(page.items)
+        setNextCursor(page.nextCursor)
       } catch (err) {
+        if (id !== requestId.current) return
         console.error("Failed to load calls", err)
         setError(err instanceof Error ? err.message : "Failed to load calls. Please try again.")
       } finally {
-        setLoading(false)
+        if (id === requestId.current) setLoading(false)
       }
     }
 
     loadCalls()
-  }, [])
+  }, [params])
+
+  async function loadMore() {
+    if (!nextCursor) return
+    const id = requestId.current
+    setLoadingMore(true)
+
+    try {
+      const page = await fetchCalls({ ...callsQuery(params), cursor: nextCursor })
+      if (id !== requestId.current) return
+      setCalls(prev => [...prev, ...page.items])
+      setNextCursor(page.nextCursor)
+    } catch (err) {
+      if (id !== requestId.current) return
+      console.error("Failed to load more calls", err)
+      setError(err instanceof Error ? err.message : "Failed to load calls. Please try again.")
+    } finally {
+      setLoadingMore(false)
+    }
+  }
 
   const splitCategories = (categoryString: string): string[] => {
     if (!categoryString) return []
     return categoryString.split(',').map(cat => cat.trim()).filter(cat => cat.length > 0)
   }
 
-  const filtered = calls.filter(call => {
-    const status = params.get("status")
-    const urgency = params.get("urgency")
-    const sentiment = params.get("sentiment")
-    const category = params.get("category")
-    const from = params.get("from")
-    const to = params.get("to")
-
-    if (status && call.call_outcome !== status) return false
-    if (urgency && call.urgency !== urgency) return false
-    if (sentiment && call.sentiment !== sentiment) return false
-    if (category && !call.issue_category.toLowerCase().includes(category.toLowerCase())) return false
-
-    const callDate = new Date(call.created_at).getTime()
-    if (from) {
-      const fromDate = parseFilterDate(from).getTime()
-      if (callDate < fromDate) return false
-    }
-    if (to) {
-      const toDate = parseFilterDate(to).getTime()
-      const toDateEnd = toDate + (24 * 60 * 60 * 1000 - 1)
-      if (callDate > toDateEnd) return false
-    }
-
-    return true
-  })
-
-  const sortedCalls = [...filtered].sort((a, b) => {
+  // Pages arrive newest first; the toggle reorders the calls loaded so far
+  const sortedCalls = [...calls].sort((a, b) => {
     const dateA = new Date(a.created_at).getTime()
     const dateB = new Date(b.created_at).getTime()
     
@@ -174,7 +180,7 @@ export default function History() {
             {sortOrder === "newest" ? "Newest First" : "Oldest First"}
           </button>
           <span className="results-count">
-            {sortedCalls.length} {sortedCalls.length === 1 ? 'call' : 'calls'}
+            {sortedCalls.length}{nextCursor ? "+" : ""} {sortedCalls.length === 1 && !nextCursor ? 'call' : 'calls'}
           </span>
         </div>
       </div>
@@ -282,7 +288,7 @@ export default function History() {
             <div className="empty-icon">📞</div>
             <h3>No calls found</h3>
             <p>
-              {calls.length === 0 
+              {params.size === 0
                 ? "No calls have been analyzed yet. Upload a call to get started."
                 : "No calls match the selected filters. Try adjusting your search criteria."}
             </p>
@@ -291,7 +297,7 @@ export default function History() {
                 Clear All Filters
               </button>
             )}
-            {calls.length === 0 && (
+            {params.size === 0 && (
               <button 
                 className="empty-reset-btn"
                 onClick={() => window.location.href = '/analyze'}
@@ -390,6 +396,18 @@ export default function History() {
           )
         })}
       </div>
+
+      {nextCursor && (
+        <div className="load-more">
+          <button
+            className="reset-btn"
+            onClick={loadMore}
+            disabled={loadingMore}
+          >
+            {loadingMore ? "Loading..." : "Load More"}
+          </button>
+        </div>
+      )}
     </div>
   )
 }
\ No newline at end of file
@@ -75,4 +75,41 @@ export type SummaryResponse = {
   sentiment_distribution: Record<string, number>
   urgency_distribution: Record<string, number>
   call_outcome_distribution: Record<string, number>
-}
\ No newline at end of file
+}
+
+// =======================
+// Overview (dashboard aggregates)
+// =======================
+
+export type OverviewWindow = "7d" | "30d" | "all"
+
+export type OverviewCategory = {
+  name: string
+  count: number
+  resolved: number
+  resolution_rate: number
+}
+
+export type OverviewDay = {
+  day: string                   // YYYY-MM-DD (UTC)
+  volume: number
+  resolved: number
+  unresolved: number
+}
+
+export type OverviewResponse = {
+  window: OverviewWindow
+  total_calls: number
+  resolved_calls: number
+  resolution_rate: number
+  sentiment_distribution: Record<string, number>
+  urgency_distribution: Record<string, number>
+  call_outcome_distribution: Record<string, number>
+  categories: OverviewCategory[]
+  daily: OverviewDay[]
+  week_over_week: {
+    last_7_days: number
+    previous_7_days: number
+    volume_trend: number
+  }
+}
@@ -1,13 +1,37 @@
 import uvicorn
 import os
+import sys
+import subprocess
 from app.config import Config
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(
-        "app.main:app",
-        host="0.0.0.0",
-        port=port,
-        reload=Config.DEBUG,
-        workers=4 if not Config.DEBUG else 1
-    )
\ No newline at end of file
+    workers = 4 if not Config.DEBUG else 1
+
+    # With several API workers, share one Whisper model through the
+    # transcription service instead of loading a copy per worker
+    service = None
+    if workers > 1 and "TRANSCRIPTION_MODE" not in os.environ:
+        os.environ["TRANSCRIPTION_MODE"] = "service"
+    if os.environ.get("TRANSCRIPTION_MODE") == "service":
+        service = subprocess.Popen([sys.executable, "-m", "app.transcription_service"])
+
+    # Batch jobs need a queue consumer; without the embedded one, run
+    # app.worker next to the API
+    worker = None
+    if not Config.EMBEDDED_WORKER:
+        worker = subprocess.Popen([sys.executable, "-m", "app.worker"])
+
+    try:
+        uvicorn.run(
+            "app.main:app",
+            host="0.0.0.0",
+            port=port,
+            reload=Config.DEBUG,
+            workers=workers
+        )
+    finally:
+        if worker:
+            worker.terminate()
+        if service:
+            service.terminate()
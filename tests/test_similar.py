@@ -0,0 +1,76 @@
+"""
+Similar-call lookup against a throwaway database and index directory.
+
+    python -m pytest tests
+"""
+import pytest
+
+import app.database as database
+import app.similar as similar
+from app.config import Config
+
+INSIGHTS = {
+    "sentiment": "neutral",
+    "issue_category": ["delivery"],
+    "urgency": "low",
+    "agent_behavior": "polite",
+    "call_outcome": "resolved",
+}
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PATH", str(tmp_path / "calls.db"))
+    monkeypatch.setattr(Config, "EMBEDDING_BACKEND", "hashed")
+    monkeypatch.setattr(Config, "EMBEDDING_INDEX_DIR", str(tmp_path / "embeddings"))
+    monkeypatch.setattr(similar, "_state", {"dir": None, "name": None, "index": None, "checked_at": 0.0})
+    monkeypatch.setattr(similar, "_tail", {"after": 0, "ids": None, "vectors": None})
+    monkeypatch.setattr(similar, "_embedded_through", {})
+    database.init_db()
+    yield
+    database.close_connection()
+
+
+def store(file_hash, transcript, embed):
+    return database.insert_call(file_hash, transcript, dict(INSIGHTS), embed=embed)["id"]
+
+
+def reload_now():
+    similar._state["checked_at"] = 0.0
+
+
+def test_call_embedded_after_newer_calls_is_found(db):
+    # Stored by an API worker (no vector), then two queue calls
+    late = store("api", "my package never arrived at the address", embed=False)
+    first = store("q1", "my package never arrived", embed=True)
+    second = store("q2", "the package never arrived here", embed=True)
+    assert late < first < second
+
+    assert {r["id"] for r in similar.find_similar(first)} == {second}
+
+    # The consumer embeds the API call after the queue calls have vectors
+    assert similar.embed_missing() == 1
+    reload_now()
+    assert {r["id"] for r in similar.find_similar(first)} == {late, second}
+
+
+def test_out_of_order_vectors_count_toward_a_rebuild(db, monkeypatch):
+    monkeypatch.setattr(Config, "EMBEDDING_REBUILD_EVERY", 2)
+    late = [store(f"api{i}", f"refund for order {i} please", embed=False) for i in range(2)]
+    newest = store("q", "refund for my order please", embed=True)
+    assert similar.build()["count"] == 1
+
+    assert similar.embed_missing() == 2
+    meta = similar.rebuild_if_stale()
+    assert meta is not None and meta["count"] == 3
+
+    reload_now()
+    assert {r["id"] for r in similar.find_similar(newest)} == set(late)
+
+
+def test_call_without_vector_is_not_embedded_by_the_api(db):
+    call_id = store("api", "my package never arrived", embed=False)
+    with pytest.raises(similar.NotEmbeddedYet):
+        similar.find_similar(call_id)
+    with pytest.raises(LookupError):
+        similar.find_similar(call_id + 100)